@@ -1,36 +1,52 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
-import requests
+# Тяжёлые библиотеки (pandas, matplotlib, seaborn, requests, sklearn) импортируются
+# только внутри страниц и функций, которым они нужны
+import os
+from src.inference.registry import get_registry
+from src.services.exchange_rate import EXCHANGE_RATE_URL, ExchangeRateProvider, rate_source_from_uri
+from src.services.instrumentation import Instrumentation, InstrumentedPredictor, NullInstrumentation
 
 @st.cache_resource
+def get_rate_provider():
+    """Курс USD к RUB: обновляется в фоне раз в час, источник можно подменить через EXCHANGE_RATE_SOURCE"""
+    source = rate_source_from_uri(os.environ.get('EXCHANGE_RATE_SOURCE', EXCHANGE_RATE_URL))
+    return ExchangeRateProvider(source, ttl=3600).start()
+
+
 def get_usd_to_rub_rate():
-    """Получаем актуальный курс USD к RUB"""
-    try:
-        response = requests.get("https://api.exchangerate-api.com/v4/latest/USD", timeout=5)
-        data = response.json()
-        return data['rates']['RUB']
-    except:
-        return 100.0
-
-def load_models():
-    """Загружаем все модели и preprocessing objects"""
-    try:
-        scaler = joblib.load('models/scaler.pkl')
-        label_encoders = joblib.load('models/label_encoders.pkl')
-        onehot_encoders = joblib.load('models/onehot_encoders.pkl')
-        model_reg = joblib.load('models/random_forest_regression_final.pkl')
-        model_clf = joblib.load('models/random_forest_classifier_final.pkl')
+    """Получаем актуальный курс USD к RUB без ожидания сети"""
+    return get_rate_provider().get()
+
+@st.cache_resource
+def get_model_registry():
+    """Реестр моделей, общий для всех сессий: pkl загружаются при первом обращении"""
+    return get_registry('models')
 
-        return scaler, label_encoders, onehot_encoders, model_reg, model_clf
+
+@st.cache_resource
+def get_instrumentation():
+    """
+    Гистограммы этапов предсказания, общие для всех сессий. METRICS_PORT - порт HTTP-сервера
+    с метриками Prometheus, PROFILE_SLOW_MS - порог медленного запроса для профилировщика.
+    Без них этапы не записываются и prometheus_client не импортируется
+    """
+    if not NullInstrumentation.enabled_in_env():
+        return NullInstrumentation()
+    instrumentation = Instrumentation.from_env()
+    port = os.environ.get('METRICS_PORT')
+    if port:
+        instrumentation.serve(int(port))
+    return instrumentation
+
+
+def load_predictor():
+    """Лёгкий предиктор (numpy + скомпилированные модели) с кэшем для страницы предсказания"""
+    try:
+        return InstrumentedPredictor(get_model_registry().slim_predictor(), get_instrumentation())
     except Exception as e:
         st.error(f"Ошибка загрузки моделей: {e}")
-        return None, None, None, None, None
+        return None
 
-scaler, label_encoders, onehot_encoders, model_reg, model_clf = load_models()
 
 # Настройка страницы
 st.set_page_config(
@@ -205,9 +221,6 @@ def show_prediction_page():
         "Другая": "other"
     }
 
-    for_label = ['fueltype', 'aspiration', 'doornumber', 'drivewheel', 'enginelocation']
-    for_one_hot = ['carbody', 'enginetype', 'cylindernumber', 'fuelsystem', 'brand']
-
     st.markdown("""
     <span style='color: #ff4b4b; font-size: 14px;'>
     ⚠️ Модель обучена на исторических данных и показывает относительную стоимость
@@ -301,15 +314,10 @@ def show_prediction_page():
         # Кнопка предсказания
         submitted = st.form_submit_button("🎯 Предсказать цену и класс")
 
-    # Вычисляем производные признаки (вне формы)
-    power_to_weight = horsepower / curbweight
-    mpg_avg = (citympg_converted + highwaympg_converted) / 2
-    size_ratio = carwidth / carlength
-
     # Если форма отправлена
     if submitted:
-        # Создаём DataFrame с введенными данными
-        input_data = pd.DataFrame({
+        # Собираем введенные данные в колонки
+        input_data = {
             'symboling': [symboling_value],
             'wheelbase': [wheelbase],
             'carlength': [carlength],
@@ -320,87 +328,235 @@ def show_prediction_page():
             'horsepower': [horsepower],
             'citympg': [citympg_converted],
             'highwaympg': [highwaympg_converted],
-            'power_to_weight': [power_to_weight],
-            'mpg_avg': [mpg_avg],
-            'size_ratio': [size_ratio],
-            'fueltype': fueltype_english,
-            'aspiration': aspiration_english,
-            'doornumber': doornumber_english,
-            'drivewheel': drivewheel_english,
-            'enginelocation': enginelocation_english,
-            'carbody': carbody_english,
-            'enginetype': enginetype_english,
-            'cylindernumber': cylindernumber_english,
-            'fuelsystem': fuelsystem_english,
-            'brand': brand_english
-        })
-        orig_num_col = input_data.select_dtypes(include=[np.number]).columns
-        input_data[orig_num_col] = scaler.transform(input_data[orig_num_col])
-
-        for column in for_label:
-            input_data[column] = label_encoders[column].transform(input_data[column])
-
-        for column in for_one_hot:
-            ohe = onehot_encoders[column]
-
-            onehot_encoded = ohe.transform(input_data[[column]])
-            feature_names = ohe.get_feature_names_out([column])
-
-            onehot_df = pd.DataFrame(onehot_encoded, columns=feature_names, index=input_data.index)
-
-            input_data = pd.concat([input_data, onehot_df], axis=1)
-            input_data.drop(column, axis=1, inplace=True)
-
-        expected_columns = model_reg.feature_names_in_
-        input_data = input_data.reindex(columns=expected_columns, fill_value=0)
-
-        price_prediction = model_reg.predict(input_data)
-        predicted_price_usd = float(price_prediction[0]) if len(price_prediction) > 0 else 0
-        exchange_rate = get_usd_to_rub_rate()
+            'fueltype': [fueltype_english],
+            'aspiration': [aspiration_english],
+            'doornumber': [doornumber_english],
+            'drivewheel': [drivewheel_english],
+            'enginelocation': [enginelocation_english],
+            'carbody': [carbody_english],
+            'enginetype': [enginetype_english],
+            'cylindernumber': [cylindernumber_english],
+            'fuelsystem': [fuelsystem_english],
+            'brand': [brand_english]
+        }
+        # Конфигурация сохраняется: прогноз и анализ «что если» переживают перезапуск скрипта
+        # при смене виджетов вне формы
+        st.session_state['last_input'] = input_data
+
+    if 'last_input' not in st.session_state:
+        return
+    input_data = st.session_state['last_input']
+
+    instrumentation = get_instrumentation()
+    with instrumentation.request('prediction_page'):
+        predictor = load_predictor()
+        if predictor is None:
+            return
+        # Производные признаки, масштабирование, кодирование и объединение редких брендов
+        # выполняют скомпилированные таблицы обученного препроцессора
+        prediction = predictor.predict_rows(input_data)
+        predicted_price_usd = float(prediction.price[0])
+        with instrumentation.stage('exchange_rate'):
+            exchange_rate = get_usd_to_rub_rate()
         predicted_price_rub = predicted_price_usd * exchange_rate
 
-        classification_predict = model_clf.predict(input_data)
+    classification_predict = prediction.is_premium[0]
 
-        st.success("✅ Данные получены!")
+    st.success("✅ Данные получены!")
 
-        col_pred1, col_pred2, col_pred3 = st.columns(3)
+    col_pred1, col_pred2, col_pred3 = st.columns(3)
 
-        st.markdown("""
-        <span style='color: #ff4b4b; font-size: 14px;'>
-        ⚠️ Модель обучена на исторических данных и показывает относительную стоимость
-        </span>
-        """, unsafe_allow_html=True)
-        with col_pred1:
-            st.subheader("💰 Цена в USD")
+    st.markdown("""
+    <span style='color: #ff4b4b; font-size: 14px;'>
+    ⚠️ Модель обучена на исторических данных и показывает относительную стоимость
+    </span>
+    """, unsafe_allow_html=True)
+    with col_pred1:
+        st.subheader("💰 Цена в USD")
+        st.metric(
+            label="Рыночная стоимость",
+            value=f"${predicted_price_usd:,.0f}",
+            delta="+2,500"
+        )
+
+    with col_pred2:
+        st.subheader("💰 Цена в RUB")
+        st.metric(
+            label=f"Рыночная стоимость (курс: {exchange_rate:.2f}₽)",
+            value=f"₽{predicted_price_rub:,.0f}",
+            delta="Актуальный курс"
+        )
+        rate_age = get_rate_provider().age
+        if rate_age is None:
+            st.caption("💱 Курс ещё загружается, использован курс по умолчанию")
+        else:
+            st.caption(f"💱 Курс обновлён {rate_age / 60:.0f} мин назад")
+
+    with col_pred3:
+        st.subheader("🏷️ Классификация")
+        if classification_predict == 1:
             st.metric(
-                label="Рыночная стоимость",
-                value=f"${predicted_price_usd:,.0f}",
-                delta="+2,500"
+                label="Ценовой сегмент",
+                value="Премиальный",
+                delta="Высокий класс"
             )
-
-        with col_pred2:
-            st.subheader("💰 Цена в RUB")
+        else:
             st.metric(
-                label=f"Рыночная стоимость (курс: {exchange_rate:.2f}₽)",
-                value=f"₽{predicted_price_rub:,.0f}",
-                delta="Актуальный курс"
+                label="Ценовой сегмент",
+                value="Эконом",
+                delta="Средний класс"
             )
-            st.caption("💱 Курс обновляется в реальном времени")
-
-        with col_pred3:
-            st.subheader("🏷️ Классификация")
-            if classification_predict == 1:
-                st.metric(
-                    label="Ценовой сегмент",
-                    value="Премиальный",
-                    delta="Высокий класс"
-                )
-            else:
-                st.metric(
-                    label="Ценовой сегмент",
-                    value="Эконом",
-                    delta="Средний класс"
-                )
+
+    show_explanation(predictor, input_data)
+    show_comparables(predictor, input_data)
+    show_sweep(input_data)
+
+
+def show_explanation(predictor, input_data, top=10):
+    """Вклады исходных колонок в цену этой машины (разложение по путям в деревьях леса)"""
+    import altair as alt
+    from src.inference.explain import Explainer
+
+    with get_instrumentation().stage('explain'):
+        explanation = Explainer(predictor.slim).explain_rows(input_data)
+    frame = explanation.to_frame(0, 'price').head(top)
+    frame['direction'] = frame['contribution'].map(lambda value: 'Повышает' if value > 0 else 'Понижает')
+
+    st.markdown("### 🧩 Из чего складывается цена")
+    chart = alt.Chart(frame).mark_bar().encode(
+        x=alt.X('contribution:Q', title='Вклад, USD'),
+        y=alt.Y('column:N', sort=None, title=None),
+        color=alt.Color('direction:N', title=None,
+                        scale=alt.Scale(domain=['Повышает', 'Понижает'], range=['#2ca02c', '#d62728'])),
+        tooltip=['column', alt.Tooltip('contribution:Q', format=',.0f')],
+    )
+    st.altair_chart(chart, use_container_width=True)
+    total = explanation.price[0].sum()
+    st.caption(f"Средняя цена по обучающим данным ${explanation.bias['price']:,.0f}, "
+               f"сумма вкладов всех признаков {'+' if total >= 0 else '-'}${abs(total):,.0f}")
+
+
+# Колонки таблицы похожих машин и их подписи
+COMPARABLE_COLUMNS = {
+    'CarName': 'Модель', 'price': 'Цена, USD', 'horsepower': 'Мощность, л.с.', 'curbweight': 'Масса, фунты',
+    'carbody': 'Кузов', 'fueltype': 'Топливо', 'distance': 'Расстояние',
+}
+
+
+def show_comparables(predictor, input_data, k=5):
+    """Ближайшие машины из обучающих данных в пространстве признаков модели"""
+    try:
+        index = get_model_registry().comparables_index()
+    except Exception as e:
+        st.caption(f"Похожие машины недоступны: {e}")
+        return
+
+    with get_instrumentation().stage('comparables'):
+        neighbors = index.neighbors(predictor.slim.prepare_columns(input_data), k=k)
+    columns = [column for column in COMPARABLE_COLUMNS if column in neighbors]
+    st.markdown("### 🔎 Похожие машины")
+    st.dataframe(neighbors[columns].rename(columns=COMPARABLE_COLUMNS), hide_index=True,
+                 column_config={'Цена, USD': st.column_config.NumberColumn(format="$%.0f"),
+                                'Расстояние': st.column_config.NumberColumn(format="%.2f")})
+
+
+# Параметры для анализа «что если»: колонка модели, диапазон слайдера формы и множитель в единицы модели
+SWEEP_PARAMS = {
+    "Мощность (л.с.)": ('horsepower', 50.0, 1000.0, 1.0),
+    "Снаряженная масса (кг)": ('curbweight', 800.0, 2500.0, 2.20462),
+    "Объем двигателя (л)": ('enginesize', 1.0, 10.0, 1000.0),
+}
+
+
+def show_sweep(base):
+    """Цена и вероятность премиального класса на сетке из одного-двух параметров, одним пакетом"""
+    import numpy as np
+    from src.inference.sweep import sweep
+
+    st.markdown("### 📈 Что если: как меняется цена")
+    labels = st.multiselect("Параметры (один - кривая, два - тепловая карта)", list(SWEEP_PARAMS),
+                            default=list(SWEEP_PARAMS)[:1], max_selections=2)
+    if not labels:
+        return
+    points = st.slider("Точек по каждой оси", 10, 100, 50 if len(labels) == 1 else 25)
+
+    predictor = load_predictor()
+    if predictor is None:
+        return
+    params = {}
+    for label in labels:
+        column, low, high, factor = SWEEP_PARAMS[label]
+        params[column] = np.linspace(low, high, points) * factor
+
+    # Без кэша предсказаний: точки сетки вытеснили бы из него обычные запросы
+    instrumentation = get_instrumentation()
+    with instrumentation.stage('sweep'):
+        result = sweep(InstrumentedPredictor(predictor.slim, instrumentation), base, params)
+
+    frame = result.to_frame()
+    for label in labels:
+        column, _, _, factor = SWEEP_PARAMS[label]
+        frame = frame.rename(columns={column: label})
+        frame[label] = (frame[label] / factor).round(1)
+    frame['premium_proba'] = frame['premium_proba'] * 100
+
+    if len(labels) == 1:
+        col_curve1, col_curve2 = st.columns(2)
+        with col_curve1:
+            st.caption("💰 Цена, USD")
+            st.line_chart(frame.set_index(labels[0])['price'])
+        with col_curve2:
+            st.caption("🏷️ Вероятность премиального класса, %")
+            st.line_chart(frame.set_index(labels[0])['premium_proba'])
+    else:
+        import altair as alt
+
+        chart = alt.Chart(frame).mark_rect().encode(
+            x=alt.X(f"{labels[0]}:O", axis=alt.Axis(labelOverlap=True)),
+            y=alt.Y(f"{labels[1]}:O", sort='descending', axis=alt.Axis(labelOverlap=True)),
+            color=alt.Color('price:Q', title='Цена, USD', scale=alt.Scale(scheme='viridis')),
+            tooltip=[labels[0], labels[1], alt.Tooltip('price:Q', format=',.0f'),
+                     alt.Tooltip('premium_proba:Q', title='Премиум, %', format='.0f')],
+        )
+        st.altair_chart(chart, use_container_width=True)
+    st.caption(f"Сетка из {len(frame)} точек посчитана одним пакетом")
+
+@st.cache_data
+def get_importance_table(kind, version):
+    """Таблица важности считается один раз на версию модели (version - подпись файла)"""
+    from src.analysis.importance import IMPORTANCE_CHARTS, importance_table
+
+    model = get_model_registry().get(IMPORTANCE_CHARTS[kind]['model'])
+    return importance_table(model)
+
+
+@st.cache_resource
+def get_importance_figure(kind, version):
+    """График важности строится один раз на версию модели и переиспользуется всеми сессиями"""
+    from src.analysis.importance import IMPORTANCE_CHARTS, importance_figure
+
+    chart = IMPORTANCE_CHARTS[kind]
+    return importance_figure(get_importance_table(kind, version), chart['title'], chart['palette'])
+
+
+def show_importance(kind):
+    from src.analysis.importance import IMPORTANCE_CHARTS, importance_png_path, is_png_fresh
+
+    registry = get_model_registry()
+    try:
+        version = registry.signature(IMPORTANCE_CHARTS[kind]['model'])
+    except Exception as e:
+        st.error(f"Ошибка загрузки моделей: {e}")
+        return
+
+    importance_df = get_importance_table(kind, version)
+    st.bar_chart(importance_df.set_index('feature')['importance'])
+    # Заранее отрисованный при сохранении моделей PNG не требует ни модели, ни matplotlib
+    if is_png_fresh(registry.models_dir, kind):
+        st.image(importance_png_path(registry.models_dir, kind))
+    else:
+        st.pyplot(get_importance_figure(kind, version))
+
 
 def show_analysis_page():
     st.header("📈 Анализ моделей")
@@ -409,62 +565,10 @@ def show_analysis_page():
 
     with tab1:
         st.subheader("🔧 Важность признаков для предсказания цены")
-
-        # Берем ЛУЧШУЮ модель из RandomizedSearchCV
-        best_model_reg = model_reg.best_estimator_ if hasattr(model_reg, 'best_estimator_') else model_reg
-
-        # Получаем важность признаков
-        feature_importance_reg = best_model_reg.feature_importances_
-        features_reg = best_model_reg.feature_names_in_
-
-        # Создаём DataFrame
-        importance_df_reg = pd.DataFrame({
-            'feature': features_reg,
-            'importance': feature_importance_reg
-        }).sort_values('importance', ascending=False).head(10)  # Уменьшили до 10
-
-        # Строим график с тёмной темой
-        fig_reg, ax_reg = plt.subplots(figsize=(10, 6))
-        sns.set_style("darkgrid")
-        sns.barplot(data=importance_df_reg, y='feature', x='importance', ax=ax_reg,
-                    palette="viridis")
-        ax_reg.set_title('Топ-10 важных признаков для предсказания цены',
-                         color='white', pad=20)
-        ax_reg.set_xlabel('Важность', color='white')
-        ax_reg.set_ylabel('Признаки', color='white')
-        ax_reg.tick_params(colors='white')
-        fig_reg.patch.set_facecolor('#0E1117')
-        ax_reg.set_facecolor('#0E1117')
-        importance_df_reg = importance_df_reg.set_index('feature')
-        st.bar_chart(importance_df_reg['importance'])
-        st.pyplot(fig_reg)
+        show_importance('regression')
 
         st.subheader("🏷️ Важность признаков для классификации")
-
-        best_model_clf = model_clf.best_estimator_ if hasattr(model_clf, 'best_estimator_') else model_clf
-        feature_importance_clf = best_model_clf.feature_importances_
-        features_clf = best_model_clf.feature_names_in_
-
-        importance_df_clf = pd.DataFrame({
-            'feature': features_clf,
-            'importance': feature_importance_clf
-        }).sort_values('importance', ascending=False).head(10)
-
-        fig_clf, ax_clf = plt.subplots(figsize=(10, 6))
-        sns.set_style("darkgrid")
-        sns.barplot(data=importance_df_clf, y='feature', x='importance', ax=ax_clf,
-                    palette="plasma")
-        ax_clf.set_title('Топ-10 важных признаков для классификации',
-                         color='white', pad=20)
-        ax_clf.set_xlabel('Важность', color='white')
-        ax_clf.set_ylabel('Признаки', color='white')
-        ax_clf.tick_params(colors='white')
-        fig_clf.patch.set_facecolor('#0E1117')
-        ax_clf.set_facecolor('#0E1117')
-        importance_df_clf = importance_df_clf.set_index('feature')
-        st.bar_chart(importance_df_clf['importance'])
-
-        st.pyplot(fig_clf)
+        show_importance('classifier')
 
     with tab2:
         with tab2:
@@ -573,4 +677,9 @@ elif page == "Анализ модели":
     show_analysis_page()
 
 st.sidebar.markdown("---")
+load_times = get_model_registry().stats()['load_times']
+if load_times:
+    with st.sidebar.expander("⏱ Загрузка моделей"):
+        for name, seconds in load_times.items():
+            st.caption(f"{name}: {seconds * 1000:.0f} мс")
 st.sidebar.write("© 2024 Car Price Prediction App")
\ No newline at end of file
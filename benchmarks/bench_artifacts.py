@@ -0,0 +1,103 @@
+"""
+Бенчмарк форматов артефактов: joblib-модели, slim_bundle.pkl и упакованный slim_bundle.bin
+(memmap и чтение в память). Для каждого формата - размер файлов, время загрузки в чистом процессе
+и PSS на процесс, когда несколько воркеров одновременно держат загруженную модель
+(страницы memmap делятся между процессами через page cache)
+
+Запуск из корня проекта:
+    python benchmarks/bench_artifacts.py --models-dir models
+    python benchmarks/bench_artifacts.py --models-dir models --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.inference.packed import PACKED_BUNDLE
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL
+from src.inference.slim import SLIM_BUNDLE
+
+# Формат: (файлы, импорт, загрузка). Время загрузки считается без импорта модулей
+LOADERS = {
+    'joblib models': ([REGRESSION_MODEL, CLASSIFIER_MODEL],
+                      "from src.inference.batch import BatchPredictor",
+                      "predictor = BatchPredictor.from_dir(models_dir)"),
+    'slim pkl': ([SLIM_BUNDLE],
+                 "from src.inference.slim import SlimPredictor",
+                 "predictor = SlimPredictor.load(os.path.join(models_dir, 'slim_bundle.pkl'))"),
+    'packed, read': ([PACKED_BUNDLE],
+                     "from src.inference.packed import load_packed",
+                     "predictor = load_packed(os.path.join(models_dir, 'slim_bundle.bin'), memory_map=False)"),
+    'packed, memmap': ([PACKED_BUNDLE],
+                       "from src.inference.packed import load_packed",
+                       "predictor = load_packed(os.path.join(models_dir, 'slim_bundle.bin'))"),
+}
+
+# Дочерний процесс: загрузка, чтение всех массивов узлов (страницы memmap попадают в процесс),
+# отчёт и ожидание родителя, пока он не снимет PSS со всех воркеров
+CHILD = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+models_dir = {models_dir!r}
+{imports}
+start = time.perf_counter()
+{load}
+load_ms = (time.perf_counter() - start) * 1000
+forest = getattr(predictor, 'forest', None)
+for name in getattr(forest, 'ARRAYS', []):
+    if getattr(forest, name) is not None:
+        getattr(forest, name).sum()
+print(json.dumps({{'load_ms': load_ms}}), flush=True)
+sys.stdin.readline()
+"""
+
+
+def pss_mb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def run_workers(imports, load, models_dir, workers):
+    """Время загрузки (медиана по воркерам) и средний PSS при workers одновременно живых процессах"""
+    script = CHILD.format(root=project_root, models_dir=models_dir, imports=imports, load=load)
+    processes = [subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True, cwd=project_root)
+                 for _ in range(workers)]
+    try:
+        reports = [json.loads(process.stdout.readline()) for process in processes]
+        pss = [pss_mb(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    load_ms = sorted(report['load_ms'] for report in reports)[len(reports) // 2]
+    return load_ms, sum(pss) / len(pss)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=os.path.join(project_root, 'models'))
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    models_dir = os.path.abspath(args.models_dir)
+
+    if not os.path.exists(os.path.join(models_dir, PACKED_BUNDLE)):
+        from src.inference.slim import export_slim_bundle
+        export_slim_bundle(models_dir)
+
+    print(f"{'format':>16} {'size, KB':>9} {'load, ms':>9} {'PSS/worker, MB':>15}  (workers={args.workers})")
+    for name, (files, imports, load) in LOADERS.items():
+        size = sum(os.path.getsize(os.path.join(models_dir, file)) for file in files) / 1024
+        load_ms, pss = run_workers(imports, load, models_dir, args.workers)
+        print(f"{name:>16} {size:>9.0f} {load_ms:>9.1f} {pss:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Бенчмарк скомпилированного леса против model.predict из sklearn
+и проверка побитного совпадения предсказаний
+
+Запуск из корня проекта:
+    python benchmarks/bench_compiled_forest.py --models-dir models
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data
+from src.inference.batch import BatchPredictor, MODELS_DIR
+from src.inference.forest import CompiledForest, FusedForestPredictor
+
+
+def best_time(func, X, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parity(model, compiled, X):
+    """Предсказания скомпилированного леса должны совпадать с sklearn побитно"""
+    assert np.array_equal(model.predict(X), compiled.predict(X.to_numpy())), "predict не совпадает"
+    if compiled.is_classifier:
+        assert np.array_equal(model.predict_proba(X), compiled.predict_proba(X.to_numpy())), \
+            "predict_proba не совпадает"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--sizes', default='1,64,10000')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    predictor = BatchPredictor.from_dir(args.models_dir)
+    data = load_car_data()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    X_all = predictor.build_features(data.sample(n=max(sizes), replace=True, random_state=42))
+
+    print(f"{'model':>12} {'rows':>8} {'sklearn, ms':>12} {'compiled, ms':>13} {'speedup':>8}")
+    for name, model in [('regression', predictor.model_reg), ('classifier', predictor.model_clf)]:
+        compiled = CompiledForest(model)
+        for n_rows in sizes:
+            X = X_all.iloc[:n_rows]
+            check_parity(model, compiled, X)
+            sklearn_time = best_time(model.predict, X, args.repeats)
+            compiled_time = best_time(compiled.predict, X.to_numpy(), args.repeats)
+            print(f"{name:>12} {n_rows:>8} {sklearn_time * 1e3:>12.2f} {compiled_time * 1e3:>13.2f} "
+                  f"{sklearn_time / compiled_time:>7.1f}x")
+
+    # Оба леса за один обход против двух отдельных вызовов predict
+    fused = FusedForestPredictor(predictor.model_reg, predictor.model_clf)
+    both = lambda X: (predictor.model_reg.predict(X), predictor.model_clf.predict(X))
+    for n_rows in sizes:
+        X = X_all.iloc[:n_rows]
+        result = fused.predict(X.to_numpy())
+        assert np.array_equal(result.price, predictor.model_reg.predict(X))
+        assert np.array_equal(result.is_premium, predictor.model_clf.predict(X))
+        sklearn_time = best_time(both, X, args.repeats)
+        fused_time = best_time(fused.predict, X.to_numpy(), args.repeats)
+        print(f"{'fused':>12} {n_rows:>8} {sklearn_time * 1e3:>12.2f} {fused_time * 1e3:>13.2f} "
+              f"{sklearn_time / fused_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк вкладов признаков: пакетное разложение по путям на массивах FusedForestPredictor
+против предсказания того же пакета и против построчного разложения через decision_path sklearn.
+Проверяется, что bias + сумма вкладов совпадает с предсказанием и что вклады совпадают с построчными
+
+Запуск из корня проекта:
+    python benchmarks/bench_explain.py --models-dir models
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data
+from src.inference.batch import BatchPredictor, MODELS_DIR
+from src.inference.explain import Explainer
+from src.inference.slim import SlimPredictor
+
+
+def best_time(func, X, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def decision_path_contributions(model, X):
+    """Построчное разложение цены через decision_path каждого дерева sklearn (эталон)"""
+    X = np.asarray(X, dtype=np.float32)
+    contributions = np.zeros(X.shape)
+    for i in range(len(X)):
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            path = estimator.decision_path(X[i:i + 1]).indices
+            values = tree.value[path, 0, 0]
+            np.add.at(contributions[i], tree.feature[path[:-1]], np.diff(values))
+    return contributions / len(model.estimators_)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--sizes', default='1,64,1000,10000')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--reference-rows', type=int, default=20, help='Строк для построчного эталона')
+    args = parser.parse_args()
+
+    predictor = BatchPredictor.from_dir(args.models_dir)
+    slim = SlimPredictor.from_batch_predictor(predictor)
+    explainer = Explainer(slim)
+    data = load_car_data()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    X_all = predictor.build_array(data.sample(n=max(sizes), replace=True, random_state=42)).astype(np.float32)
+
+    # Вклады без свёртки One-Hot должны совпадать с построчным разложением sklearn
+    X_reference = X_all[:args.reference_rows]
+    start = time.perf_counter()
+    reference = decision_path_contributions(predictor.model_reg, X_reference)
+    reference_ms = (time.perf_counter() - start) * 1000 / len(X_reference)
+    assert np.allclose(explainer.feature_contributions(X_reference)[0], reference), "вклады не совпадают с эталоном"
+    print(f"decision_path по строке: {reference_ms:.2f} ms")
+
+    print(f"{'rows':>8} {'predict, ms':>12} {'explain, ms':>12} {'ratio':>6} {'per row, us':>12} {'max error':>10}")
+    for n_rows in sizes:
+        X = X_all[:n_rows]
+        explanation = explainer.explain_array(X)
+        prediction = slim.predict_array(X)
+        error = max(np.abs(explanation.prediction('price') - prediction.price).max(),
+                    np.abs(explanation.prediction('premium_proba') - prediction.premium_proba).max())
+        predict_time = best_time(slim.predict_array, X, args.repeats)
+        explain_time = best_time(explainer.explain_array, X, args.repeats)
+        print(f"{n_rows:>8} {predict_time * 1e3:>12.2f} {explain_time * 1e3:>12.2f} "
+              f"{explain_time / predict_time:>6.2f} {explain_time * 1e6 / n_rows:>12.1f} {error:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Бенчмарк инкрементального дообучения: полное переобучение на истории + новых данных
+против update_models() только на новых данных. Печатает время, совпадение листьев старых деревьев
+до и после пересчёта порогов и R² на отложенной выборке для базовой, дообученной и переобученной моделей
+
+Запуск из корня проекта:
+    python benchmarks/bench_incremental.py
+    python benchmarks/bench_incremental.py --history 200000 --delta 5000 --trees 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import r2_score
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.synthetic import generate_car_data
+from src.features.preprocessing import CarPricePreprocessor
+from src.features.target_engineering import premium_thresholds
+from src.inference.batch import load_artifacts
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL
+from src.models.incremental import premium_labels, update_models
+
+
+def features(preprocessor, model, df):
+    names = list(model.feature_names_in_)
+    return pd.DataFrame(preprocessor.transform_array(df, names, dtype=np.float64), columns=names)
+
+
+def train_models(df, models_dir, n_trees, thresholds):
+    """Полное обучение препроцессора и обоих лесов, сохранение как после ноутбуков"""
+    preprocessor = CarPricePreprocessor(models_dir=None).fit(df, 'price')
+    X = pd.DataFrame(preprocessor.transform_array(df, dtype=np.float64), columns=preprocessor.feature_names)
+    model_reg = RandomForestRegressor(n_trees, random_state=42, n_jobs=-1).fit(X, df['price'])
+    model_clf = RandomForestClassifier(n_trees, random_state=42, n_jobs=-1).fit(X, premium_labels(df, thresholds))
+
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump(model_reg, os.path.join(models_dir, REGRESSION_MODEL))
+    joblib.dump(model_clf, os.path.join(models_dir, CLASSIFIER_MODEL))
+    preprocessor.save_legacy_artifacts(models_dir)
+    preprocessor.save(os.path.join(models_dir, 'preprocessor.pkl'))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--history', type=int, default=50_000, help='Строк в исходном обучении')
+    parser.add_argument('--delta', type=int, default=2_000, help='Строк новых данных')
+    parser.add_argument('--holdout', type=int, default=10_000)
+    parser.add_argument('--base-trees', type=int, default=100)
+    parser.add_argument('--trees', type=int, default=20, help='Деревьев, добавляемых при дообучении')
+    parser.add_argument('--drift', type=float, default=1.05, help='Множитель цен в новых данных')
+    args = parser.parse_args()
+
+    history = generate_car_data(args.history, seed=0)
+    delta = generate_car_data(args.delta, seed=1, start_id=args.history + 1)
+    holdout = generate_car_data(args.holdout, seed=2)
+    for df in (delta, holdout):
+        df['price'] = df['price'] * args.drift
+    thresholds = premium_thresholds(history)
+
+    work_dir = tempfile.mkdtemp(prefix='car_incremental_')
+    try:
+        base_dir, inc_dir, full_dir = (os.path.join(work_dir, name) for name in ('base', 'incremental', 'full'))
+        train_models(history, base_dir, args.base_trees, thresholds)
+        shutil.copytree(base_dir, inc_dir)
+
+        # 1. Время: полное переобучение против дообучения на delta
+        full_seconds, _ = timed(lambda: train_models(pd.concat([history, delta], ignore_index=True), full_dir,
+                                                     args.base_trees, thresholds))
+        inc_seconds, stats = timed(lambda: update_models(delta, inc_dir, n_trees=args.trees, thresholds=thresholds))
+
+        base, inc, full = (load_artifacts(path) for path in (base_dir, inc_dir, full_dir))
+
+        # 2. Старые деревья после пересчёта порогов: те же листья на тех же строках
+        X_before = features(base['preprocessor'], base['model_reg'], holdout).to_numpy(np.float32)
+        X_after = features(inc['preprocessor'], inc['model_reg'], holdout).to_numpy(np.float32)
+        old_trees = zip(base['model_reg'].estimators_, inc['model_reg'].estimators_[:args.base_trees])
+        agreement = np.mean([np.mean(before.apply(X_before) == after.apply(X_after)) for before, after in old_trees])
+
+        # 3. Качество на отложенной выборке с той же инфляцией цен, что и в delta
+        scores = {name: r2_score(holdout['price'],
+                                 artifacts['model_reg'].predict(features(artifacts['preprocessor'],
+                                                                         artifacts['model_reg'], holdout)))
+                  for name, artifacts in (('base', base), ('incremental', inc), ('full retrain', full))}
+    finally:
+        shutil.rmtree(work_dir)
+
+    print(f"history={args.history} delta={args.delta} trees: base {args.base_trees}, +{args.trees}")
+    print(f"{'full retrain, s':>24} {full_seconds:>9.2f}")
+    print(f"{'incremental, s':>24} {inc_seconds:>9.2f}  (fit {stats['fit_seconds']:.2f})")
+    print(f"{'old trees leaf match':>24} {agreement:>9.4%}")
+    for name, score in scores.items():
+        print(f"{'R2 ' + name:>24} {score:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
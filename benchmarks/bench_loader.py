@@ -0,0 +1,66 @@
+"""
+Бенчмарк загрузки данных: pd.read_csv с типами по умолчанию против типизированного загрузчика
+с кэшем в feather/Parquet (первый разбор, повторное чтение, mmap). Память - memory_usage(deep=True)
+
+Запуск из корня проекта:
+    python benchmarks/bench_loader.py
+    python benchmarks/bench_loader.py --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import DATA_PATH, load_car_data_typed
+from src.data.synthetic import write_synthetic_csv
+
+
+def timed(fn, repeats):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=0, help='Синтетический CSV на rows строк, 0 - car_data.csv')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='car_loader_')
+    try:
+        path = write_synthetic_csv(os.path.join(work_dir, 'cars.csv'), args.rows) if args.rows else DATA_PATH
+        cache_dir = os.path.join(work_dir, 'cache')
+
+        cases = [
+            ('read_csv (defaults)', lambda: pd.read_csv(path), args.repeats),
+            ('typed, cold (parse + cache)', lambda: load_car_data_typed(path, cache_dir=cache_dir), 1),
+            ('typed, feather cache', lambda: load_car_data_typed(path, cache_dir=cache_dir), args.repeats),
+            ('typed, feather mmap', lambda: load_car_data_typed(path, cache_dir=cache_dir, memory_map=True),
+             args.repeats),
+            ('typed, parquet cold', lambda: load_car_data_typed(path, cache_dir=cache_dir, format='parquet'), 1),
+            ('typed, parquet cache', lambda: load_car_data_typed(path, cache_dir=cache_dir, format='parquet'),
+             args.repeats),
+        ]
+
+        print(f"{'loader':>28} {'seconds':>9} {'memory, MB':>11}")
+        for name, fn, repeats in cases:
+            seconds, df = timed(fn, repeats)
+            memory = df.memory_usage(deep=True).sum() / 2 ** 20
+            print(f"{name:>28} {seconds:>9.4f} {memory:>11.2f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
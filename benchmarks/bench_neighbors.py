@@ -0,0 +1,76 @@
+"""
+Бенчмарк индекса похожих машин: построение, top-k одной машины (p50/p99), поиск с заполненным
+дельта-буфером, совпадение с полным перебором, размер файла и загрузка
+
+Запуск из корня проекта:
+    python benchmarks/bench_neighbors.py --models-dir models
+    python benchmarks/bench_neighbors.py --rows 100000,1000000 --k 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.synthetic import generate_car_data
+from src.inference.neighbors import ComparablesIndex
+from src.inference.registry import MODELS_DIR, get_registry
+
+
+def query_latencies(index, X, k):
+    latencies = []
+    for row in X:
+        start = time.perf_counter()
+        index.query(row, k)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(latencies, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--rows', default='10000,100000,1000000')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--delta', type=int, default=1000, help='Строк в дельта-буфере')
+    args = parser.parse_args()
+
+    predictor = get_registry(args.models_dir).slim_predictor().predictor
+    queries = generate_car_data(args.queries, seed=7)
+    X_queries = predictor.encoder.encode(predictor.prepare_columns(queries), dtype=np.float32)
+
+    print(f"{'rows':>9} {'build, s':>9} {'p50, ms':>8} {'p99, ms':>8} {'+delta p50':>11} {'exact':>6} "
+          f"{'file, MB':>9} {'load, s':>8}")
+    for n_rows in [int(rows) for rows in args.rows.split(',')]:
+        df = generate_car_data(n_rows, seed=0)
+        start = time.perf_counter()
+        index = ComparablesIndex.from_predictor(predictor, df, min_rebuild_rows=args.delta + 1)
+        build_seconds = time.perf_counter() - start
+        p50, p99 = query_latencies(index, X_queries, args.k)
+
+        # Совпадение с полным перебором на первых запросах (расстояния k-го соседа)
+        exact = []
+        for row in X_queries[:20]:
+            brute = np.sort(np.sqrt(((index.X.astype(np.float64) - row) ** 2).sum(axis=1)))[:args.k]
+            exact.append(np.allclose(index.query(row, args.k)[0][0], brute, rtol=1e-6))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = index.save(os.path.join(tmp_dir, 'index.pkl'))
+            size_mb = os.path.getsize(path) / 1024 ** 2
+            start = time.perf_counter()
+            ComparablesIndex.load(path)
+            load_seconds = time.perf_counter() - start
+
+        index.add(ComparablesIndex.prepare(predictor, generate_car_data(args.delta, seed=1)))
+        delta_p50, _ = query_latencies(index, X_queries, args.k)
+        print(f"{n_rows:>9} {build_seconds:>9.2f} {p50:>8.3f} {p99:>8.3f} {delta_p50:>11.3f} "
+              f"{np.mean(exact):>6.0%} {size_mb:>9.1f} {load_seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Бенчмарк масштабирования ParallelTransformer: transform_array обученного препроцессора
+на синтетических данных для 1..N процессов, с проверкой побитного совпадения с последовательным путём
+
+Запуск из корня проекта:
+    python benchmarks/bench_parallel_transform.py --models-dir models
+    python benchmarks/bench_parallel_transform.py --rows 5000000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.synthetic import generate_car_data
+from src.features.parallel import ParallelTransformer
+from src.inference.batch import MODELS_DIR, load_artifacts
+
+
+def bench(fn, repeats):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    # Один воркер - это последовательный путь (строка serial)
+    parser.add_argument('--workers', default=','.join(str(n) for n in range(2, max(os.cpu_count() or 1, 2) + 1)))
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    artifacts = load_artifacts(args.models_dir)
+    preprocessor = artifacts['preprocessor']
+    feature_names = list(artifacts['model_reg'].feature_names_in_)
+    df = generate_car_data(args.rows)
+    print(f"{args.rows:,} строк, CPU: {os.cpu_count()}")
+
+    serial, expected = bench(lambda: preprocessor.transform_array(df, feature_names), args.repeats)
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+    print(f"{'1':>8} {serial:>9.3f} {1.0:>8.2f} {'-':>10}")
+
+    for n_workers in [int(value) for value in args.workers.split(',')]:
+        with ParallelTransformer(preprocessor, n_workers, min_rows=0) as transformer:
+            transformer.transform_array(df.head(1000), feature_names)  # старт пула
+            seconds, X = bench(lambda: transformer.transform_array(df, feature_names), args.repeats)
+        print(f"{n_workers:>8} {seconds:>9.3f} {serial / seconds:>8.2f} {str(np.array_equal(X, expected)):>10}")
+
+
+if __name__ == '__main__':
+    main()
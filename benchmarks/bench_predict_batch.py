@@ -0,0 +1,54 @@
+"""
+Бенчмарк пакетного инференса: пропускная способность predict_batch (строк/сек)
+
+Запуск из корня проекта:
+    python benchmarks/bench_predict_batch.py --models-dir models
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data
+from src.inference.batch import BatchPredictor, MODELS_DIR, predict_batch
+
+
+def sample_rows(df, n_rows, seed=42):
+    """Случайная выборка с возвращением из car_data.csv нужного размера"""
+    return df.sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def bench(predictor, df, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_batch(df, predictor)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--sizes', default='1,1000,100000')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--compiled', action='store_true', help='FusedForestPredictor для малых пакетов')
+    args = parser.parse_args()
+
+    predictor = BatchPredictor.from_dir(args.models_dir, compiled=args.compiled)
+    data = load_car_data()
+
+    print(f"{'rows':>10} {'seconds':>10} {'rows/sec':>12}")
+    for n_rows in [int(size) for size in args.sizes.split(',')]:
+        df = sample_rows(data, n_rows)
+        seconds = bench(predictor, df, args.repeats)
+        print(f"{n_rows:>10} {seconds:>10.4f} {n_rows / seconds:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Нагрузочный тест HTTP-сервиса скоринга: concurrency клиентов шлют по одной машине в POST /predict.
+Сервис запускается в отдельном процессе для каждого окна батчинга, сравниваются задержки
+p50/p99 на клиенте и пропускная способность с микробатчингом и без него
+
+Запуск из корня проекта:
+    python benchmarks/bench_service.py --models-dir models
+    python benchmarks/bench_service.py --max-wait-ms 0,1,2,5 --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data
+from src.inference.registry import MODELS_DIR
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def sample_records(n_records, seed=42):
+    """Уникальные строки из car_data.csv с шумом в числовых колонках, чтобы не попадать в кэш"""
+    df = load_car_data().drop(columns=['price', 'car_ID'])
+    df = df.sample(n=n_records, replace=True, random_state=seed).reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    df['curbweight'] = df['curbweight'] + rng.uniform(-50, 50, len(df))
+    return df.to_dict(orient='records')
+
+
+async def wait_ready(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.fetch(f"{url}/health")
+            return
+        except (ConnectionError, HTTPClientError, OSError):
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Сервис не запустился")
+
+
+async def run_load(url, records, concurrency):
+    client = AsyncHTTPClient(max_clients=concurrency)
+    await wait_ready(client, url)
+    # Прогрев: первая загрузка моделей и JIT-кэши numpy
+    for record in records[:20]:
+        await client.fetch(f"{url}/predict", method='POST', body=json.dumps(record))
+
+    queue = list(enumerate(records))
+    latencies = [None] * len(records)
+
+    async def worker():
+        while queue:
+            i, record = queue.pop()
+            start = time.perf_counter()
+            await client.fetch(f"{url}/predict", method='POST', body=json.dumps(record))
+            latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    metrics = json.loads((await client.fetch(f"{url}/metrics")).body)
+    client.close()
+    return np.array(latencies), elapsed, metrics
+
+
+def bench(models_dir, max_wait_ms, records, concurrency):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'src.services.scoring', '--port', str(port),
+         '--models-dir', models_dir, '--max-wait-ms', str(max_wait_ms)],
+        cwd=project_root, stdout=subprocess.DEVNULL,
+    )
+    try:
+        return asyncio.run(run_load(f"http://127.0.0.1:{port}", records, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--max-wait-ms', default='0,2')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    records = sample_records(args.requests)
+
+    print(f"{'max_wait_ms':>11} {'req/sec':>9} {'p50_ms':>8} {'p99_ms':>8} {'batches':>8} {'rows/batch':>10}")
+    for max_wait_ms in [float(value) for value in args.max_wait_ms.split(',')]:
+        latencies, elapsed, metrics = bench(args.models_dir, max_wait_ms, records, args.concurrency)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        batching = metrics['batching']
+        print(f"{max_wait_ms:>11g} {len(records) / elapsed:>9,.0f} {p50:>8.2f} {p99:>8.2f} "
+              f"{batching['batches']:>8} {batching['mean_batch_rows']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
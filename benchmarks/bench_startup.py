@@ -0,0 +1,70 @@
+"""
+Бенчмарк холодного старта: время импорта модулей по python -X importtime.
+Каждая цель импортируется в отдельном чистом процессе
+
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'slim inference': 'import src.inference.slim',
+    'model registry': 'import src.inference.registry',
+    'batch inference': 'import src.inference.batch',
+    'app imports (before)': 'import streamlit, pandas, numpy, joblib, matplotlib.pyplot, seaborn, requests',
+    # Модули, которые app.py импортирует на верхнем уровне
+    'app imports (now)': 'import streamlit, src.inference.registry, src.services.exchange_rate, '
+                         'src.services.instrumentation',
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(statement, repeats):
+    """Суммарное время импорта (мкс) верхнеуровневых модулей, лучшее из repeats запусков"""
+    best, top_modules = None, None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                cwd=project_root, capture_output=True, text=True, check=True)
+        total, modules = 0, []
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            # Верхний уровень вложенности в выводе importtime - один пробел перед именем модуля
+            if match and len(match.group(3)) == 1:
+                cumulative = int(match.group(2))
+                total += cumulative
+                modules.append((match.group(4), cumulative))
+        if best is None or total < best:
+            best, top_modules = total, sorted(modules, key=lambda item: -item[1])[:5]
+    return best, top_modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', help='Путь для сохранения результатов')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'target':>22} {'import, ms':>11}  top modules")
+    for name, statement in TARGETS.items():
+        total, modules = measure(statement, args.repeats)
+        results[name] = {'statement': statement, 'import_ms': total / 1000, 'top_modules': modules}
+        top = ', '.join(f"{module} {micros / 1000:.0f}" for module, micros in modules)
+        print(f"{name:>22} {total / 1000:>11.1f}  {top}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Бенчмарк потокового скоринга: синтетический CSV на rows строк -> score_file -> Parquet/CSV.
+Скоринг запускается в отдельном процессе, пиковый RSS берётся из его VmHWM
+(ru_maxrss наследуется через fork/exec и включал бы память генерации данных)
+
+Запуск из корня проекта:
+    python benchmarks/bench_streaming.py --models-dir models
+    python benchmarks/bench_streaming.py --rows 100000,1000000 --chunksize 50000 --format csv
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.synthetic import write_synthetic_csv
+from src.inference.batch import MODELS_DIR
+
+CHILD = """
+import json, resource, sys, warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+from src.inference.streaming import score_file
+stats = score_file(sys.argv[1], sys.argv[2], chunksize=int(sys.argv[3]), models_dir=sys.argv[4])
+try:
+    with open('/proc/self/status') as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+stats['peak_rss_mb'] = peak_kb / 1024
+print(json.dumps(stats))
+"""
+
+
+def run_scoring(input_path, output_path, chunksize, models_dir):
+    result = subprocess.run([sys.executable, '-c', CHILD, input_path, output_path, str(chunksize), models_dir],
+                            cwd=project_root, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--rows', default='10000000')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--data-dir', default=None, help='Папка для синтетических CSV (по умолчанию временная)')
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='car_stream_')
+    print(f"{'rows':>11} {'input, MB':>10} {'seconds':>9} {'rows/sec':>11} {'peak RSS, MB':>13}")
+    for n_rows in [int(value) for value in args.rows.split(',')]:
+        input_path = os.path.join(data_dir, f"synthetic_{n_rows}.csv")
+        if not os.path.exists(input_path):
+            write_synthetic_csv(input_path, n_rows)
+        output_path = os.path.join(data_dir, f"predictions_{n_rows}.{args.format}")
+
+        stats = run_scoring(input_path, output_path, args.chunksize, args.models_dir)
+        size_mb = os.path.getsize(input_path) / 2 ** 20
+        print(f"{n_rows:>11,} {size_mb:>10.0f} {stats['seconds']:>9.1f} "
+              f"{stats['rows'] / stats['seconds']:>11,.0f} {stats['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Набор бенчмарков предобработки, обучения и инференса на синтетических данных в формате car_data.csv.
+
+run: для каждого размера генерирует данные (фиксированный seed), замеряет этапы и пишет JSON
+с результатами и описанием машины:
+    load        - load_car_data() (исходный CSV), чтение синтетического CSV как в load_car_data
+                  и типизированное чтение read_car_data_typed
+    preprocess  - шаги CarPricePreprocessor.fit_transform: _prepare, разбиение, _fit_encoders,
+                  _fit_scaler, кодирование train/test; fit_transform целиком, transform, transform_array
+    train       - RandomForestRegressor / RandomForestClassifier на X_train
+    inference   - одна строка через slim-предиктор (медиана), пакет через BatchPredictor
+
+compare: сравнивает два JSON по минимуму (или медиане) времени и помечает этапы, ставшие медленнее
+больше чем на threshold. Минимум по повторам меньше зависит от фоновой нагрузки.
+Код возврата 1, если есть регрессии
+
+Запуск из корня проекта:
+    python benchmarks/suite.py run --sizes 1000,10000 --output benchmarks/results/baseline.json
+    python benchmarks/suite.py run --sizes 1000,10000 --output benchmarks/results/new.json
+    python benchmarks/suite.py compare benchmarks/results/baseline.json benchmarks/results/new.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import train_test_split
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data, read_car_data_typed
+from src.data.synthetic import generate_car_data
+from src.features.preprocessing import CarPricePreprocessor
+from src.inference.batch import BatchPredictor
+from src.inference.slim import SlimPredictor
+from src.models.tuning import estimator_for
+
+RESULTS_DIR = os.path.join(project_root, 'benchmarks', 'results')
+SUITE_VERSION = 1
+
+
+def machine_info():
+    """Описание машины и окружения, без которого результаты разных запусков несравнимы"""
+    info = {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+    try:
+        with open('/proc/cpuinfo') as f:
+            info['cpu_model'] = next(line.split(':', 1)[1].strip() for line in f if line.startswith('model name'))
+    except (OSError, StopIteration):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            info['memory_gb'] = int(next(line.split()[1] for line in f if line.startswith('MemTotal'))) / 1024 ** 2
+    except (OSError, StopIteration):
+        pass
+    try:
+        info['git_commit'] = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=project_root, capture_output=True,
+                                            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['git_commit'] = None
+    return info
+
+
+class Timer:
+    """Замеры этапов: каждый этап повторяется repeats раз, сохраняются все времена"""
+
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.results = []
+
+    def measure(self, stage, rows, fn, repeats=None):
+        times, result = [], None
+        # Сообщения этапов (например, create_premium_target) не попадают в таблицу
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeats or self.repeats):
+                start = time.perf_counter()
+                result = fn()
+                times.append(time.perf_counter() - start)
+        self.results.append({'stage': stage, 'rows': rows, 'min_s': min(times),
+                             'median_s': float(np.median(times)), 'times': times})
+        print(f"{stage:>38} {rows:>9} {min(times) * 1000:>11.2f} {float(np.median(times)) * 1000:>11.2f}")
+        return result
+
+
+def bench_load(timer, df, work_dir):
+    path = os.path.join(work_dir, f"cars_{len(df)}.csv")
+    df.to_csv(path, index=False)
+    timer.measure('load/read_csv', len(df), lambda: pd.read_csv(path))
+    timer.measure('load/read_car_data_typed', len(df), lambda: read_car_data_typed(path))
+
+
+def bench_preprocess(timer, df, target):
+    """Шаги fit_transform по отдельности (в том же порядке), затем целиком"""
+    n = len(df)
+    preprocessor = CarPricePreprocessor(models_dir=None)
+    prefix = f"preprocess[{target}]"
+
+    # 1-5. Бренд, таргет, новые признаки, удаление столбцов, редкие бренды
+    df_processed = timer.measure(f"{prefix}/prepare", n, lambda: preprocessor._prepare(df, target))
+    X, y = df_processed.drop(target, axis=1), df_processed[target]
+    # 6-7. Разбиение
+    X_train, X_test, y_train, y_test = timer.measure(
+        f"{prefix}/split", n, lambda: train_test_split(X, y, test_size=0.2, random_state=42,
+                                                       stratify=df_processed['brand']))
+    # 8. Кодировщики и scaler
+    timer.measure(f"{prefix}/fit_encoders", n, lambda: preprocessor._fit_encoders(X_train, df_processed))
+    timer.measure(f"{prefix}/fit_scaler", n, lambda: preprocessor._fit_scaler(X_train, df_processed, target))
+    preprocessor._set_feature_names(X.columns)
+    preprocessor._compile()
+    # 9. Кодирование и масштабирование
+    timer.measure(f"{prefix}/encode", n, lambda: (preprocessor._transform_prepared(X_train),
+                                                  preprocessor._transform_prepared(X_test)))
+
+    split = timer.measure(f"{prefix}/fit_transform", n, lambda: preprocessor.fit_transform(df, target))
+    timer.measure(f"{prefix}/transform", n, lambda: preprocessor.transform(df))
+    timer.measure(f"{prefix}/transform_array", n, lambda: preprocessor.transform_array(df))
+    return preprocessor, split
+
+
+def bench_train(timer, split, target, n_trees, n_jobs):
+    X_train, _, y_train, _ = split
+    model = estimator_for(target, {'n_estimators': n_trees}).set_params(n_jobs=n_jobs)
+    name = 'train/regressor' if target == 'price' else 'train/classifier'
+    # Обучение долгое и почти не шумит - один повтор
+    return timer.measure(name, len(X_train), lambda: model.fit(X_train, y_train), repeats=1)
+
+
+def bench_inference(timer, df, preprocessor, model_reg, model_clf, single_repeats):
+    predictor = BatchPredictor(preprocessor, model_reg, model_clf)
+    slim = SlimPredictor.from_batch_predictor(predictor)
+
+    row = {column: df[column].to_numpy()[:1] for column in df.columns}
+    timer.measure('inference/single_row_slim', 1, lambda: slim.predict_rows(row), repeats=single_repeats)
+    timer.measure('inference/batch_slim', len(df), lambda: slim.predict_rows(df))
+    timer.measure('inference/batch_sklearn', len(df), lambda: predictor.predict(df))
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(',')]
+    timer = Timer(args.repeats)
+    work_dir = tempfile.mkdtemp(prefix='car_bench_')
+    print(f"{'stage':>38} {'rows':>9} {'min, ms':>11} {'median, ms':>11}")
+    try:
+        timer.measure('load/load_car_data', len(load_car_data()), load_car_data)
+        for size in sizes:
+            df = generate_car_data(size, seed=args.seed)
+            bench_load(timer, df, work_dir)
+            preprocessor, split = bench_preprocess(timer, df, 'price')
+            _, split_clf = bench_preprocess(timer, df, 'is_premium')
+            model_reg = bench_train(timer, split, 'price', args.trees, args.jobs)
+            model_clf = bench_train(timer, split_clf, 'is_premium', args.trees, args.jobs)
+            bench_inference(timer, df.drop(columns=['price']), preprocessor, model_reg, model_clf,
+                            args.single_repeats)
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {
+        'version': SUITE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': machine_info(),
+        'config': {'sizes': sizes, 'repeats': args.repeats, 'trees': args.trees, 'jobs': args.jobs,
+                   'seed': args.seed, 'single_repeats': args.single_repeats},
+        'results': timer.results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Результаты сохранены: {output}")
+
+
+def compare_reports(base, new, threshold=0.1, statistic='min_s'):
+    """Строки сравнения по общим (этап, строки): времена, отношение и флаг регрессии"""
+    base_results = {(result['stage'], result['rows']): result for result in base['results']}
+    rows = []
+    for result in new['results']:
+        key = (result['stage'], result['rows'])
+        if key not in base_results:
+            continue
+        base_time, new_time = base_results[key][statistic], result[statistic]
+        ratio = new_time / base_time if base_time > 0 else float('inf')
+        rows.append({'stage': key[0], 'rows': key[1], 'base_ms': base_time * 1000, 'new_ms': new_time * 1000,
+                     'ratio': ratio, 'regression': ratio > 1 + threshold,
+                     'improvement': ratio < 1 / (1 + threshold)})
+    return rows
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    differences = {key: (base['machine'].get(key), new['machine'].get(key))
+                   for key in ('cpu_model', 'cpu_count', 'python', 'numpy', 'pandas', 'sklearn')
+                   if base['machine'].get(key) != new['machine'].get(key)}
+    for key, (old_value, new_value) in differences.items():
+        print(f"⚠️  {key}: {old_value} -> {new_value}")
+    if base['config'] != new['config']:
+        print(f"⚠️  Разные параметры запуска: {base['config']} -> {new['config']}")
+
+    rows = compare_reports(base, new, args.threshold, f"{args.statistic}_s")
+    print(f"{'stage':>38} {'rows':>9} {'base, ms':>11} {'new, ms':>11} {'ratio':>7}")
+    for row in rows:
+        flag = '❌ регрессия' if row['regression'] else ('✅ быстрее' if row['improvement'] else '')
+        print(f"{row['stage']:>38} {row['rows']:>9} {row['base_ms']:>11.2f} {row['new_ms']:>11.2f} "
+              f"{row['ratio']:>7.2f}  {flag}")
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"❌ Регрессий больше {args.threshold:.0%}: {len(regressions)}")
+        sys.exit(1)
+    print(f"✅ Регрессий больше {args.threshold:.0%} нет")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--sizes', default='1000,10000,100000')
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--single-repeats', type=int, default=200, help='Повторов для одной строки')
+    run_parser.add_argument('--trees', type=int, default=100)
+    run_parser.add_argument('--jobs', type=int, default=-1)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', help=f"JSON с результатами, по умолчанию в {RESULTS_DIR}")
+
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Допустимое замедление, доля')
+    compare_parser.add_argument('--statistic', choices=['min', 'median'], default='min')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
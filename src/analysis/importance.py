@@ -0,0 +1,79 @@
+"""
+Таблицы и графики важности признаков для страницы анализа.
+Графики строятся на matplotlib.figure.Figure без глобального состояния pyplot,
+поэтому их можно кэшировать и отдавать из разных сессий
+"""
+import os
+import sys
+
+import pandas as pd
+
+IMPORTANCE_CHARTS = {
+    'regression': {
+        'model': 'random_forest_regression_final.pkl',
+        'title': 'Топ-10 важных признаков для предсказания цены',
+        'palette': 'viridis',
+    },
+    'classifier': {
+        'model': 'random_forest_classifier_final.pkl',
+        'title': 'Топ-10 важных признаков для классификации',
+        'palette': 'plasma',
+    },
+}
+
+
+def importance_png_path(models_dir, kind):
+    return os.path.join(models_dir, f'importance_{kind}.png')
+
+
+def importance_table(model, top=10):
+    """Топ признаков по feature_importances_ (для RandomizedSearchCV берётся лучшая модель)"""
+    best_model = model.best_estimator_ if hasattr(model, 'best_estimator_') else model
+    return pd.DataFrame({
+        'feature': best_model.feature_names_in_,
+        'importance': best_model.feature_importances_
+    }).sort_values('importance', ascending=False).head(top)
+
+
+def importance_figure(importance_df, title, palette):
+    """Горизонтальный barplot важности в тёмной теме приложения"""
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    sns.set_style("darkgrid")
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(data=importance_df, y='feature', x='importance', hue='feature', legend=False, ax=ax, palette=palette)
+    ax.set_title(title, color='white', pad=20)
+    ax.set_xlabel('Важность', color='white')
+    ax.set_ylabel('Признаки', color='white')
+    ax.tick_params(colors='white')
+    fig.patch.set_facecolor('#0E1117')
+    ax.set_facecolor('#0E1117')
+    return fig
+
+
+def is_png_fresh(models_dir, kind):
+    """PNG есть и сохранён не раньше модели, из которой построен"""
+    png_path = importance_png_path(models_dir, kind)
+    model_path = os.path.join(models_dir, IMPORTANCE_CHARTS[kind]['model'])
+    return os.path.exists(png_path) and os.path.getmtime(png_path) >= os.path.getmtime(model_path)
+
+
+def prerender_importance_charts(models_dir):
+    """Сохранение графиков важности в PNG рядом с моделями, вызывается после сохранения моделей"""
+    import joblib
+
+    paths = []
+    for kind, chart in IMPORTANCE_CHARTS.items():
+        model = joblib.load(os.path.join(models_dir, chart['model']))
+        fig = importance_figure(importance_table(model), chart['title'], chart['palette'])
+        path = importance_png_path(models_dir, kind)
+        fig.savefig(path, facecolor=fig.get_facecolor(), bbox_inches='tight')
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    for saved in prerender_importance_charts(sys.argv[1] if len(sys.argv) > 1 else 'models'):
+        print(f"✅ {saved}")
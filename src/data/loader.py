@@ -1,7 +1,103 @@
+import hashlib
 import pandas as pd
 import os
 
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../data/raw/car_data.csv')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../data/cache')
+
+# Схема car_data.csv: категории вместо object-строк, компактные числовые типы.
+# Признаки во float32 восстанавливаются к значениям из CSV (derived.restore_float64), цена остаётся
+# float64 - в ней бывает 8 значащих цифр (17859.167). Увеличивается при изменении схемы,
+# чтобы старый кэш не использовался
+SCHEMA_VERSION = 2
+CATEGORICAL_COLUMNS = ['CarName', 'fueltype', 'aspiration', 'doornumber', 'carbody', 'drivewheel',
+                       'enginelocation', 'enginetype', 'cylindernumber', 'fuelsystem']
+INTEGER_COLUMNS = {'car_ID': 'int32', 'symboling': 'int8'}
+FLOAT_COLUMNS = ['wheelbase', 'carlength', 'carwidth', 'carheight', 'curbweight', 'enginesize',
+                 'boreratio', 'stroke', 'compressionratio', 'horsepower', 'peakrpm', 'citympg',
+                 'highwaympg']
+CAR_DATA_DTYPES = {
+    **{column: 'category' for column in CATEGORICAL_COLUMNS},
+    **INTEGER_COLUMNS,
+    **{column: 'float32' for column in FLOAT_COLUMNS},
+    'price': 'float64',
+}
+
+
 def load_car_data():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     data_path = os.path.join(current_dir, '../../data/raw/car_data.csv')
-    return pd.read_csv(data_path)
\ No newline at end of file
+    return pd.read_csv(data_path)
+
+
+_digests = {}
+
+
+def file_digest(path):
+    """sha256 файла, в пределах процесса пересчитывается только при изменении mtime/размера"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _digests:
+        _digests[key] = _sha256(path)
+    return _digests[key]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_car_data_typed(path=DATA_PATH, add_brand=True):
+    """
+    Разбор CSV по схеме CAR_DATA_DTYPES. add_brand добавляет категориальную колонку brand
+    из CarName (бренд считается один раз на уникальное название, а не на строку)
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, dtype={column: dtype for column, dtype in CAR_DATA_DTYPES.items() if column in header})
+    if add_brand and 'CarName' in df:
+        from src.features.brands import brand_from_car_name
+        names = df['CarName'].cat.categories
+        df['brand'] = pd.Categorical(brand_from_car_name(names))[df['CarName'].cat.codes.to_numpy()]
+    return df
+
+
+def cache_path(path, cache_dir=CACHE_DIR, format='feather', add_brand=True):
+    """Путь кэша: имя исходного файла + sha256 содержимого + версия схемы"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    suffix = '' if add_brand else '.nobrand'
+    return os.path.join(cache_dir, f"{name}.{file_digest(path)[:16]}.v{SCHEMA_VERSION}{suffix}.{format}")
+
+
+def load_car_data_typed(path=DATA_PATH, cache_dir=CACHE_DIR, format='feather', memory_map=False, add_brand=True):
+    """
+    car_data.csv в типизированном виде с кэшем в Parquet или Arrow (feather).
+    Кэш привязан к хэшу исходного файла: изменённый CSV разбирается заново.
+    memory_map=True открывает feather-кэш через mmap, числовые колонки не копируются в память процесса
+    """
+    if format not in ('feather', 'parquet'):
+        raise ValueError(f"Неизвестный формат кэша: {format}")
+    if cache_dir is None:
+        return read_car_data_typed(path, add_brand)
+
+    cached = cache_path(path, cache_dir, format, add_brand)
+    if not os.path.exists(cached):
+        df = read_car_data_typed(path, add_brand)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Запись во временный файл и переименование: параллельный читатель не увидит недописанный кэш
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        if format == 'feather':
+            # Без сжатия, иначе mmap не даёт чтения без копирования
+            df.to_feather(tmp, compression='uncompressed')
+        else:
+            df.to_parquet(tmp, index=False)
+        os.replace(tmp, cached)
+        return df
+
+    if format == 'feather':
+        import pyarrow.feather as feather
+        table = feather.read_table(cached, memory_map=memory_map)
+        return table.to_pandas(split_blocks=True)
+    return pd.read_parquet(cached, memory_map=memory_map)
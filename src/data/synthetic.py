@@ -0,0 +1,42 @@
+"""
+Синтетические данные в формате car_data.csv для бенчмарков: строки исходного датасета,
+выбранные с возвращением, с небольшим шумом в числовых колонках. Категории остаются
+из обучающих данных, поэтому обученный препроцессор кодирует их без ошибок
+"""
+import os
+
+import numpy as np
+
+from src.data.loader import load_car_data
+
+# Относительный шум числовых колонок, целочисленные колонки округляются обратно
+NOISE = 0.03
+INTEGER_COLUMNS = ['curbweight', 'enginesize', 'horsepower', 'peakrpm', 'citympg', 'highwaympg']
+FIXED_COLUMNS = ['car_ID', 'symboling']
+
+
+def generate_car_data(n_rows, seed=42, source=None, start_id=1):
+    """DataFrame из n_rows синтетических строк"""
+    source = load_car_data() if source is None else source
+    rng = np.random.default_rng(seed)
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+
+    numeric = [column for column in source.select_dtypes(include=[np.number]).columns
+               if column not in FIXED_COLUMNS]
+    for column in numeric:
+        noisy = df[column].to_numpy(dtype=np.float64) * rng.normal(1.0, NOISE, n_rows)
+        df[column] = np.round(noisy).astype(np.int64) if column in INTEGER_COLUMNS else np.round(noisy, 2)
+
+    if 'car_ID' in df:
+        df['car_ID'] = np.arange(start_id, start_id + n_rows)
+    return df
+
+
+def write_synthetic_csv(path, n_rows, chunksize=1_000_000, seed=42):
+    """CSV из n_rows строк, генерируется кусками по chunksize, память не зависит от n_rows"""
+    source = load_car_data()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for i, start in enumerate(range(0, n_rows, chunksize)):
+        chunk = generate_car_data(min(chunksize, n_rows - start), seed + i, source, start_id=start + 1)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
@@ -0,0 +1,121 @@
+"""
+Нормализация бренда из CarName. Названия машин повторяются, поэтому исправление опечаток,
+нижний регистр и объединение редких брендов в other считаются один раз на уникальное название,
+а строки получают результат через коды факторизации. Модуль не импортирует pandas на верхнем уровне
+"""
+import re
+
+import numpy as np
+
+# Опечатки в названиях марок в car_data.csv, применяются как регулярные выражения ко всему названию
+BRAND_CORRECTION = {
+    'maxda': 'mazda', 'porcshce': 'porsche',
+    'toyouta': 'toyota', 'vokswagen': 'volkswagen',
+    'vw': 'volkswagen'
+}
+OTHER_BRAND = 'other'
+
+_CORRECTION_PATTERNS = [(re.compile(pattern), replacement) for pattern, replacement in BRAND_CORRECTION.items()]
+
+
+def canonical_brand(name):
+    """Бренд одного названия: те же шаги, что Series.replace(BRAND_CORRECTION, regex=True).str.lower().str.split().str[0]"""
+    if not isinstance(name, str):
+        return None
+    for pattern, replacement in _CORRECTION_PATTERNS:
+        name = pattern.sub(replacement, name)
+    words = name.lower().split()
+    return words[0] if words else None
+
+
+def brand_from_car_name(names):
+    """Бренды для списка названий без обученного состояния (без объединения редких)"""
+    codes, uniques = _factorize(names)
+    table = [canonical_brand(name) for name in uniques] + [None]
+    return [table[code] for code in codes]
+
+
+def _factorize(values):
+    """Коды и уникальные значения. Малые входы - словарём, большие - через pd.factorize"""
+    values = np.asarray(values, dtype=object)
+    if len(values) <= 16:
+        index = {}
+        codes = np.array([index.setdefault(value, len(index)) for value in values], dtype=np.intp)
+        return codes, list(index)
+    import pandas as pd
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, list(uniques)
+
+
+class BrandNormalizer:
+    """
+    Обучаемое соответствие CarName -> бренд. fit() запоминает итоговый бренд для каждого
+    уникального названия обучающих данных (бренды, встретившиеся реже rare_threshold раз, -> other),
+    transform() применяет ту же таблицу при инференсе, новые названия разбираются по тем же правилам
+    """
+
+    def __init__(self, rare_threshold=5):
+        self.rare_threshold = rare_threshold
+        self.known_brands = None
+        self.brand_map = {}
+        self.name_map = {}
+
+    def fit(self, car_names):
+        codes, uniques = _factorize(car_names)
+        canonical = [canonical_brand(name) for name in uniques]
+
+        # Частота бренда = сумма частот его названий
+        name_counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        brand_counts = {}
+        for brand, count in zip(canonical, name_counts):
+            brand_counts[brand] = brand_counts.get(brand, 0) + int(count)
+
+        self.brand_map = {brand: OTHER_BRAND if count < self.rare_threshold else brand
+                          for brand, count in brand_counts.items()}
+        self.known_brands = sorted(set(self.brand_map.values()))
+        self.name_map = {name: self.brand_map[brand] for name, brand in zip(uniques, canonical)}
+        return self
+
+    def partial_fit(self, car_names):
+        """
+        Новые названия добавляются в таблицу с брендом по текущим правилам: известный бренд или other.
+        Набор брендов не расширяется - колонки One-Hot зафиксированы обученными моделями
+        """
+        _, uniques = _factorize(car_names)
+        for name in uniques:
+            if name not in self.name_map and isinstance(name, str):
+                self.name_map[name] = self.fold_brand(canonical_brand(name))
+        return self
+
+    @classmethod
+    def from_known_brands(cls, known_brands, rare_threshold=5):
+        """Нормализатор для старых артефактов, где есть только список брендов OneHotEncoder"""
+        normalizer = cls(rare_threshold)
+        normalizer.known_brands = sorted(known_brands)
+        normalizer.brand_map = {brand: brand for brand in normalizer.known_brands}
+        return normalizer
+
+    def fold_brand(self, brand):
+        """Бренд после объединения редких: неизвестные бренды, как и редкие, -> other"""
+        folded = self.brand_map.get(brand)
+        if folded is not None:
+            return folded
+        return OTHER_BRAND if OTHER_BRAND in self.known_brands else brand
+
+    def canonical(self, car_names):
+        """Бренды без объединения редких, массив object"""
+        return self._map(car_names, canonical_brand)
+
+    def fold(self, brands):
+        """Объединение редких брендов для уже извлечённых брендов"""
+        return self._map(brands, self.fold_brand)
+
+    def transform(self, car_names):
+        """Итоговые бренды для названий: одна таблица на уникальные значения"""
+        return self._map(car_names, lambda name: self.name_map.get(name) or self.fold_brand(canonical_brand(name)))
+
+    @staticmethod
+    def _map(values, fn):
+        codes, uniques = _factorize(values)
+        table = np.array([fn(value) for value in uniques] + [None], dtype=object)
+        return table[codes]
@@ -0,0 +1,39 @@
+import numpy as np
+
+NEW_FEATURES = ['power_to_weight', 'mpg_avg', 'size_ratio']
+
+
+def create_new_features(df):
+    """
+    Производные признаки. df - DataFrame или dict numpy-массивов,
+    поэтому функция используется и при обучении, и в лёгком инференсе без pandas
+    """
+    df['power_to_weight'] = df['horsepower'] / df['curbweight']
+    df['mpg_avg'] = (df['citympg'] + df['highwaympg']) / 2
+    df['size_ratio'] = df['carwidth'] / df['carlength']
+    return df
+
+
+
+def restore_float64(values, max_decimals=9):
+    """
+    Числовая колонка -> float64. float32 из типизированного загрузчика (load_car_data_typed)
+    возвращается к исходному десятичному значению: 95.1, а не 95.09999847. Для каждого значения
+    берётся округление с наименьшим числом знаков после запятой, которое даёт тот же float32, -
+    это значение из CSV, если в нём не больше 7 значащих цифр. Так признаки из кэша и из CSV
+    совпадают до бита, и при обучении, и в инференсе
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64)
+    wide = values.astype(np.float64)
+    result = wide.copy()
+    pending = np.flatnonzero(np.isfinite(wide))
+    for decimals in range(max_decimals + 1):
+        if not len(pending):
+            break
+        candidate = np.round(wide[pending], decimals)
+        found = candidate.astype(np.float32) == values[pending]
+        result[pending[found]] = candidate[found]
+        pending = pending[~found]
+    return result
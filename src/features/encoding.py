@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class CompiledEncoder:
+    """
+    Обученные StandardScaler, LabelEncoder и OneHotEncoder, скомпилированные в таблицы индексов.
+    encode() пишет пакет строк сразу в предвыделенную матрицу в заданном порядке признаков,
+    без вызовов sklearn и промежуточных DataFrame
+    """
+
+    def __init__(self, scaler, label_encoders, onehot_encoders, numeric_columns, feature_names,
+                 fallbacks=None):
+        self.feature_names = list(feature_names)
+        index = {name: i for i, name in enumerate(self.feature_names)}
+
+        # Масштабирование: позиции числовых колонок и параметры scaler
+        self.numeric_columns = list(numeric_columns)
+        self.numeric_idx = np.array([index[column] for column in self.numeric_columns], dtype=np.intp)
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        # Label Encoding: значение -> код, колонка -> позиция в матрице
+        self.label_maps = {
+            column: {value: code for code, value in enumerate(le.classes_)}
+            for column, le in label_encoders.items()
+        }
+        self.label_idx = {column: index[column] for column in label_encoders}
+
+        # One-Hot Encoding: значение -> позиция единицы в матрице, -1 для drop='first' и неизвестных
+        self.onehot_maps = {}
+        for column, ohe in onehot_encoders.items():
+            categories = ohe.categories_[0]
+            dropped = ohe.drop_idx_[0] if ohe.drop_idx_ is not None else None
+            mapping = {}
+            for code, value in enumerate(categories):
+                if dropped is not None and code == dropped:
+                    mapping[value] = -1
+                else:
+                    mapping[value] = index.get(f"{column}_{value}", -1)
+            self.onehot_maps[column] = mapping
+
+        # Значения вне known заменяются на fallback (объединение редких брендов в other)
+        self.onehot_defaults = {column: -1 for column in self.onehot_maps}
+        for column, (known, fallback) in (fallbacks or {}).items():
+            mapping = self.onehot_maps[column]
+            self.onehot_defaults[column] = mapping.get(fallback, -1)
+            for value in known:
+                mapping.setdefault(value, -1)
+
+    @classmethod
+    def from_tables(cls, feature_names, numeric_columns, mean, scale, label_classes, onehot_maps, onehot_defaults):
+        """Сборка из готовых таблиц без объектов sklearn (загрузка упакованного бандла)"""
+        encoder = cls.__new__(cls)
+        encoder.feature_names = list(feature_names)
+        index = {name: i for i, name in enumerate(encoder.feature_names)}
+        encoder.numeric_columns = list(numeric_columns)
+        encoder.numeric_idx = np.array([index[column] for column in encoder.numeric_columns], dtype=np.intp)
+        encoder.mean = np.asarray(mean, dtype=np.float64)
+        encoder.scale = np.asarray(scale, dtype=np.float64)
+        encoder.label_maps = {column: {value: code for code, value in enumerate(classes)}
+                              for column, classes in label_classes.items()}
+        encoder.label_idx = {column: index[column] for column in label_classes}
+        encoder.onehot_maps = {column: dict(mapping) for column, mapping in onehot_maps.items()}
+        encoder.onehot_defaults = dict(onehot_defaults)
+        return encoder
+
+    def tables(self):
+        """Таблицы для from_tables: словари кодов в виде списков значений по порядку кодов"""
+        return {
+            'feature_names': self.feature_names,
+            'numeric_columns': self.numeric_columns,
+            'mean': self.mean,
+            'scale': self.scale,
+            'label_classes': {column: sorted(mapping, key=mapping.get) for column, mapping in self.label_maps.items()},
+            'onehot_maps': self.onehot_maps,
+            'onehot_defaults': self.onehot_defaults,
+        }
+
+    @staticmethod
+    def _lookup(values, mapping, default):
+        values = np.asarray(values)
+        if len(values) <= 16:
+            return np.array([mapping.get(value, default) for value in values], dtype=np.intp)
+        # Словарь применяется только к уникальным значениям, строки получают результат через коды.
+        # pandas импортируется только здесь, малые пакеты кодируются на чистом numpy
+        import pandas as pd
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        table = np.array([mapping.get(value, default) for value in uniques] + [default], dtype=np.intp)
+        return table[codes]
+
+    def encode(self, df, dtype=np.float32, out=None):
+        """Матрица признаков (n_rows, n_features) для подготовленных строк (DataFrame или dict колонок)"""
+        n_rows = len(df[self.numeric_columns[0]])
+        if out is None:
+            out = np.zeros((n_rows, len(self.feature_names)), dtype=dtype)
+        else:
+            out[:] = 0
+
+        numeric = np.column_stack([np.asarray(df[column], dtype=np.float64) for column in self.numeric_columns])
+        out[:, self.numeric_idx] = (numeric - self.mean) / self.scale
+
+        for column, mapping in self.label_maps.items():
+            codes = self._lookup(df[column], mapping, -1)
+            if (codes < 0).any():
+                unknown = sorted({str(value) for value in np.asarray(df[column])[codes < 0]})
+                raise ValueError(f"y contains previously unseen labels: {unknown} (колонка {column})")
+            out[:, self.label_idx[column]] = codes
+
+        rows = np.arange(n_rows)
+        for column, mapping in self.onehot_maps.items():
+            positions = self._lookup(df[column], mapping, self.onehot_defaults[column])
+            known = positions >= 0
+            out[rows[known], positions[known]] = 1
+
+        return out
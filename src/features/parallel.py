@@ -0,0 +1,153 @@
+"""
+Параллельное применение обученного препроцессора к большим таблицам.
+
+Вход раскладывается в shared memory один раз: числовые колонки как float64, строковые - коды
+pd.factorize (уникальные значения передаются воркерам отдельно, их мало). Каждый воркер берёт
+свой диапазон строк, выполняет те же шаги, что и transform_array (бренд из CarName, производные
+признаки, кодирование), и пишет результат прямо в общую выходную матрицу. Строки обрабатываются
+независимо, поэтому результат побитно совпадает с последовательным transform_array
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.features.derived import NEW_FEATURES
+
+# Состояние воркера: препроцессор передаётся один раз при старте пула
+_worker_preprocessor = None
+
+
+def _init_worker(preprocessor):
+    global _worker_preprocessor
+    _worker_preprocessor = preprocessor
+
+
+def _attach(name):
+    """Подключение воркера к блоку, созданному родительским процессом"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # До Python 3.13 нет track=False. Воркеры пула используют resource_tracker родителя,
+        # повторная регистрация имени безвредна, а блок освобождает родитель через unlink()
+        return shared_memory.SharedMemory(name=name)
+
+
+def _run_partition(task, blocks):
+    start, stop, columns, out_spec, feature_names = task
+    data = {}
+    for column, (name, dtype, uniques) in columns.items():
+        shm = _attach(name)
+        blocks.append(shm)
+        values = np.ndarray((out_spec[1][0],), dtype=dtype, buffer=shm.buf)[start:stop]
+        data[column] = values if uniques is None else uniques[values]
+
+    out_name, out_shape, out_dtype = out_spec
+    shm = _attach(out_name)
+    blocks.append(shm)
+    out = np.ndarray(out_shape, dtype=out_dtype, buffer=shm.buf)
+    _worker_preprocessor.transform_array(data, feature_names, dtype=out_dtype, out=out[start:stop])
+    return stop - start
+
+
+def _transform_partition(task):
+    # Представления на буферы shared memory живут только внутри _run_partition,
+    # иначе close() не сможет освободить блок
+    blocks = []
+    try:
+        return _run_partition(task, blocks)
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+class ParallelTransformer:
+    """
+    Пул процессов для transform_array обученного препроцессора. Пул создаётся один раз,
+    препроцессор копируется в воркеры при старте, дальше передаются только границы партиций
+    """
+
+    def __init__(self, preprocessor, n_workers=None, partitions_per_worker=4, min_rows=50_000):
+        self.preprocessor = preprocessor
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.partitions_per_worker = partitions_per_worker
+        self.min_rows = min_rows
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.n_workers, mp_context=multiprocessing.get_context(),
+                                             initializer=_init_worker, initargs=(self.preprocessor,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _input_columns(self, df):
+        preprocessor = self.preprocessor
+        numeric = [column for column in preprocessor.numeric_columns if column not in NEW_FEATURES]
+        categorical = list(preprocessor.label_encoders) + \
+                      [column for column in preprocessor.onehot_encoders if column != 'brand']
+        categorical.append('brand' if 'brand' in df else 'CarName')
+        return numeric, categorical
+
+    def transform_array(self, df, feature_names=None, dtype=np.float32):
+        """То же, что preprocessor.transform_array(df, feature_names, dtype), по партициям в n_workers процессах"""
+        n_rows = len(df)
+        if self.n_workers == 1 or n_rows < self.min_rows:
+            return self.preprocessor.transform_array(df, feature_names, dtype=dtype)
+        feature_names = list(self.preprocessor.feature_names if feature_names is None else feature_names)
+
+        numeric, categorical = self._input_columns(df)
+        blocks = []
+        try:
+            # 1. Раскладка входа в shared memory
+            columns = {}
+            for column in numeric + categorical:
+                if column in numeric:
+                    values, uniques = np.asarray(df[column], dtype=np.float64), None
+                else:
+                    # Пропуски (None, NaN) получают свой код, а не -1: uniques[-1] в воркере
+                    # подставил бы вместо пропуска последнее значение колонки
+                    codes, uniques = pd.factorize(np.asarray(df[column], dtype=object), use_na_sentinel=False)
+                    values, uniques = codes.astype(np.int32), np.asarray(uniques, dtype=object)
+                shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                blocks.append(shm)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+                columns[column] = (shm.name, values.dtype, uniques)
+
+            # 2. Общая выходная матрица
+            out_shape = (n_rows, len(feature_names))
+            out_dtype = np.dtype(dtype)
+            out_shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(out_shape)) * out_dtype.itemsize, 1))
+            blocks.append(out_shm)
+            out_spec = (out_shm.name, out_shape, out_dtype)
+
+            # 3. Партиции по строкам
+            n_partitions = min(self.n_workers * self.partitions_per_worker, n_rows)
+            bounds = np.linspace(0, n_rows, n_partitions + 1).astype(int)
+            tasks = [(int(start), int(stop), columns, out_spec, feature_names)
+                     for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+            list(self._get_pool().map(_transform_partition, tasks))
+
+            return np.ndarray(out_shape, dtype=out_dtype, buffer=out_shm.buf).copy()
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def transform(self, df):
+        """То же, что preprocessor.transform(df): DataFrame float64"""
+        X = self.transform_array(df, dtype=np.float64)
+        return pd.DataFrame(X, columns=self.preprocessor.feature_names, index=getattr(df, 'index', None))
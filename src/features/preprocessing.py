@@ -1,43 +1,81 @@
+import os
 import pandas as pd
 import numpy as np
 import joblib
 from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 from sklearn.model_selection import train_test_split
 from src.features.target_engineering import create_premium_target
+from src.features.encoding import CompiledEncoder
+from src.features.brands import BrandNormalizer
+from src.features.derived import NEW_FEATURES, create_new_features, restore_float64
+
+# Версия формата сохранённого препроцессора, увеличивается при несовместимых изменениях
+PREPROCESSOR_VERSION = 1
+# Папка models относительно этого файла, а не текущей директории (ноутбуки запускаются из notebooks/)
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../models')
+
 
 class CarPricePreprocessor:
-    def __init__(self):
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.onehot_encoders = {}
         self.columns_to_drop = ['carheight', 'stroke', 'compressionratio',
                                 'peakrpm', 'car_ID', 'CarName']
-        self.new_features = ['power_to_weight', 'mpg_avg', 'size_ratio']
+        self.new_features = list(NEW_FEATURES)
+        self.rare_brand_threshold = 5
+        self.version = PREPROCESSOR_VERSION
+
+        # Обученное состояние, заполняется в fit()
+        self.known_brands = None
+        self.brand_normalizer = None
+        self.numeric_columns = None
+        self.feature_names = None
 
     def _extract_brand(self, df):
-        brand_correction = {
-            'maxda': 'mazda', 'porcshce': 'porsche',
-            'toyouta': 'toyota', 'vokswagen': 'volkswagen',
-            'vw': 'volkswagen'
-        }
-        df['CarName'] = df['CarName'].replace(brand_correction, regex=True)
-        df['CarName'] = df['CarName'].str.lower()
-        df['brand'] = df['CarName'].str.split().str[0]
+        # Таблица CarName -> бренд строится по уникальным названиям и сохраняется для инференса
+        self.brand_normalizer = BrandNormalizer(self.rare_brand_threshold).fit(df['CarName'])
+        df['brand'] = self.brand_normalizer.canonical(df['CarName'])
         return df
 
     def _create_new_features(self, df):
-        df['power_to_weight'] = df['horsepower'] / df['curbweight']
-        df['mpg_avg'] = (df['citympg'] + df['highwaympg']) / 2
-        df['size_ratio'] = df['carwidth'] / df['carlength']
-        return df
+        return create_new_features(df)
 
     def _handle_rare_brands(self, df):
-        other = df['brand'].value_counts() < 5
-        rare_brands = other[other == True].index
-        df['brand'] = df['brand'].replace(rare_brands, 'other')
+        df['brand'] = self.brand_normalizer.fold(df['brand'])
+        self.known_brands = self.brand_normalizer.known_brands
         return df
 
-    def _encode_categorical(self, X_train, X_test, df_processed):
+    def _prepare(self, df, target_column):
+        df_processed = df.copy()
+
+        # 0. Категории из типизированного загрузчика -> строки, float32 -> исходные float64, как в CSV
+        for column in df_processed.select_dtypes(include=['category']).columns:
+            df_processed[column] = df_processed[column].astype(object)
+        for column in df_processed.select_dtypes(include=['float32']).columns:
+            df_processed[column] = restore_float64(df_processed[column])
+
+        # 1. Извлечение бренда
+        df_processed = self._extract_brand(df_processed)
+
+        # 2. Создание новой целевой колонки для классификации и удаление price
+        if target_column == 'is_premium':
+            df_processed = create_premium_target(df_processed)
+            df_processed = df_processed.drop('price', axis=1, errors='ignore')
+
+        # 3. Создание новых признаков
+        df_processed = self._create_new_features(df_processed)
+
+        # 4. Удаление ненужных столбцов
+        df_processed = df_processed.drop(self.columns_to_drop, axis=1, errors='ignore')
+
+        # 5. Объединение брендов в other
+        df_processed = self._handle_rare_brands(df_processed)
+
+        return df_processed
+
+    def _fit_encoders(self, X_train, df_processed):
         categorical_columns = df_processed.select_dtypes(include=['object']).columns
         distribution = df_processed[categorical_columns].nunique() < 4
 
@@ -45,61 +83,134 @@ class CarPricePreprocessor:
         for_onehot = distribution[distribution == False].index.tolist()
 
         # Label Encoding
+        self.label_encoders = {}
         for column in for_label:
-            le = LabelEncoder()
-            X_train[column] = le.fit_transform(X_train[column])
-            X_test[column] = le.transform(X_test[column])
-            self.label_encoders[column] = le
+            self.label_encoders[column] = LabelEncoder().fit(X_train[column])
 
         # One-Hot Encoding
+        self.onehot_encoders = {}
         for column in for_onehot:
             ohe = OneHotEncoder(sparse_output=False, drop='first', handle_unknown='ignore')
+            self.onehot_encoders[column] = ohe.fit(X_train[[column]])
 
-            # Train
-            onehot_encoded = ohe.fit_transform(X_train[[column]])
-            feature_names = ohe.get_feature_names_out([column])
-            onehot_df = pd.DataFrame(onehot_encoded, columns=feature_names, index=X_train.index)
-            X_train = pd.concat([X_train, onehot_df], axis=1)
-            X_train.drop(column, axis=1, inplace=True)
+    def _fit_scaler(self, X_train, df_processed, target_column):
+        self.numeric_columns = df_processed.select_dtypes(include=[np.number]).columns.drop(target_column).tolist()
+        self.scaler = StandardScaler().fit(X_train[self.numeric_columns])
 
-            # Test
-            onehot_encoded = ohe.transform(X_test[[column]])
-            onehot_df = pd.DataFrame(onehot_encoded, columns=feature_names, index=X_test.index)
-            X_test = pd.concat([X_test, onehot_df], axis=1)
-            X_test.drop(column, axis=1, inplace=True)
+    def _set_feature_names(self, columns):
+        self.feature_names = []
+        for column in columns:
+            if column in self.onehot_encoders:
+                continue
+            self.feature_names.append(column)
+        for column, ohe in self.onehot_encoders.items():
+            self.feature_names.extend(ohe.get_feature_names_out([column]))
 
-            self.onehot_encoders[column] = ohe
+    def _compile(self):
+        # Таблицы кодирования строятся один раз после обучения/загрузки, в pkl не сохраняются
+        self._encoder = self.compile_encoder(self.feature_names)
+        self._encoders_by_order = {tuple(self.feature_names): self._encoder}
 
+    def compile_encoder(self, feature_names):
+        """Скомпилированный кодировщик, пишущий признаки в порядке feature_names"""
+        # Бренды, не попавшие в обучение как частые, кодируются как other
+        fallbacks = {'brand': (self.known_brands, 'other')} if 'other' in self.known_brands else None
+        return CompiledEncoder(self.scaler, self.label_encoders, self.onehot_encoders,
+                               self.numeric_columns, feature_names, fallbacks)
 
-        return X_train, X_test
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_encoder', None)
+        state.pop('_encoders_by_order', None)
+        return state
 
-    def _feature_scaling(self, X_train, X_test, df_processed, target_column):
-        scaler = StandardScaler()
-        orig_num_col = df_processed.select_dtypes(include=[np.number]).columns.drop(target_column)
-        X_train[orig_num_col] = scaler.fit_transform(X_train[orig_num_col])
-        X_test[orig_num_col] = scaler.transform(X_test[orig_num_col])
-        joblib.dump(scaler, '../models/scaler.pkl')
-        return X_train, X_test
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if getattr(self, 'brand_normalizer', None) is None and self.known_brands is not None:
+            # preprocessor.pkl, сохранённый до появления BrandNormalizer
+            self.brand_normalizer = BrandNormalizer.from_known_brands(self.known_brands, self.rare_brand_threshold)
+        if self.feature_names is not None:
+            self._compile()
 
-    def fit_transform(self, df, target_column):
-        df_processed = df.copy()
+    def _transform_prepared(self, df):
+        X = self._encoder.encode(df, dtype=np.float64)
+        return pd.DataFrame(X, columns=self.feature_names, index=df.index)
 
-        # 1. Извлечение бренда
-        df_processed = self._extract_brand(df_processed)
+    def fit(self, df, target_column):
+        """Обучение scaler и encoders на всём датасете, без разбиения и без сохранения"""
+        df_processed = self._prepare(df, target_column)
+        X = df_processed.drop(target_column, axis=1)
 
-        # 2. Создание новой целевой колонки для классификации и удаление price
-        if target_column == 'is_premium':
-            df_processed = create_premium_target(df_processed)
-            df_processed = df_processed.drop('price', axis=1, errors='ignore')
+        self._fit_encoders(X, df_processed)
+        self._fit_scaler(X, df_processed, target_column)
+        self._set_feature_names(X.columns)
+        self._compile()
+        return self
 
-        # 3. Создание новых признаков
-        df_processed = self._create_new_features(df_processed)
+    def _prepare_raw(self, df):
+        # Только нужные колонки в виде numpy-массивов, df может быть DataFrame или dict колонок
+        raw_numeric = [column for column in self.numeric_columns if column not in self.new_features]
+        categorical = [column for column in self.label_encoders] + \
+                      [column for column in self.onehot_encoders if column != 'brand']
+        # Числовые колонки приводятся к float64, чтобы производные признаки не зависели от типов входа
+        prepared = {column: restore_float64(df[column]) for column in raw_numeric}
+        prepared.update({column: np.asarray(df[column]) for column in categorical})
 
-        # 4. Удаление ненужных столбцов
-        df_processed = df_processed.drop(self.columns_to_drop, axis=1, errors='ignore')
+        if 'brand' in df:
+            prepared['brand'] = np.asarray(df['brand'])
+        else:
+            prepared['brand'] = self.brand_normalizer.transform(df['CarName'])
 
-        # 5. Объединение брендов в other
-        df_processed = self._handle_rare_brands(df_processed)
+        return self._create_new_features(prepared)
+
+    def transform(self, df):
+        """
+        Применение обученного препроцессора к сырым строкам в формате car_data.csv.
+        Колонка brand может быть передана вместо CarName, производные признаки считаются здесь,
+        редкие бренды объединяются в other
+        """
+        X = self._encoder.encode(self._prepare_raw(df), dtype=np.float64)
+        return pd.DataFrame(X, columns=self.feature_names, index=getattr(df, 'index', None))
+
+    def transform_array(self, df, feature_names=None, dtype=np.float32, out=None):
+        """
+        То же, что transform(), но сразу в numpy-матрицу заданного dtype и порядка колонок
+        (например, feature_names_in_ модели), без построения DataFrame
+        """
+        order = tuple(self.feature_names if feature_names is None else feature_names)
+        encoder = self._encoders_by_order.get(order)
+        if encoder is None:
+            encoder = self._encoders_by_order[order] = self.compile_encoder(order)
+        return encoder.encode(self._prepare_raw(df), dtype=dtype, out=out)
+
+    def partial_fit(self, df):
+        """
+        Дообучение на новых строках без полного refit: статистики scaler обновляются онлайн,
+        новые значения Label Encoding добавляются в конец classes_, коды старых значений не меняются.
+        Новые категории One-Hot и новые бренды кодируются как неизвестные (other) - набор колонок
+        зафиксирован обученными моделями. Возвращает (mean, scale) scaler до обновления
+        """
+        if 'CarName' in df and 'brand' not in df:
+            self.brand_normalizer.partial_fit(df['CarName'])
+        prepared = self._prepare_raw(df)
+        old_stats = (self.scaler.mean_.copy(), self.scaler.scale_.copy())
+
+        # 1. Scaler: объединение средних и дисперсий со старыми по числу строк
+        self.scaler.partial_fit(pd.DataFrame({column: prepared[column] for column in self.numeric_columns}))
+
+        # 2. Label Encoding: CompiledEncoder кодирует по словарю, порядок classes_ не обязан быть отсортирован
+        for column, le in self.label_encoders.items():
+            known = set(le.classes_)
+            new_values = [value for value in pd.unique(prepared[column]) if value not in known]
+            if new_values:
+                le.classes_ = np.concatenate([le.classes_, np.array(new_values, dtype=le.classes_.dtype)])
+
+        self._compile()
+        return old_stats
+
+    def fit_transform(self, df, target_column):
+        # 1-5. Бренд, таргет, новые признаки, удаление столбцов, редкие бренды
+        df_processed = self._prepare(df, target_column)
 
         # 6. Разделение на X, y
         X = df_processed.drop(target_column, axis=1)
@@ -109,18 +220,71 @@ class CarPricePreprocessor:
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=df_processed['brand']
         )
-        # 8. Кодирование категориальных признаков
-        X_train_encoded, X_test_encoded = self._encode_categorical(X_train, X_test, df_processed)
+        # 8. Обучение кодировщиков категориальных признаков и scaler на train
+        self._fit_encoders(X_train, df_processed)
+        self._fit_scaler(X_train, df_processed, target_column)
+        self._set_feature_names(X.columns)
+        self._compile()
 
-        # 9. Масштабирование числовых признаков
-        X_train_final, X_test_final = self._feature_scaling(X_train_encoded, X_test_encoded, df_processed, target_column)
+        # 9. Кодирование и масштабирование
+        X_train_final = self._transform_prepared(X_train)
+        X_test_final = self._transform_prepared(X_test)
 
-        joblib.dump(self.label_encoders, '../models/label_encoders.pkl')
-        joblib.dump(self.onehot_encoders, '../models/onehot_encoders.pkl')
+        if self.models_dir is not None:
+            self.save_legacy_artifacts(self.models_dir)
+            self.save(os.path.join(self.models_dir, 'preprocessor.pkl'))
 
         return X_train_final, X_test_final, y_train, y_test
 
+    def save_legacy_artifacts(self, models_dir):
+        """Отдельные pkl для scaler и encoders, как их сохраняли ноутбуки"""
+        joblib.dump(self.scaler, os.path.join(models_dir, 'scaler.pkl'))
+        joblib.dump(self.label_encoders, os.path.join(models_dir, 'label_encoders.pkl'))
+        joblib.dump(self.onehot_encoders, os.path.join(models_dir, 'onehot_encoders.pkl'))
+
+    def save(self, path):
+        """Сохранение обученного препроцессора одним артефактом"""
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        preprocessor = joblib.load(path)
+        if getattr(preprocessor, 'version', None) != PREPROCESSOR_VERSION:
+            raise ValueError(f"Несовместимая версия препроцессора в {path}: "
+                             f"{getattr(preprocessor, 'version', None)}, ожидается {PREPROCESSOR_VERSION}")
+        return preprocessor
+
+    @classmethod
+    def from_artifacts(cls, scaler, label_encoders, onehot_encoders, feature_names):
+        """Сборка препроцессора из старых scaler.pkl/label_encoders.pkl/onehot_encoders.pkl"""
+        preprocessor = cls(models_dir=None)
+        preprocessor.scaler = scaler
+        preprocessor.label_encoders = label_encoders
+        preprocessor.onehot_encoders = onehot_encoders
+        preprocessor.numeric_columns = list(scaler.feature_names_in_)
+        preprocessor.known_brands = sorted(onehot_encoders['brand'].categories_[0])
+        preprocessor.brand_normalizer = BrandNormalizer.from_known_brands(preprocessor.known_brands)
+        preprocessor.feature_names = list(feature_names)
+        preprocessor._compile()
+        return preprocessor
+
+
+def load_preprocessor(models_dir, feature_names=None):
+    """
+    Загрузка препроцессора для инференса: preprocessor.pkl, если он есть,
+    иначе сборка из отдельных pkl (нужны feature_names модели)
+    """
+    path = os.path.join(models_dir, 'preprocessor.pkl')
+    if os.path.exists(path):
+        return CarPricePreprocessor.load(path)
+    return CarPricePreprocessor.from_artifacts(
+        joblib.load(os.path.join(models_dir, 'scaler.pkl')),
+        joblib.load(os.path.join(models_dir, 'label_encoders.pkl')),
+        joblib.load(os.path.join(models_dir, 'onehot_encoders.pkl')),
+        feature_names,
+    )
+
 
 def preprocess_data(df, target_column):
     preprocessor = CarPricePreprocessor()
-    return preprocessor.fit_transform(df, target_column)
\ No newline at end of file
+    return preprocessor.fit_transform(df, target_column)
@@ -1,14 +1,21 @@
 import pandas as pd
 
 
-def create_premium_target(df):
+def premium_thresholds(df):
+    """Пороги премиальности: 70-й перцентиль мощности, объёма двигателя и цены"""
+    return {column: df[column].quantile(0.7) for column in ['horsepower', 'enginesize', 'price']}
+
+
+def create_premium_target(df, thresholds=None):
     """
     Создание интеллектуального бинарного таргета для классификации
-    Определяет премиальные автомобили по комплексу характеристик
+    Определяет премиальные автомобили по комплексу характеристик.
+    thresholds - пороги из premium_thresholds() для разметки новых данных по старой истории
     """
-    horsepower_threshold = df['horsepower'].quantile(0.7)
-    enginesize_threshold = df['enginesize'].quantile(0.7)
-    price_threshold = df['price'].quantile(0.7)
+    thresholds = premium_thresholds(df) if thresholds is None else thresholds
+    horsepower_threshold = thresholds['horsepower']
+    enginesize_threshold = thresholds['enginesize']
+    price_threshold = thresholds['price']
 
     premium_condition = (
             (df['horsepower'] >= horsepower_threshold) &
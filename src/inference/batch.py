@@ -0,0 +1,85 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from src.features.preprocessing import load_preprocessor
+from src.inference.forest import FusedForestPredictor, Prediction
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../models')
+
+
+def unwrap_model(model):
+    """Достаём лучшую модель из RandomizedSearchCV/GridSearchCV, если модель сохранена вместе с поиском"""
+    return model.best_estimator_ if hasattr(model, 'best_estimator_') else model
+
+
+def load_artifacts(models_dir=MODELS_DIR):
+    """Загружаем модели и обученный препроцессор из папки models"""
+    model_reg = unwrap_model(joblib.load(os.path.join(models_dir, 'random_forest_regression_final.pkl')))
+    model_clf = unwrap_model(joblib.load(os.path.join(models_dir, 'random_forest_classifier_final.pkl')))
+    return {
+        'preprocessor': load_preprocessor(models_dir, model_reg.feature_names_in_),
+        'model_reg': model_reg,
+        'model_clf': model_clf,
+    }
+
+
+class BatchPredictor:
+    """
+    Пакетный инференс: сырые строки в формате car_data.csv -> цена и премиальный класс.
+    Все признаки пишутся в одну матрицу в порядке feature_names_in_ модели, без pd.concat по колонкам.
+
+    compiled=True включает FusedForestPredictor (оба леса за один обход) для пакетов до compiled_max_rows
+    строк: на малых пакетах он в разы быстрее sklearn, на больших быстрее остаётся model.predict
+    (см. benchmarks/bench_compiled_forest.py)
+    """
+
+    def __init__(self, preprocessor, model_reg, model_clf, compiled=False, compiled_max_rows=512, n_threads=1):
+        self.preprocessor = preprocessor
+        self.model_reg = unwrap_model(model_reg)
+        self.model_clf = unwrap_model(model_clf)
+        self.feature_names = list(self.model_reg.feature_names_in_)
+
+        self.compiled_max_rows = compiled_max_rows
+        self.fused = FusedForestPredictor(self.model_reg, self.model_clf, n_threads) if compiled else None
+        self.positive_idx = list(self.model_clf.classes_).index(1)
+
+    @classmethod
+    def from_dir(cls, models_dir=MODELS_DIR, **kwargs):
+        return cls(**load_artifacts(models_dir), **kwargs)
+
+    def build_array(self, df, out=None):
+        """Матрица признаков float32 в порядке feature_names_in_ модели из сырых данных"""
+        return self.preprocessor.transform_array(df, self.feature_names, dtype=np.float32, out=out)
+
+    def build_features(self, df):
+        X = self.build_array(df)
+        return pd.DataFrame(X, columns=self.feature_names, index=getattr(df, 'index', None), copy=False)
+
+    def predict_array(self, X):
+        """Prediction(price, is_premium, premium_proba) для готовой матрицы признаков"""
+        if self.fused is not None and len(X) <= self.compiled_max_rows:
+            return self.fused.predict(X)
+
+        X = pd.DataFrame(X, columns=self.feature_names, copy=False)
+        proba = self.model_clf.predict_proba(X)
+        # Как RandomForestClassifier.predict, но без второго прохода по лесу
+        is_premium = self.model_clf.classes_.take(np.argmax(proba, axis=1), axis=0)
+        return Prediction(self.model_reg.predict(X), is_premium, proba[:, self.positive_idx])
+
+    def predict(self, df):
+        prediction = self.predict_array(self.build_array(df))
+        return pd.DataFrame(prediction._asdict(), index=getattr(df, 'index', None))
+
+
+_default_predictor = None
+
+
+def predict_batch(df, predictor=None):
+    """Цена и премиальный класс для всех строк df за один проход"""
+    global _default_predictor
+    if predictor is None:
+        if _default_predictor is None:
+            _default_predictor = BatchPredictor.from_dir()
+        predictor = _default_predictor
+    return predictor.predict(df)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.inference.forest import Prediction
+
+ARTIFACT_FILES = ['preprocessor.pkl', 'scaler.pkl', 'label_encoders.pkl', 'onehot_encoders.pkl',
+                  'random_forest_regression_final.pkl', 'random_forest_classifier_final.pkl',
+                  'slim_bundle.pkl', 'slim_bundle.bin']
+
+
+def artifacts_fingerprint(models_dir, files=ARTIFACT_FILES):
+    """Версия артефактов моделей: имя, размер и mtime каждого файла"""
+    parts = []
+    for name in files:
+        path = os.path.join(models_dir, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+def feature_key(row):
+    """Канонический ключ строки признаков: float32-байты, -0.0 приводится к 0.0"""
+    row = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0.0)
+    return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """Потокобезопасный LRU-кэш с ограничением размера и TTL"""
+
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= self.clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def set_version(self, version):
+        """Сброс кэша, если версия артефактов изменилась"""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self._data.clear()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class CachedPredictor:
+    """
+    Мемоизация поверх BatchPredictor: признаки кодируются как обычно, а леса считаются
+    только для строк, которых нет в кэше. Кэш сбрасывается при изменении файлов в models_dir
+    """
+
+    def __init__(self, predictor, models_dir, maxsize=4096, ttl=None, check_interval=1.0):
+        self.predictor = predictor
+        self.models_dir = models_dir
+        self.cache = PredictionCache(maxsize, ttl)
+        self.check_interval = check_interval
+        self._checked_at = None
+
+    def _check_version(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self.cache.set_version(artifacts_fingerprint(self.models_dir))
+            self._checked_at = now
+
+    def predict_array(self, X):
+        self._check_version()
+        if len(X) == 0:
+            return self.predictor.predict_array(X)
+        keys = [feature_key(row) for row in X]
+        values = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            computed = self.predictor.predict_array(X[missing])
+            for position, i in enumerate(missing):
+                values[i] = tuple(column[position] for column in computed)
+                self.cache.put(keys[i], values[i])
+
+        price, is_premium, premium_proba = (np.array(column) for column in zip(*values))
+        return Prediction(price, is_premium, premium_proba)
+
+    def predict_rows(self, rows):
+        """Prediction для dict колонок, без pandas"""
+        return self.predict_array(self.predictor.build_array(rows))
+
+    def predict(self, df):
+        import pandas as pd
+        prediction = self.predict_array(self.predictor.build_array(df))
+        return pd.DataFrame(prediction._asdict(), index=getattr(df, 'index', None))
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,149 @@
+"""
+Вклады признаков в отдельные предсказания лесов (разложение по путям в деревьях, метод Saabas):
+предсказание дерева = значение корня + изменения значения узла на каждом шаге пути, изменение
+приписывается признаку, по которому шло разбиение. Для леса вклады усредняются по деревьям,
+поэтому для каждой строки bias + сумма вкладов = предсказание.
+
+Обход идёт по плоским массивам узлов FusedForestPredictor, как в forest._walk: все деревья и все
+строки пакета одновременно, по уровню за шаг, вклады копятся np.bincount. Пути, дошедшие до листа,
+выбрасываются из обхода. Регрессор (price) и классификатор (premium_proba) раскладываются за один обход.
+
+Вклады One-Hot признаков (brand_toyota, carbody_sedan, ...) складываются в исходную колонку
+(brand, carbody). Числовые и Label-колонки, включая производные признаки, остаются как есть
+"""
+import numpy as np
+
+TARGETS = ('price', 'premium_proba')
+
+
+def source_columns(encoder):
+    """Исходная колонка для каждого признака матрицы CompiledEncoder"""
+    sources = list(encoder.feature_names)
+    for column, mapping in encoder.onehot_maps.items():
+        for position in mapping.values():
+            if position >= 0:
+                sources[position] = column
+    return sources
+
+
+def _walk_contributions(X, roots, feature, threshold, children, missing_left, max_depth, node_value, n_reg_trees):
+    """Суммы изменений значений узлов по признакам (2, n, n_features): регрессор, затем классификатор"""
+    n_samples, n_features = X.shape
+    flat_X = X.ravel()
+    block = n_samples * n_features
+
+    node = np.repeat(roots, n_samples)
+    row_start = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, len(roots))
+    # Пути деревьев классификатора копятся во второй половине счётчика
+    out_start = row_start + np.repeat(np.array([0, block], dtype=np.intp),
+                                      [n_reg_trees * n_samples, (len(roots) - n_reg_trees) * n_samples])
+
+    total = np.zeros(2 * block)
+    for _ in range(max_depth):
+        split = feature[node]
+        x = flat_X[row_start + split]
+        go_left = x <= threshold[node]
+        if missing_left is not None:
+            go_left |= np.isnan(x) & missing_left[node]
+        child = children[2 * node + go_left]
+
+        # Листья ссылаются сами на себя: такие пути закончились и дальше не обходятся
+        moving = child != node
+        if not moving.all():
+            node, child, row_start, out_start, split = (node[moving], child[moving], row_start[moving],
+                                                        out_start[moving], split[moving])
+        if not len(node):
+            break
+        total += np.bincount(out_start + split, weights=node_value[child] - node_value[node], minlength=2 * block)
+        node = child
+
+    return total.reshape(2, n_samples, n_features)
+
+
+class Explanation:
+    """
+    Вклады исходных колонок в price и premium_proba, массивы (n, len(columns)).
+    bias - предсказание без признаков (среднее значение корней), одинаковое для всех строк
+    """
+
+    def __init__(self, columns, bias, price, premium_proba):
+        self.columns = list(columns)
+        self.bias = dict(zip(TARGETS, bias))
+        self.price = price
+        self.premium_proba = premium_proba
+
+    def __len__(self):
+        return len(self.price)
+
+    def prediction(self, target='price'):
+        """bias + сумма вкладов - совпадает с предсказанием леса с точностью до округления"""
+        return self.bias[target] + getattr(self, target).sum(axis=1)
+
+    def to_frame(self, i=0, target='price'):
+        """Вклады строки i: колонки column и contribution, по убыванию модуля вклада"""
+        import pandas as pd
+
+        frame = pd.DataFrame({'column': self.columns, 'contribution': getattr(self, target)[i]})
+        return frame.iloc[np.argsort(-np.abs(frame['contribution'].to_numpy()), kind='stable')].reset_index(drop=True)
+
+    def records(self):
+        """Для JSON: по объекту на строку {'bias': {...}, 'contributions': {цель: {колонка: вклад}}}"""
+        bias = {target: float(value) for target, value in self.bias.items()}
+        return [
+            {'bias': bias,
+             'contributions': {target: dict(zip(self.columns, getattr(self, target)[i].tolist())) for target in TARGETS}}
+            for i in range(len(self))
+        ]
+
+
+class Explainer:
+    """
+    Вклады признаков для SlimPredictor (или любого предиктора с encoder и FusedForestPredictor в forest).
+    Пакет делится на куски по max_rows строк, чтобы массивы путей (деревья x строки) оставались небольшими
+    """
+
+    def __init__(self, predictor, max_rows=1024):
+        self.predictor = predictor
+        self.max_rows = max_rows
+        forest = predictor.forest
+        self.forest = forest
+
+        # Значение узла для разложения: цена у регрессора, вероятность премиального класса у классификатора
+        clf_value = forest.clf_value[:, forest.positive_idx] if forest.positive_idx >= 0 \
+            else np.zeros(len(forest.clf_value))
+        self.node_value = np.concatenate([np.asarray(forest.reg_value)[:, 0], clf_value]).astype(np.float64)
+        n_clf_trees = len(forest.roots) - forest.n_reg_trees
+        self.bias = np.array([self.node_value[forest.roots[:forest.n_reg_trees]].mean(),
+                              self.node_value[forest.roots[forest.n_reg_trees:]].mean() if n_clf_trees else 0.0])
+        self.n_trees = np.array([forest.n_reg_trees, max(n_clf_trees, 1)], dtype=np.float64)
+
+        # Свёртка признаков в исходные колонки - умножение на матрицу принадлежности (n_features, n_columns)
+        sources = source_columns(predictor.encoder)
+        self.columns = list(dict.fromkeys(sources))
+        position = {column: i for i, column in enumerate(self.columns)}
+        self.fold_matrix = np.zeros((len(sources), len(self.columns)))
+        self.fold_matrix[np.arange(len(sources)), [position[source] for source in sources]] = 1.0
+
+    def feature_contributions(self, X):
+        """Вклады признаков матрицы (2, n, n_features) без свёртки One-Hot"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.forest.n_features:
+            raise ValueError(f"Ожидается матрица (n, {self.forest.n_features}), получено {X.shape}")
+
+        forest = self.forest
+        chunks = [
+            _walk_contributions(X[start:start + self.max_rows], forest.roots, forest.feature, forest.threshold,
+                                forest.children, forest.missing_left, forest.max_depth, self.node_value,
+                                forest.n_reg_trees)
+            for start in range(0, len(X), self.max_rows)
+        ]
+        contributions = np.concatenate(chunks, axis=1) if chunks else np.zeros((2, 0, X.shape[1]))
+        return contributions / self.n_trees[:, np.newaxis, np.newaxis]
+
+    def explain_array(self, X):
+        contributions = self.feature_contributions(X) @ self.fold_matrix
+        return Explanation(self.columns, self.bias, contributions[0], contributions[1])
+
+    def explain_rows(self, rows):
+        """Explanation для dict колонок в формате car_data.csv"""
+        return self.explain_array(self.predictor.build_array(rows))
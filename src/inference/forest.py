@@ -0,0 +1,201 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _walk(X, roots, feature, threshold, children, missing_left, max_depth):
+    """Одновременный обход деревьев с корнями roots для всех строк X, возвращает листья (len(roots), n)"""
+    n_samples, n_features = X.shape
+    flat_X = X.ravel()
+
+    node = np.repeat(roots, n_samples)
+    row_start = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, len(roots))
+
+    for _ in range(max_depth):
+        x = flat_X[row_start + feature[node]]
+        go_left = x <= threshold[node]
+        if missing_left is not None:
+            go_left |= np.isnan(x) & missing_left[node]
+        node = children[2 * node + go_left]
+
+    return node.reshape(len(roots), n_samples)
+
+
+def _mean_leaf_values(value, leaves):
+    # Суммирование по деревьям в том же порядке, что и в sklearn, для побитного совпадения
+    total = np.zeros((leaves.shape[1], value.shape[1]))
+    for tree_leaves in leaves:
+        total += value[tree_leaves]
+    total /= len(leaves)
+    return total
+
+
+class CompiledForest:
+    """
+    RandomForestRegressor/RandomForestClassifier, развёрнутый в плоские numpy-массивы узлов.
+    Все деревья обходятся одновременно векторными операциями по уровням, без валидации
+    входа sklearn и joblib на каждый вызов. Результаты совпадают с model.predict побитно
+    """
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Поддерживаются только модели с одним выходом")
+
+        self.is_classifier = hasattr(model, 'classes_')
+        self.classes_ = getattr(model, 'classes_', None)
+        self.n_estimators = len(trees)
+        self.n_features = model.n_features_in_
+        self.feature_names_in_ = getattr(model, 'feature_names_in_', None)
+
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.roots = offsets.astype(np.intp)
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        # Номера детей сдвигаются на начало своего дерева. Листья ссылаются сами на себя,
+        # поэтому обход идёт max_depth шагов без ветвлений и проверок на лист
+        is_leaf = np.concatenate([tree.children_left < 0 for tree in trees])
+        node_id = np.arange(sizes.sum())
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+        left = np.where(is_leaf, node_id, left)
+        right = np.where(is_leaf, node_id, right)
+        # children[2 * node + 1] - левый ребёнок (x <= threshold), children[2 * node] - правый
+        self.children = np.stack([right, left], axis=1).ravel().astype(np.intp)
+        self.feature = np.where(is_leaf, 0, np.concatenate([tree.feature for tree in trees])).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        missing = [getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)) for tree in trees]
+        self.missing_left = np.concatenate(missing).astype(bool) & ~is_leaf
+        self.has_missing_left = bool(self.missing_left.any())
+
+        values = []
+        for tree in trees:
+            value = tree.value[:, 0, :].astype(np.float64)
+            if self.is_classifier and not np.allclose(value.sum(axis=1), 1.0):
+                # До sklearn 1.4 в узлах хранились веса классов, predict_proba нормировал их
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+        self.value = np.concatenate(values)
+
+    @property
+    def node_count(self):
+        return len(self.threshold)
+
+    def _validate(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Ожидается матрица (n, {self.n_features}), получено {X.shape}")
+        return X
+
+    def apply(self, X):
+        """Номера листьев (n_estimators, n_samples) в общей нумерации узлов"""
+        return _walk(self._validate(X), self.roots, self.feature, self.threshold, self.children,
+                     self.missing_left if self.has_missing_left else None, self.max_depth)
+
+    def _aggregate(self, X):
+        return _mean_leaf_values(self.value, self.apply(X))
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError("predict_proba доступен только для классификатора")
+        return self._aggregate(X)
+
+    def predict(self, X):
+        output = self._aggregate(X)
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(output, axis=1), axis=0)
+        return output[:, 0]
+
+
+Prediction = namedtuple('Prediction', ['price', 'is_premium', 'premium_proba'])
+
+
+class FusedForestPredictor:
+    """
+    Регрессия и классификация за один обход: узлы обоих лесов лежат в общих массивах,
+    вход проверяется и приводится к float32 один раз. Большие пакеты делятся по деревьям
+    между n_threads потоками, суммирование по деревьям остаётся последовательным
+    """
+
+    # Массивы узлов, по которым восстанавливается предиктор (упакованный бандл)
+    ARRAYS = ['roots', 'feature', 'threshold', 'children', 'missing_left', 'reg_value', 'clf_value']
+
+    def __init__(self, model_reg, model_clf, n_threads=1, min_rows_per_thread=256):
+        reg, clf = CompiledForest(model_reg), CompiledForest(model_clf)
+        if reg.n_features != clf.n_features:
+            raise ValueError("Модели обучены на разном числе признаков")
+        if not clf.is_classifier or reg.is_classifier:
+            raise ValueError("Ожидаются регрессор и классификатор")
+
+        shift = reg.node_count
+        self.n_features = reg.n_features
+        self.n_reg_trees = reg.n_estimators
+        self.roots = np.concatenate([reg.roots, clf.roots + shift])
+        self.feature = np.concatenate([reg.feature, clf.feature])
+        self.threshold = np.concatenate([reg.threshold, clf.threshold])
+        self.children = np.concatenate([reg.children, clf.children + shift])
+        missing_left = np.concatenate([reg.missing_left, clf.missing_left])
+        self.missing_left = missing_left if missing_left.any() else None
+        self.max_depth = max(reg.max_depth, clf.max_depth)
+
+        self.reg_value = reg.value
+        self.clf_value = clf.value
+        self.clf_shift = shift
+        self.classes_ = clf.classes_
+        self.positive_idx = int(np.flatnonzero(self.classes_ == 1)[0]) if (self.classes_ == 1).any() else -1
+
+        self.n_threads = n_threads
+        self.min_rows_per_thread = min_rows_per_thread
+        self._pool = ThreadPoolExecutor(n_threads) if n_threads > 1 else None
+
+    @classmethod
+    def from_arrays(cls, arrays, n_features, n_reg_trees, clf_shift, classes, max_depth,
+                    n_threads=1, min_rows_per_thread=256):
+        """Сборка из готовых массивов узлов без sklearn, массивы могут быть np.memmap"""
+        predictor = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(predictor, name, arrays.get(name))
+        predictor.n_features = n_features
+        predictor.n_reg_trees = n_reg_trees
+        predictor.clf_shift = clf_shift
+        predictor.classes_ = np.asarray(classes)
+        predictor.positive_idx = int(np.flatnonzero(predictor.classes_ == 1)[0]) if (predictor.classes_ == 1).any() else -1
+        predictor.max_depth = max_depth
+        predictor.n_threads = n_threads
+        predictor.min_rows_per_thread = min_rows_per_thread
+        predictor._pool = ThreadPoolExecutor(n_threads) if n_threads > 1 else None
+        return predictor
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool = ThreadPoolExecutor(self.n_threads) if self.n_threads > 1 else None
+
+    def _apply(self, X):
+        walk = lambda roots: _walk(X, roots, self.feature, self.threshold, self.children,
+                                   self.missing_left, self.max_depth)
+        if self._pool is None or len(X) < self.min_rows_per_thread:
+            return walk(self.roots)
+        return np.concatenate(list(self._pool.map(walk, np.array_split(self.roots, self.n_threads))))
+
+    def predict(self, X):
+        """Prediction(price, is_premium, premium_proba) для всех строк X"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Ожидается матрица (n, {self.n_features}), получено {X.shape}")
+
+        leaves = self._apply(X)
+        price = _mean_leaf_values(self.reg_value, leaves[:self.n_reg_trees])[:, 0]
+        proba = _mean_leaf_values(self.clf_value, leaves[self.n_reg_trees:] - self.clf_shift)
+
+        is_premium = self.classes_.take(np.argmax(proba, axis=1), axis=0)
+        premium_proba = proba[:, self.positive_idx] if self.positive_idx >= 0 else np.zeros(len(X))
+        return Prediction(price, is_premium, premium_proba)
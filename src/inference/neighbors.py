@@ -0,0 +1,199 @@
+"""
+Индекс похожих машин для обоснования оценки: ближайшие соседи в пространстве признаков
+CarPricePreprocessor (масштабированные числовые, Label и One-Hot коды) по евклидову расстоянию.
+
+- Основная часть - KD-дерево scipy (cKDTree) по float32-матрице признаков: top-k на миллионе строк
+  за доли миллисекунды (см. benchmarks/bench_neighbors.py)
+- Новые строки (add) попадают в дельта-буфер, который просматривается полным перебором; когда буфер
+  превышает rebuild_fraction от дерева, дерево перестраивается по всем строкам
+- Индекс хранит свой CompiledEncoder: пространство признаков фиксировано на момент построения,
+  дообучение scaler не сдвигает старые точки. Если новые строки содержат значения, неизвестные
+  кодировщику, индекс перекодируется новым кодировщиком (rebuild)
+- В comparables_index.pkl сохраняются матрица признаков и строки, дерево строится при загрузке
+  (pickle дерева в несколько раз больше самой матрицы)
+
+Сборка рядом с моделями:
+    python -m src.inference.neighbors --models-dir models
+"""
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+COMPARABLES_INDEX = 'comparables_index.pkl'
+COMPARABLES_VERSION = 1
+
+# Колонки для показа рядом с прогнозом, кроме признаков модели
+DISPLAY_COLUMNS = ['CarName', 'price']
+
+
+class ComparablesIndex:
+    """
+    columns - подготовленные колонки (SlimPredictor.prepare_columns) и колонки для показа.
+    Позиции соседей - номера строк в rows, в порядке добавления
+    """
+
+    def __init__(self, encoder, columns, leafsize=32, rebuild_fraction=0.05, min_rebuild_rows=1024):
+        self.encoder = encoder
+        self.leafsize = leafsize
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild_rows = min_rebuild_rows
+        self.rows = self._frame(columns)
+        self.X = encoder.encode(self.rows, dtype=np.float32)
+        self._delta = self.X[:0]
+        self._build()
+
+    @classmethod
+    def from_predictor(cls, predictor, df, **kwargs):
+        """Индекс по строкам df в формате car_data.csv и кодировщику SlimPredictor"""
+        return cls(predictor.encoder, cls.prepare(predictor, df), **kwargs)
+
+    @staticmethod
+    def prepare(predictor, df):
+        """Колонки для индекса: признаки до кодирования (бренд, производные) и колонки для показа"""
+        columns = predictor.prepare_columns(df)
+        columns.update({column: np.asarray(df[column]) for column in DISPLAY_COLUMNS if column in df})
+        return columns
+
+    def _frame(self, columns):
+        # Только нужные колонки, строковые - категориями: на миллионе строк это десятки МБ, а не сотни
+        keep = self.encoder.numeric_columns + list(self.encoder.label_maps) + list(self.encoder.onehot_maps)
+        keep += [column for column in DISPLAY_COLUMNS if column in columns]
+        frame = pd.DataFrame({column: columns[column] for column in keep})
+        for column in frame.select_dtypes(include=['object']).columns:
+            frame[column] = frame[column].astype('category')
+        return frame
+
+    def _build(self):
+        if len(self._delta):
+            self.X = np.concatenate([self.X, self._delta])
+            self._delta = self.X[:0]
+        # cKDTree копирует точки во float64; без балансировки и сжатия узлов строится в разы быстрее
+        self.tree = cKDTree(self.X, leafsize=self.leafsize, balanced_tree=False, compact_nodes=False)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def delta_rows(self):
+        return len(self._delta)
+
+    def add(self, columns):
+        """
+        Добавление строк (подготовленные колонки). Строки сразу участвуют в поиске,
+        дерево перестраивается, когда дельта-буфер вырос больше порога
+        """
+        frame = self._frame(columns)
+        X_new = self.encoder.encode(frame, dtype=np.float32)
+        self.rows = pd.concat([self.rows, frame], ignore_index=True)
+        self._delta = np.concatenate([self._delta, X_new])
+        if self.delta_rows > max(self.min_rebuild_rows, self.rebuild_fraction * len(self.X)):
+            self._build()
+        return len(X_new)
+
+    def rebuild(self, encoder=None):
+        """Перекодирование всех строк (например, новым кодировщиком после дообучения) и новое дерево"""
+        self.encoder = self.encoder if encoder is None else encoder
+        self.X = self.encoder.encode(self.rows, dtype=np.float32)
+        self._delta = self.X[:0]
+        self._build()
+
+    def query(self, X, k=5):
+        """Расстояния и позиции k ближайших строк (n_queries, k) для закодированных строк X"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        k = min(k, len(self))
+        k_tree = min(k, len(self.X))
+        distances, positions = self.tree.query(X, k=k_tree)
+        distances, positions = distances.reshape(len(X), k_tree), positions.reshape(len(X), k_tree)
+        if not len(self._delta):
+            return distances, positions
+
+        # Дельта-буфер - полный перебор, из него берутся k лучших и сливаются с кандидатами из дерева
+        diff = X[:, np.newaxis, :].astype(np.float64) - self._delta[np.newaxis]
+        delta_distances = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        delta_positions = np.broadcast_to(np.arange(len(self.X), len(self)), delta_distances.shape)
+        if delta_distances.shape[1] > k:
+            top = np.argpartition(delta_distances, k - 1, axis=1)[:, :k]
+            delta_distances = np.take_along_axis(delta_distances, top, axis=1)
+            delta_positions = np.take_along_axis(delta_positions, top, axis=1)
+        distances = np.hstack([distances, delta_distances])
+        positions = np.hstack([positions, delta_positions])
+        order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(positions, order, axis=1)
+
+    def neighbors(self, columns, k=5):
+        """Соседи одной машины: строки индекса с колонкой distance, ближайшие первыми"""
+        distances, positions = self.query(self.encoder.encode(columns, dtype=np.float32), k)
+        return self.rows.iloc[positions[0]].assign(distance=distances[0])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('tree', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build()
+
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump({'version': COMPARABLES_VERSION, 'index': self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+        if bundle.get('version') != COMPARABLES_VERSION:
+            raise ValueError(f"Несовместимая версия {path}: {bundle.get('version')}, ожидается {COMPARABLES_VERSION}")
+        return bundle['index']
+
+
+def export_comparables_index(models_dir, df=None, predictor=None):
+    """Построение comparables_index.pkl рядом с моделями по df (по умолчанию car_data.csv)"""
+    if predictor is None:
+        from src.inference.batch import BatchPredictor
+        from src.inference.slim import SlimPredictor
+        predictor = SlimPredictor.from_batch_predictor(BatchPredictor.from_dir(models_dir))
+    if df is None:
+        from src.data.loader import load_car_data
+        df = load_car_data()
+    index = ComparablesIndex.from_predictor(predictor, df)
+    return index.save(os.path.join(models_dir, COMPARABLES_INDEX))
+
+
+def update_comparables_index(models_dir, df_new, predictor, out_dir=None):
+    """
+    Добавление строк df_new в сохранённый индекс. Если в них есть значения, неизвестные кодировщику
+    индекса, индекс перекодируется кодировщиком predictor (обычно - после дообучения препроцессора)
+    """
+    index = ComparablesIndex.load(os.path.join(models_dir, COMPARABLES_INDEX))
+    columns = ComparablesIndex.prepare(predictor, df_new)
+    try:
+        index.add(columns)
+    except ValueError:
+        index.rebuild(predictor.encoder)
+        index.add(columns)
+    return index.save(os.path.join(out_dir or models_dir, COMPARABLES_INDEX))
+
+
+def main():
+    from src.inference.registry import MODELS_DIR
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--data', help='CSV в формате car_data.csv, по умолчанию data/raw/car_data.csv')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data) if args.data else None
+    path = export_comparables_index(args.models_dir, df)
+    print(f"✅ Индекс сохранён: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Упакованный бандл для slim-инференса: один файл без pickle.
+
+Формат: MAGIC (8 байт) | длина заголовка (uint64, little-endian) | заголовок JSON | массивы.
+Заголовок содержит параметры леса, таблицы кодирования, словарь брендов и для каждого массива
+смещение, dtype и форму. Массивы выровнены по 64 байта, поэтому открываются через np.memmap без
+копирования: процессы, загрузившие один файл, делят одну копию узлов в page cache.
+
+Узлы хранятся компактно: номера признаков и детей - int32, пороги - float32. Деревья сравнивают
+признаки во float32, поэтому порог округляется вниз до ближайшего float32: x <= t и x <= t32
+совпадают для любого float32 x, предсказания остаются побитно теми же. Значения листьев - float64
+"""
+import json
+import os
+
+import numpy as np
+
+from src.features.brands import BrandNormalizer
+from src.features.encoding import CompiledEncoder
+from src.inference.forest import FusedForestPredictor
+from src.inference.slim import SlimPredictor
+
+PACKED_BUNDLE = 'slim_bundle.bin'
+PACKED_VERSION = 1
+MAGIC = b'CARPACK\x00'
+ALIGNMENT = 64
+
+# dtype узлов в файле, остальные массивы пишутся как есть
+_NODE_DTYPES = {'roots': np.int32, 'feature': np.int32, 'children': np.int32, 'missing_left': np.bool_}
+
+
+def _floor_float32(threshold):
+    """Наибольший float32, не превосходящий порог"""
+    rounded = threshold.astype(np.float32)
+    return np.where(rounded > threshold, np.nextafter(rounded, np.float32(-np.inf)), rounded)
+
+
+def _pad(offset):
+    return -offset % ALIGNMENT
+
+
+def _jsonable(mapping):
+    # Ключи JSON - строки; значения словарей кодирования - numpy-скаляры или строки
+    return {str(key): value.item() if hasattr(value, 'item') else value for key, value in mapping.items()
+            if isinstance(key, str)}
+
+
+def save_packed(predictor, path):
+    """Запись SlimPredictor в упакованный формат (временный файл + переименование)"""
+    forest, encoder = predictor.forest, predictor.encoder
+    tables = encoder.tables()
+
+    arrays = {name: getattr(forest, name) for name in FusedForestPredictor.ARRAYS
+              if getattr(forest, name) is not None}
+    arrays['threshold'] = _floor_float32(arrays['threshold'])
+    for name, dtype in _NODE_DTYPES.items():
+        if name in arrays:
+            if np.issubdtype(dtype, np.integer) and arrays[name].size and \
+                    arrays[name].max() > np.iinfo(dtype).max:
+                raise ValueError(f"Массив {name} не помещается в {np.dtype(dtype).name}")
+            arrays[name] = arrays[name].astype(dtype)
+    arrays['mean'], arrays['scale'] = tables.pop('mean'), tables.pop('scale')
+
+    normalizer = getattr(predictor, 'brand_normalizer', None)
+    header = {
+        'version': PACKED_VERSION,
+        'raw_columns': predictor.raw_columns,
+        'forest': {
+            'n_features': int(forest.n_features),
+            'n_reg_trees': int(forest.n_reg_trees),
+            'clf_shift': int(forest.clf_shift),
+            'classes': forest.classes_.tolist(),
+            'max_depth': int(forest.max_depth),
+        },
+        'encoder': {
+            **tables,
+            'label_classes': {column: [str(value) for value in classes]
+                              for column, classes in tables['label_classes'].items()},
+            'onehot_maps': {column: _jsonable(mapping) for column, mapping in tables['onehot_maps'].items()},
+        },
+        'brands': None if normalizer is None else {
+            'rare_threshold': normalizer.rare_threshold,
+            'known_brands': list(normalizer.known_brands),
+            'brand_map': _jsonable(normalizer.brand_map),
+            'name_map': _jsonable(normalizer.name_map),
+        },
+        'arrays': {},
+    }
+
+    # Смещения массивов считаются от начала файла, поэтому сначала - размер заголовка
+    # с заполненной таблицей массивов (длина чисел смещений влияет на длину JSON)
+    offset = 0
+    for _ in range(2):
+        layout, position = {}, offset
+        for name, array in arrays.items():
+            position += _pad(position)
+            layout[name] = {'offset': position, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            position += array.nbytes
+        header['arrays'] = layout
+        header_bytes = json.dumps(header, ensure_ascii=False).encode()
+        start = len(MAGIC) + 8 + len(header_bytes)
+        offset = start + _pad(start)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b'\x00' * (layout[name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} не является упакованным бандлом")
+        size = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(size))
+    if header.get('version') != PACKED_VERSION:
+        raise ValueError(f"Несовместимая версия {path}: {header.get('version')}, ожидается {PACKED_VERSION}")
+    return header
+
+
+def load_packed(path, memory_map=True, n_threads=1):
+    """
+    SlimPredictor из упакованного файла. memory_map=True - массивы узлов остаются в page cache
+    (только чтение), иначе файл читается в память процесса целиком
+    """
+    header = read_header(path)
+    if memory_map:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        size = int(np.prod(spec['shape'])) * dtype.itemsize
+        arrays[name] = buffer[spec['offset']:spec['offset'] + size].view(dtype).reshape(spec['shape'])
+
+    tables = header['encoder']
+    encoder = CompiledEncoder.from_tables(tables['feature_names'], tables['numeric_columns'],
+                                          arrays.pop('mean'), arrays.pop('scale'), tables['label_classes'],
+                                          tables['onehot_maps'], tables['onehot_defaults'])
+    forest = FusedForestPredictor.from_arrays(arrays, n_threads=n_threads, **header['forest'])
+
+    normalizer = None
+    if header['brands'] is not None:
+        brands = header['brands']
+        normalizer = BrandNormalizer(brands['rare_threshold'])
+        normalizer.known_brands = brands['known_brands']
+        normalizer.brand_map = brands['brand_map']
+        normalizer.name_map = brands['name_map']
+    return SlimPredictor(encoder, forest, header['raw_columns'], normalizer)
+
+
+def export_packed_bundle(models_dir, predictor=None):
+    """Экспорт slim_bundle.bin рядом с моделями"""
+    if predictor is None:
+        from src.inference.batch import BatchPredictor
+        predictor = SlimPredictor.from_batch_predictor(BatchPredictor.from_dir(models_dir))
+    return save_packed(predictor, os.path.join(models_dir, PACKED_BUNDLE))
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import threading
+import time
+
+# pandas, sklearn и joblib импортируются только при первой загрузке соответствующих артефактов
+from src.inference.cache import CachedPredictor
+from src.inference.packed import PACKED_BUNDLE, load_packed
+from src.inference.slim import SLIM_BUNDLE, SlimPredictor
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../models')
+REGRESSION_MODEL = 'random_forest_regression_final.pkl'
+CLASSIFIER_MODEL = 'random_forest_classifier_final.pkl'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Общий на процесс реестр артефактов из models_dir. Каждый файл загружается при первом
+    обращении и перезагружается, только если изменились его mtime/размер (или sha256 при verify_hash).
+    Время загрузки каждого артефакта сохраняется в load_times
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, verify_hash=False, check_interval=1.0):
+        self.models_dir = models_dir
+        self.verify_hash = verify_hash
+        self.check_interval = check_interval
+        self.load_times = {}
+        self.load_counts = {}
+        self._entries = {}
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    def path(self, name):
+        return os.path.join(self.models_dir, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def _signature(self, name):
+        stat = os.stat(self.path(name))
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self.verify_hash:
+            signature += (file_sha256(self.path(name)),)
+        return signature
+
+    def signature(self, name):
+        """Текущая подпись файла с проверкой не чаще check_interval секунд"""
+        with self._lock:
+            entry = self._entries.get(name)
+            now = time.monotonic()
+            if entry is not None and now - entry['checked_at'] < self.check_interval:
+                return entry['signature']
+            signature = self._signature(name)
+            if entry is not None:
+                entry['checked_at'] = now
+            return signature
+
+    def get(self, name, loader=None):
+        """Артефакт по имени файла, загруженный лениво и переиспользуемый между сессиями"""
+        if loader is None:
+            import joblib
+            loader = joblib.load
+        with self._lock:
+            signature = self.signature(name)
+            entry = self._entries.get(name)
+            if entry is not None and entry['signature'] == signature:
+                return entry['value']
+
+            start = time.perf_counter()
+            value = loader(self.path(name))
+            self.load_times[name] = time.perf_counter() - start
+            self.load_counts[name] = self.load_counts.get(name, 0) + 1
+            self._entries[name] = {'signature': signature, 'value': value, 'checked_at': time.monotonic()}
+            return value
+
+    def _get_derived(self, key, names, factory):
+        # Объект, собранный из нескольких артефактов, пересобирается при изменении любого из них
+        with self._lock:
+            signatures = tuple(self.signature(name) for name in names)
+            entry = self._derived.get(key)
+            if entry is not None and entry['signatures'] == signatures:
+                return entry['value']
+            value = factory()
+            self._derived[key] = {'signatures': signatures, 'value': value}
+            return value
+
+    def model_reg(self):
+        from src.inference.batch import unwrap_model
+        return unwrap_model(self.get(REGRESSION_MODEL))
+
+    def model_clf(self):
+        from src.inference.batch import unwrap_model
+        return unwrap_model(self.get(CLASSIFIER_MODEL))
+
+    def preprocessor(self):
+        from src.features.preprocessing import CarPricePreprocessor
+        if self.exists('preprocessor.pkl'):
+            return self.get('preprocessor.pkl', CarPricePreprocessor.load)
+        names = ['scaler.pkl', 'label_encoders.pkl', 'onehot_encoders.pkl', REGRESSION_MODEL]
+        return self._get_derived('preprocessor', names, lambda: CarPricePreprocessor.from_artifacts(
+            self.get('scaler.pkl'), self.get('label_encoders.pkl'), self.get('onehot_encoders.pkl'),
+            self.model_reg().feature_names_in_,
+        ))
+
+    def _full_artifacts(self):
+        return [name for name in ['preprocessor.pkl', 'scaler.pkl', 'label_encoders.pkl',
+                                  'onehot_encoders.pkl', REGRESSION_MODEL, CLASSIFIER_MODEL]
+                if self.exists(name)]
+
+    def predictor(self, compiled=True, cache_size=4096, cache_ttl=None):
+        """Предиктор с кэшем, собранный из текущих версий артефактов"""
+        from src.inference.batch import BatchPredictor
+
+        names = self._full_artifacts()
+        return self._get_derived(('predictor', compiled, cache_size, cache_ttl), names, lambda: CachedPredictor(
+            BatchPredictor(self.preprocessor(), self.model_reg(), self.model_clf(), compiled=compiled),
+            self.models_dir, maxsize=cache_size, ttl=cache_ttl,
+        ))
+
+    def slim_predictor(self, cache_size=4096, cache_ttl=None):
+        """
+        Лёгкий предиктор с кэшем из slim_bundle.bin (memmap) или slim_bundle.pkl (только numpy).
+        Если бандл не экспортирован, он собирается в памяти из полных артефактов
+        """
+        if self.exists(PACKED_BUNDLE):
+            names = [PACKED_BUNDLE]
+            factory = lambda: self.get(PACKED_BUNDLE, load_packed)
+        elif self.exists(SLIM_BUNDLE):
+            names = [SLIM_BUNDLE]
+            factory = lambda: self.get(SLIM_BUNDLE, SlimPredictor.load)
+        else:
+            names = self._full_artifacts()
+            factory = lambda: SlimPredictor.from_batch_predictor(self.predictor(compiled=False).predictor)
+        return self._get_derived(('slim', cache_size, cache_ttl), names, lambda: CachedPredictor(
+            factory(), self.models_dir, maxsize=cache_size, ttl=cache_ttl,
+        ))
+
+    def comparables_index(self):
+        """
+        Индекс похожих машин из comparables_index.pkl. Если он не экспортирован,
+        собирается в памяти по car_data.csv и текущему slim-предиктору
+        """
+        from src.inference.neighbors import COMPARABLES_INDEX, ComparablesIndex
+
+        if self.exists(COMPARABLES_INDEX):
+            return self.get(COMPARABLES_INDEX, ComparablesIndex.load)
+
+        def build():
+            from src.data.loader import load_car_data
+            return ComparablesIndex.from_predictor(self.slim_predictor().predictor, load_car_data())
+
+        return self._get_derived('comparables', self._full_artifacts(), build)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': sorted(self._entries),
+                'load_times': dict(self.load_times),
+                'load_counts': dict(self.load_counts),
+            }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(models_dir=MODELS_DIR, **kwargs):
+    """Один реестр на папку моделей в пределах процесса"""
+    key = os.path.abspath(models_dir)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ModelRegistry(models_dir, **kwargs)
+        return _registries[key]
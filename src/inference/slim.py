@@ -0,0 +1,93 @@
+"""
+Лёгкий инференс для приложения и сервисов: только numpy и скомпилированные модели.
+Не импортирует pandas, sklearn и joblib, поэтому холодный старт не платит за них
+"""
+import os
+import pickle
+
+import numpy as np
+
+from src.features.brands import brand_from_car_name
+from src.features.derived import NEW_FEATURES, create_new_features, restore_float64
+
+SLIM_BUNDLE = 'slim_bundle.pkl'
+SLIM_BUNDLE_VERSION = 1
+
+
+class SlimPredictor:
+    """
+    CompiledEncoder + FusedForestPredictor. На вход - dict колонок в формате car_data.csv,
+    бренд передаётся колонкой brand или выводится из CarName обученным BrandNormalizer
+    """
+
+    def __init__(self, encoder, forest, raw_columns, brand_normalizer=None):
+        self.encoder = encoder
+        self.forest = forest
+        self.raw_columns = list(raw_columns)
+        self.brand_normalizer = brand_normalizer
+        self.feature_names = encoder.feature_names
+
+    @classmethod
+    def from_batch_predictor(cls, predictor):
+        """Сборка из BatchPredictor (нужны sklearn-модели, используется при экспорте)"""
+        from src.inference.forest import FusedForestPredictor
+
+        preprocessor = predictor.preprocessor
+        raw_columns = [column for column in preprocessor.numeric_columns if column not in NEW_FEATURES]
+        raw_columns += list(preprocessor.label_encoders) + list(preprocessor.onehot_encoders)
+        return cls(preprocessor.compile_encoder(predictor.feature_names),
+                   FusedForestPredictor(predictor.model_reg, predictor.model_clf),
+                   raw_columns, preprocessor.brand_normalizer)
+
+    def _brands(self, car_names):
+        # Бандлы, экспортированные до BrandNormalizer, разбирают CarName без обученной таблицы
+        normalizer = getattr(self, 'brand_normalizer', None)
+        if normalizer is None:
+            return np.asarray(brand_from_car_name(car_names), dtype=object)
+        return normalizer.transform(car_names)
+
+    def prepare_columns(self, rows):
+        """Сырые колонки -> numpy-колонки с брендом и производными признаками (до кодирования)"""
+        columns = {column: np.asarray(rows[column]) for column in self.raw_columns if column != 'brand'}
+        # float32 из типизированного загрузчика - к значениям из CSV, как при обучении
+        columns.update({column: restore_float64(values) for column, values in columns.items()
+                        if values.dtype == np.float32})
+        columns['brand'] = np.asarray(rows['brand']) if 'brand' in rows else self._brands(rows['CarName'])
+        return create_new_features(columns)
+
+    def build_array(self, rows):
+        return self.encoder.encode(self.prepare_columns(rows), dtype=np.float32)
+
+    def predict_array(self, X):
+        return self.forest.predict(X)
+
+    def predict_rows(self, rows):
+        """Prediction(price, is_premium, premium_proba) для dict колонок"""
+        return self.predict_array(self.build_array(rows))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump({'version': SLIM_BUNDLE_VERSION, 'predictor': self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+        if bundle.get('version') != SLIM_BUNDLE_VERSION:
+            raise ValueError(f"Несовместимая версия {path}: {bundle.get('version')}, ожидается {SLIM_BUNDLE_VERSION}")
+        return bundle['predictor']
+
+
+def export_slim_bundle(models_dir):
+    """
+    Экспорт slim_bundle.pkl и упакованного slim_bundle.bin рядом с моделями,
+    вызывается после сохранения моделей
+    """
+    from src.inference.batch import BatchPredictor
+    from src.inference.packed import export_packed_bundle
+
+    path = os.path.join(models_dir, SLIM_BUNDLE)
+    predictor = SlimPredictor.from_batch_predictor(BatchPredictor.from_dir(models_dir))
+    predictor.save(path)
+    export_packed_bundle(models_dir, predictor)
+    return path
@@ -0,0 +1,117 @@
+"""
+Потоковый скоринг файлов больше памяти: CSV читается кусками по chunksize строк,
+каждый кусок проходит препроцессор и обе модели, предсказания сразу дописываются в CSV или Parquet.
+Память ограничена размером куска и не зависит от размера файла
+
+Запуск из корня проекта:
+    python -m src.inference.streaming data/raw/car_data.csv predictions.parquet --chunksize 100000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.derived import NEW_FEATURES
+from src.inference.batch import BatchPredictor, MODELS_DIR
+
+
+def input_columns(predictor, header=()):
+    """
+    Колонки входного CSV, нужные для предсказания: остальные не читаются.
+    Бренд берётся из колонки brand, если она есть в header, иначе выводится из CarName
+    """
+    preprocessor = predictor.preprocessor
+    columns = [column for column in preprocessor.numeric_columns if column not in NEW_FEATURES]
+    columns += [column for column in preprocessor.label_encoders]
+    columns += [column for column in preprocessor.onehot_encoders if column != 'brand']
+    return columns + ['brand' if 'brand' in header else 'CarName']
+
+
+class PredictionWriter:
+    """Дозапись предсказаний по кускам: CSV (заголовок один раз) или Parquet (одна схема на файл)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = 'parquet' if path.endswith(('.parquet', '.pq')) else 'csv'
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.format == 'csv':
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        elif self._first and self.format == 'csv':
+            # Пустой вход - файл с одним заголовком
+            pd.DataFrame(columns=['price', 'is_premium', 'premium_proba']).to_csv(self.path, index=False)
+
+
+def score_file(input_path, output_path, predictor=None, chunksize=100_000, keep_columns=('car_ID',),
+               models_dir=MODELS_DIR):
+    """
+    Предсказания для всех строк input_path в output_path (.csv или .parquet).
+    keep_columns из входа (например, car_ID) копируются в выход, если они есть.
+    Возвращает статистику: строки, куски, секунды
+    """
+    predictor = BatchPredictor.from_dir(models_dir, compiled=True) if predictor is None else predictor
+
+    header = pd.read_csv(input_path, nrows=0).columns
+    keep = [column for column in keep_columns if column in header]
+    usecols = [column for column in input_columns(predictor, header) + keep if column in header]
+
+    writer = PredictionWriter(output_path)
+    buffer = None
+    rows, chunks = 0, 0
+    start = time.perf_counter()
+    try:
+        for chunk in pd.read_csv(input_path, usecols=usecols, chunksize=chunksize):
+            # Файл из одного заголовка даёт пустой кусок
+            if not len(chunk):
+                continue
+            # Матрица признаков выделяется один раз и переиспользуется всеми кусками
+            if buffer is None:
+                buffer = np.empty((chunksize, len(predictor.feature_names)), dtype=np.float32)
+            X = predictor.build_array(chunk, out=buffer[:len(chunk)])
+            prediction = predictor.predict_array(X)
+
+            result = pd.DataFrame({column: chunk[column].to_numpy() for column in keep})
+            for name, values in prediction._asdict().items():
+                result[name] = values
+            writer.write(result)
+
+            rows += len(chunk)
+            chunks += 1
+    finally:
+        writer.close()
+
+    return {'rows': rows, 'chunks': chunks, 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input')
+    parser.add_argument('output', help='.csv или .parquet')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    stats = score_file(args.input, args.output, chunksize=args.chunksize, models_dir=args.models_dir)
+    print(f"{stats['rows']:,} строк за {stats['seconds']:.1f} с "
+          f"({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} строк/с) -> {os.path.abspath(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Анализ «что если» для одной машины: базовая конфигурация и один-два параметра с диапазонами
+превращаются в сетку строк, которая считается одним вызовом предиктора. Производные признаки
+(power_to_weight, mpg_avg, size_ratio) считаются векторно по всей сетке в prepare_columns,
+поэтому сетка 50x50 стоит один пакет из 2500 строк, а не 2500 отдельных запросов.
+
+Предиктор - SlimPredictor или обёртка с тем же интерфейсом (build_array + predict_array).
+Кэш предсказаний для сетки не нужен: строки сетки почти не повторяются и вытеснили бы из кэша
+обычные запросы, поэтому лучше передавать SlimPredictor без CachedPredictor
+"""
+import numpy as np
+
+MAX_GRID_ROWS = 250_000
+
+
+def grid_rows(base, params):
+    """
+    dict колонок для всех комбинаций значений params ({колонка: значения}, первая колонка - первая ось).
+    base - конфигурация машины: скаляры или последовательности из одного значения, как в форме приложения
+    """
+    if not params:
+        raise ValueError("Нужен хотя бы один параметр")
+    axes = [np.asarray(values, dtype=np.float64).ravel() for values in params.values()]
+    n_rows = int(np.prod([len(axis) for axis in axes]))
+    if n_rows > MAX_GRID_ROWS:
+        raise ValueError(f"Сетка из {n_rows} строк больше {MAX_GRID_ROWS}")
+
+    rows = {column: np.repeat(np.ravel(value)[:1], n_rows) for column, value in base.items()
+            if column not in params}
+    for column, grid in zip(params, np.meshgrid(*axes, indexing='ij')):
+        rows[column] = grid.ravel()
+    return rows
+
+
+class SweepResult:
+    """Поверхности price, is_premium, premium_proba формы (len(axes[0]), len(axes[1]), ...)"""
+
+    def __init__(self, names, axes, prediction):
+        self.names = list(names)
+        self.axes = axes
+        shape = tuple(len(axis) for axis in axes)
+        self.price = np.asarray(prediction.price).reshape(shape)
+        self.is_premium = np.asarray(prediction.is_premium).reshape(shape)
+        self.premium_proba = np.asarray(prediction.premium_proba).reshape(shape)
+
+    def to_frame(self):
+        """Длинная таблица: колонки параметров, price, is_premium, premium_proba (для графиков)"""
+        import pandas as pd
+
+        grids = np.meshgrid(*self.axes, indexing='ij')
+        columns = {name: grid.ravel() for name, grid in zip(self.names, grids)}
+        columns.update({'price': self.price.ravel(), 'is_premium': self.is_premium.ravel(),
+                        'premium_proba': self.premium_proba.ravel()})
+        return pd.DataFrame(columns)
+
+
+def sweep(predictor, base, params):
+    """Предсказания для всей сетки params вокруг base одним пакетом"""
+    axes = [np.asarray(values, dtype=np.float64).ravel() for values in params.values()]
+    prediction = predictor.predict_array(predictor.build_array(grid_rows(base, params)))
+    return SweepResult(params.keys(), axes, prediction)
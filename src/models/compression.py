@@ -0,0 +1,348 @@
+"""
+Сжатие обученных лесов под бюджет задержки: меньшие варианты модели и таблица Парето
+качество / задержка / размер на отложенной выборке (X_test того же разбиения, что в ноутбуках).
+
+Варианты:
+- subset: первые k деревьев (то же, что n_estimators=k) или жадный отбор k деревьев по OOB-ошибке
+  подансамбля (out-of-bag строки каждого дерева восстанавливаются по его random_state)
+- depth: все деревья обрезаются до глубины d без переобучения - узел на глубине d становится листом,
+  в узлах sklearn уже хранится среднее (доли классов) по попавшим в него строкам
+- distill: одно неглубокое дерево, обученное на предсказаниях леса по X_train и синтетическим строкам
+
+Каждый вариант - тот же RandomForestRegressor/RandomForestClassifier с меньшим estimators_, поэтому
+его можно сохранить на место исходной модели, и slim/packed-бандл собирается как обычно.
+Задержка измеряется на CompiledForest (тот же обход, что в slim-инференсе): медиана по одной строке
+и строк/с на пакете.
+
+Запуск из корня проекта:
+    python -m src.models.compression --target price
+    python -m src.models.compression --slo-ms 0.5 --out-dir models_compressed
+"""
+import argparse
+import copy
+import os
+import pickle
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+from sklearn.metrics import get_scorer
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from src.data.loader import load_car_data
+from src.data.synthetic import generate_car_data
+from src.features.preprocessing import CarPricePreprocessor
+from src.inference.batch import MODELS_DIR, load_artifacts
+from src.inference.forest import CompiledForest
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL
+from src.models.incremental import tree_batches
+from src.models.tuning import SCORING
+
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+DEFAULT_TREES = [5, 10, 25, 50, 100]
+DEFAULT_DEPTHS = [4, 6, 8, 10, 12]
+DEFAULT_DISTILL_DEPTHS = [4, 6, 8, 10, 12]
+
+
+def subset_forest(model, indices):
+    """Копия леса только с деревьями indices (в исходном порядке)"""
+    indices = sorted(indices)
+    batches = tree_batches(model)
+    forest = copy.copy(model)
+    forest.estimators_ = [model.estimators_[i] for i in indices]
+    forest.n_estimators = len(indices)
+    forest.tree_batches_ = [batches[i] for i in indices]
+    return forest
+
+
+def _cap_tree(estimator, max_depth):
+    """Копия дерева sklearn, обрезанного до max_depth, с перенумерацией оставшихся узлов"""
+    tree = estimator.tree_
+    if tree.max_depth <= max_depth:
+        return estimator
+    cls, args, state = tree.__reduce__()
+    nodes, values = state['nodes'], state['values']
+
+    # 1. Обход в ширину от корня до max_depth, порядок обхода - новая нумерация
+    order, depth = [0], [0]
+    for node, node_depth in zip(order, depth):
+        if node_depth < max_depth and nodes['left_child'][node] != TREE_LEAF:
+            order += [nodes['left_child'][node], nodes['right_child'][node]]
+            depth += [node_depth + 1, node_depth + 1]
+    order, depth = np.array(order), np.array(depth)
+    new_id = np.full(len(nodes), TREE_LEAF)
+    new_id[order] = np.arange(len(order))
+
+    # 2. Узлы на max_depth становятся листьями, у остальных дети перенумеровываются
+    capped = nodes[order].copy()
+    leaf = (capped['left_child'] == TREE_LEAF) | (depth == max_depth)
+    capped['left_child'] = np.where(leaf, TREE_LEAF, new_id[capped['left_child']])
+    capped['right_child'] = np.where(leaf, TREE_LEAF, new_id[capped['right_child']])
+    capped['feature'][leaf] = TREE_UNDEFINED
+    capped['threshold'][leaf] = TREE_UNDEFINED
+    capped['missing_go_to_left'][leaf] = 0
+
+    new_tree = cls(*args)
+    new_tree.__setstate__({**state, 'max_depth': int(depth.max()), 'node_count': len(order),
+                           'nodes': capped, 'values': np.ascontiguousarray(values[order])})
+    capped_estimator = copy.copy(estimator)
+    capped_estimator.tree_ = new_tree
+    capped_estimator.max_depth = max_depth
+    return capped_estimator
+
+
+def cap_depth(model, max_depth):
+    """Копия леса, все деревья которого обрезаны до max_depth"""
+    forest = copy.copy(model)
+    forest.estimators_ = [_cap_tree(estimator, max_depth) for estimator in model.estimators_]
+    forest.max_depth = max_depth
+    return forest
+
+
+def _positive_output(model, X):
+    # Выход дерева/леса, который усредняется: цена или вероятность положительного класса
+    if hasattr(model, 'classes_'):
+        return model.predict_proba(X)[:, list(model.classes_).index(1)]
+    return model.predict(X)
+
+
+def greedy_subset(model, X_train, y_train, n_trees):
+    """
+    Жадный отбор n_trees деревьев: на каждом шаге добавляется дерево, сильнее всего уменьшающее
+    OOB-ошибку (MSE, для классификатора - Брайер) выбранного подансамбля.
+    X_train, y_train - те же строки, на которых обучался лес, иначе OOB-маски неверны
+    """
+    X = np.asarray(X_train, dtype=np.float32)
+    y = np.asarray(y_train, dtype=np.float64)
+    n_samples = len(X)
+    if getattr(model, '_n_samples', n_samples) != n_samples:
+        raise ValueError(f"Лес обучен на {model._n_samples} строках, передано {n_samples}")
+    n_bootstrap = _get_n_samples_bootstrap(n_samples, model.max_samples)
+
+    outputs = np.array([_positive_output(estimator, X) for estimator in model.estimators_])
+    if model.bootstrap:
+        oob = np.zeros_like(outputs, dtype=bool)
+        for i, estimator in enumerate(model.estimators_):
+            oob[i, _generate_unsampled_indices(estimator.random_state, n_samples, n_bootstrap)] = True
+    else:
+        oob = np.ones_like(outputs, dtype=bool)
+    outputs = np.where(oob, outputs, 0.0)
+
+    total, count = np.zeros(n_samples), np.zeros(n_samples)
+    fallback = y.mean()
+    selected, remaining = [], list(range(len(model.estimators_)))
+    for _ in range(min(n_trees, len(remaining))):
+        candidate_total = total + outputs[remaining]
+        candidate_count = count + oob[remaining]
+        prediction = np.where(candidate_count > 0, candidate_total / np.maximum(candidate_count, 1), fallback)
+        best = int(np.argmin(((prediction - y) ** 2).mean(axis=1)))
+        tree = remaining.pop(best)
+        selected.append(tree)
+        total += outputs[tree]
+        count += oob[tree]
+    return subset_forest(model, selected)
+
+
+def distill(model, X, max_depth, random_state=42):
+    """
+    Одно дерево глубины max_depth, обученное повторять лес на строках X. Результат - лес из одного
+    дерева с теми же атрибутами, что у исходного (сохраняется и экспортируется так же)
+    """
+    X = pd.DataFrame(np.asarray(X, dtype=np.float32), columns=model.feature_names_in_)
+    if hasattr(model, 'classes_'):
+        student = DecisionTreeClassifier(max_depth=max_depth, random_state=random_state)
+        student.fit(X, model.predict(X))
+    else:
+        student = DecisionTreeRegressor(max_depth=max_depth, random_state=random_state)
+        student.fit(X, model.predict(X))
+
+    forest = copy.copy(model)
+    forest.estimators_ = [student]
+    forest.n_estimators = 1
+    forest.max_depth = max_depth
+    forest.tree_batches_ = [max(tree_batches(model))]
+    return forest
+
+
+def measure_latency(model, X, n_single=300, batch_size=1000):
+    """Медиана задержки одной строки (мс) и строк/с на пакете batch_size через CompiledForest"""
+    compiled = CompiledForest(model)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    for i in range(min(n_single, 20)):
+        compiled.predict(X[i % len(X):i % len(X) + 1])
+
+    timings = []
+    for i in range(n_single):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        compiled.predict(row)
+        timings.append(time.perf_counter() - start)
+
+    batch = X[np.arange(batch_size) % len(X)]
+    start = time.perf_counter()
+    compiled.predict(batch)
+    batch_seconds = time.perf_counter() - start
+    return float(np.median(timings)) * 1000, batch_size / batch_seconds
+
+
+def model_size(model):
+    """Число узлов и размер pickle в КБ"""
+    nodes = sum(estimator.tree_.node_count for estimator in model.estimators_)
+    return nodes, len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024
+
+
+def pareto_front(frame, columns=('score', 'p50_ms', 'size_kb')):
+    """Маска недоминируемых строк: score максимизируется, задержка и размер минимизируются"""
+    values = frame[list(columns)].to_numpy(dtype=np.float64) * np.array([-1.0] + [1.0] * (len(columns) - 1))
+    dominated = np.zeros(len(values), dtype=bool)
+    for i, row in enumerate(values):
+        others = np.delete(values, i, axis=0)
+        dominated[i] = bool(((others <= row).all(axis=1) & (others < row).any(axis=1)).any())
+    return ~dominated
+
+
+class Compressor:
+    """
+    Варианты сжатия одного леса и их оценка. split - (X_train, X_test, y_train, y_test)
+    из CarPricePreprocessor.fit_transform, augment - сколько синтетических строк добавить к X_train
+    при дистилляции
+    """
+
+    def __init__(self, model, target, split, preprocessor=None, augment=5000, seed=42):
+        self.model = model
+        self.target = target
+        self.X_train, self.X_test, self.y_train, self.y_test = split
+        self.preprocessor = preprocessor
+        self.augment = augment
+        self.seed = seed
+        self.scorer = get_scorer(SCORING[target])
+        self._distill_X = None
+
+    def _distill_rows(self):
+        if self._distill_X is None:
+            X = self.X_train.to_numpy(dtype=np.float32)
+            if self.preprocessor is not None and self.augment:
+                # Синтетика только из обучающих строк, чтобы X_test не попал в дистилляцию
+                source = load_car_data().loc[self.X_train.index]
+                synthetic = generate_car_data(self.augment, seed=self.seed, source=source)
+                X = np.vstack([X, self.preprocessor.transform_array(synthetic, list(self.model.feature_names_in_))])
+            self._distill_X = X
+        return self._distill_X
+
+    def variants(self, trees=DEFAULT_TREES, depths=DEFAULT_DEPTHS, distill_depths=DEFAULT_DISTILL_DEPTHS,
+                 greedy=True):
+        """Генератор (метод, параметр, модель), первым идёт исходный лес"""
+        yield 'original', len(self.model.estimators_), self.model
+        for k in trees:
+            if k < len(self.model.estimators_):
+                yield 'first', k, subset_forest(self.model, range(k))
+                if greedy:
+                    yield 'greedy', k, greedy_subset(self.model, self.X_train, self.y_train, k)
+        max_depth = max(estimator.tree_.max_depth for estimator in self.model.estimators_)
+        for depth in depths:
+            if depth < max_depth:
+                yield 'depth', depth, cap_depth(self.model, depth)
+        for depth in distill_depths:
+            yield 'distill', depth, distill(self.model, self._distill_rows(), depth, self.seed)
+
+    def evaluate(self, model, n_single=300, batch_size=1000):
+        X_test = self.X_test[list(model.feature_names_in_)]
+        p50_ms, rows_per_s = measure_latency(model, X_test, n_single, batch_size)
+        nodes, size_kb = model_size(model)
+        return {
+            'trees': len(model.estimators_),
+            'max_depth': max(estimator.tree_.max_depth for estimator in model.estimators_),
+            'nodes': nodes,
+            'size_kb': size_kb,
+            'score': float(self.scorer(model, X_test, self.y_test)),
+            'p50_ms': p50_ms,
+            'rows_per_s': rows_per_s,
+        }
+
+    def run(self, **kwargs):
+        """Таблица всех вариантов с колонкой pareto и словарь {(метод, параметр): модель}"""
+        rows, models = [], {}
+        for method, param, model in self.variants(**kwargs):
+            rows.append({'method': method, 'param': param, **self.evaluate(model)})
+            models[(method, param)] = model
+        frame = pd.DataFrame(rows)
+        frame['pareto'] = pareto_front(frame)
+        return frame, models
+
+
+def pick(frame, slo_ms=None, max_size_kb=None):
+    """Лучший по качеству вариант, укладывающийся в бюджет задержки и размера, или None"""
+    candidates = frame
+    if slo_ms is not None:
+        candidates = candidates[candidates['p50_ms'] <= slo_ms]
+    if max_size_kb is not None:
+        candidates = candidates[candidates['size_kb'] <= max_size_kb]
+    if candidates.empty:
+        return None
+    return candidates.sort_values(['score', 'p50_ms'], ascending=[False, True]).iloc[0]
+
+
+def load_split(target):
+    """Отложенная выборка того же разбиения, что в ноутбуках и пайплайне, и обученный на X_train препроцессор"""
+    preprocessor = CarPricePreprocessor(models_dir=None)
+    split = preprocessor.fit_transform(load_car_data(), target)
+    return preprocessor, split
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--target', choices=['price', 'is_premium', 'both'], default='both')
+    parser.add_argument('--trees', type=int, nargs='*', default=DEFAULT_TREES)
+    parser.add_argument('--depths', type=int, nargs='*', default=DEFAULT_DEPTHS)
+    parser.add_argument('--distill-depths', type=int, nargs='*', default=DEFAULT_DISTILL_DEPTHS)
+    parser.add_argument('--augment', type=int, default=5000, help='Синтетических строк для дистилляции')
+    parser.add_argument('--no-greedy', action='store_true', help='Без жадного отбора деревьев по OOB')
+    parser.add_argument('--slo-ms', type=float, default=None, help='Бюджет задержки одной строки на модель, мс')
+    parser.add_argument('--max-size-kb', type=float, default=None)
+    parser.add_argument('--pareto-only', action='store_true')
+    parser.add_argument('--out-dir', help='Сохранить выбранные по --slo-ms варианты вместо исходных моделей')
+    args = parser.parse_args()
+
+    artifacts = load_artifacts(args.models_dir)
+    targets = ['price', 'is_premium'] if args.target == 'both' else [args.target]
+    models = {'price': artifacts['model_reg'], 'is_premium': artifacts['model_clf']}
+    chosen = {}
+
+    pd.set_option('display.width', 160)
+    for target in targets:
+        preprocessor, split = load_split(target)
+        compressor = Compressor(models[target], target, split, preprocessor, args.augment)
+        frame, variants = compressor.run(trees=args.trees, depths=args.depths, distill_depths=args.distill_depths,
+                                         greedy=not args.no_greedy)
+        shown = frame[frame['pareto']] if args.pareto_only else frame
+        print(f"\n📊 {target}: {SCORING[target]} на X_test ({len(split[1])} строк)")
+        print(shown.sort_values('p50_ms').to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+
+        best = pick(frame, args.slo_ms, args.max_size_kb)
+        if best is None:
+            print(f"⚠️  Ни один вариант не укладывается в бюджет")
+        else:
+            print(f"🎯 Выбран {best['method']}={best['param']}: {SCORING[target]} {best['score']:.4f}, "
+                  f"{best['p50_ms']:.3f} мс, {best['size_kb']:.0f} КБ")
+            chosen[target] = variants[(best['method'], best['param'])]
+
+    if args.out_dir:
+        if os.path.abspath(args.out_dir) != os.path.abspath(args.models_dir):
+            shutil.copytree(args.models_dir, args.out_dir, dirs_exist_ok=True)
+        for target, model in chosen.items():
+            joblib.dump(model, os.path.join(args.out_dir, REGRESSION_MODEL if target == 'price' else CLASSIFIER_MODEL))
+        from src.analysis.importance import prerender_importance_charts
+        from src.inference.slim import export_slim_bundle
+        export_slim_bundle(args.out_dir)
+        prerender_importance_charts(args.out_dir)
+        print(f"✅ Модели сохранены: {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
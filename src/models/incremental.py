@@ -0,0 +1,249 @@
+"""
+Инкрементальное дообучение сохранённых моделей на новых объявлениях.
+
+1. Препроцессор обновляется онлайн (partial_fit): статистики scaler и классы Label Encoding
+2. Пороги старых деревьев пересчитываются в новую шкалу scaler: x <= t в старой шкале
+   эквивалентно x' <= t' в новой: порог ставится по границе в исходных единицах, поэтому старые деревья
+   отправляют каждую строку в тот же лист, что до обновления
+3. К обоим лесам добавляются деревья, обученные только на новых данных (warm_start)
+4. По желанию удаляются самые старые деревья: по числу деревьев или по возрасту пакета
+
+Время дообучения зависит от размера новых данных, а не от всей истории.
+
+Запуск из корня проекта:
+    python -m src.models.incremental new_listings.csv --trees 20 --max-trees 300
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.analysis.importance import prerender_importance_charts
+from src.data.loader import load_car_data
+from src.features.brands import brand_from_car_name
+from src.features.target_engineering import create_premium_target, premium_thresholds
+from src.inference.batch import MODELS_DIR, BatchPredictor, load_artifacts
+from src.inference.neighbors import COMPARABLES_INDEX, update_comparables_index
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL
+from src.inference.slim import SLIM_BUNDLE, SlimPredictor, export_slim_bundle
+
+
+def tree_batches(model):
+    """Номер пакета данных для каждого дерева леса, 0 - исходное обучение"""
+    batches = getattr(model, 'tree_batches_', None)
+    if batches is None or len(batches) != len(model.estimators_):
+        batches = [0] * len(model.estimators_)
+    return list(batches)
+
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _encode(raw, mean, scale):
+    """Те же операции, что в CompiledEncoder: (x - mean) / scale в float64, затем float32 в дереве"""
+    return ((raw - mean) / scale).astype(np.float32).astype(np.float64)
+
+
+def _ordered_bits(x):
+    """float64 -> int64 с тем же порядком: соседние числа float64 отличаются на 1"""
+    bits = x.view(np.int64)
+    return np.where(bits < 0, -(bits & _SIGN_MASK), bits)
+
+
+def _from_ordered_bits(key):
+    return np.where(key < 0, (-key) | ~_SIGN_MASK, key).view(np.float64)
+
+
+def _left_boundary(threshold, mean, scale):
+    """
+    Наибольшее сырое значение float64, которое после кодирования идёт в левую ветвь (<= threshold).
+    Кодирование монотонно, поэтому граница ищется бинарным поиском по порядковым номерам float64 -
+    не больше 64 шагов для всех узлов сразу
+    """
+    raw = threshold * scale + mean
+    # raw - scale и raw + scale кодируются примерно в threshold - 1 и threshold + 1
+    low, high = _ordered_bits(raw - scale), _ordered_bits(raw + scale)
+    while True:
+        active = high - low > 1
+        if not active.any():
+            return _from_ordered_bits(low)
+        middle = low + (high - low) // 2
+        left = _encode(_from_ordered_bits(middle), mean, scale) <= threshold
+        low = np.where(active & left, middle, low)
+        high = np.where(active & ~left, middle, high)
+
+
+def _shortest_decimal(raw, value, mean, scale, max_digits=8):
+    """
+    Самое короткое десятичное число, которое кодируется в тот же float32 value, что и raw
+    (NaN, если такого нет до max_digits знаков после запятой)
+    """
+    shortest = np.full(len(raw), np.nan)
+    for digits in range(max_digits + 1):
+        candidate = np.round(raw, digits)
+        found = np.isnan(shortest) & (_encode(candidate, mean, scale) == value)
+        shortest[found] = candidate[found]
+    return shortest
+
+
+def rescale_thresholds(model, numeric_columns, old_stats, new_stats):
+    """
+    Пересчёт порогов по масштабированным признакам в шкалу обновлённого scaler.
+    Деревья сравнивают признаки во float32, и порог часто совпадает с кодом значения из данных:
+    середина между 94.5 и 95.7 - это 95.1, поэтому t * a + b перебрасывает такие строки через порог
+    из-за округления. Вместо этого ищется граница в исходных единицах - последнее значение float64,
+    которое в старой шкале шло влево, и следующее за ним. Новый порог ставится посередине между их
+    кодами float32 в новой шкале, и решение узла не меняется ни для какого сырого значения.
+
+    Если новая шкала грубее и оба значения попадают в один float32, точного порога нет: этот float32
+    отправляется туда же, куда в старой шкале шло самое короткое десятичное число с тем же кодом
+    (значения в CSV записаны с несколькими знаками, 95.1, а не 95.09999988)
+    """
+    # Параметры scaler для каждого признака модели, остальные признаки (One-Hot, Label) не пересчитываются
+    index = {name: i for i, name in enumerate(model.feature_names_in_)}
+    positions = np.array([index[column] for column in numeric_columns])
+    is_numeric = np.zeros(model.n_features_in_, dtype=bool)
+    is_numeric[positions] = True
+    old_mean, old_scale, new_mean, new_scale = (np.zeros(model.n_features_in_), np.ones(model.n_features_in_),
+                                                np.zeros(model.n_features_in_), np.ones(model.n_features_in_))
+    (old_mean[positions], old_scale[positions]), (new_mean[positions], new_scale[positions]) = old_stats, new_stats
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        split = np.flatnonzero((tree.feature >= 0) & is_numeric[np.maximum(tree.feature, 0)])
+        feature = tree.feature[split]
+        threshold = tree.threshold[split]
+
+        # 1. Граница в исходных единицах и коды её соседей в новой шкале
+        last_left = _left_boundary(threshold, old_mean[feature], old_scale[feature])
+        value_left = _encode(last_left, new_mean[feature], new_scale[feature])
+        value_right = _encode(np.nextafter(last_left, np.inf), new_mean[feature], new_scale[feature])
+        new_threshold = value_left / 2 + value_right / 2
+
+        # 2. Склеенные значения: весь float32 уходит на сторону самого короткого десятичного числа в нём
+        merged = value_right == value_left
+        if merged.any():
+            mean, scale = new_mean[feature[merged]], new_scale[feature[merged]]
+            value = value_left[merged]
+            shortest = _shortest_decimal(last_left[merged], value, mean, scale)
+            goes_right = _encode(shortest, old_mean[feature[merged]], old_scale[feature[merged]]) > threshold[merged]
+            below = np.nextafter(value.astype(np.float32), np.float32(-np.inf)).astype(np.float64)
+            new_threshold[merged] = np.where(goes_right, value / 2 + below / 2, value)
+
+        tree.threshold[split] = new_threshold
+
+
+def add_trees(model, X, y, n_trees, batch):
+    """n_trees новых деревьев, обученных на X, y, в конец леса"""
+    if hasattr(model, 'classes_') and set(np.unique(y)) != set(model.classes_):
+        raise ValueError(f"В новых данных должны быть все классы {list(model.classes_)}, есть {list(np.unique(y))}")
+    batches = tree_batches(model)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_trees)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+    model.tree_batches_ = batches + [batch] * n_trees
+    return model
+
+
+def prune_trees(model, max_trees=None, max_age=None):
+    """
+    Удаление старых деревьев: сначала пакеты старше max_age пакетов от последнего,
+    затем самые старые деревья сверх max_trees. Это отсечка, а не веса голосов по возрасту:
+    все предикторы (FusedForestPredictor, packed-бандл, Explainer) усредняют деревья поровну
+    """
+    batches = np.array(tree_batches(model))
+    keep = np.arange(len(batches))
+    if max_age is not None:
+        keep = keep[batches.max() - batches[keep] <= max_age]
+    if max_trees is not None and len(keep) > max_trees:
+        keep = np.sort(keep[np.argsort(batches[keep], kind='stable')][-max_trees:])
+
+    model.estimators_ = [model.estimators_[i] for i in keep]
+    model.n_estimators = len(model.estimators_)
+    model.tree_batches_ = batches[keep].tolist()
+    return model
+
+
+def premium_labels(df, thresholds):
+    """is_premium для новых строк по порогам истории, а не по перцентилям самого пакета"""
+    df = df.copy()
+    if 'brand' not in df:
+        df['brand'] = brand_from_car_name(df['CarName'])
+    return create_premium_target(df, thresholds)['is_premium']
+
+
+def update_models(df_new, models_dir=MODELS_DIR, out_dir=None, n_trees=20, max_trees=None, max_age=None,
+                  thresholds=None):
+    """
+    Дообучение препроцессора и обоих лесов на df_new (формат car_data.csv с ценой) и сохранение
+    в out_dir (по умолчанию - на место). thresholds - пороги премиальности, по умолчанию из car_data.csv
+    """
+    out_dir = out_dir or models_dir
+    artifacts = load_artifacts(models_dir)
+    preprocessor, model_reg, model_clf = artifacts['preprocessor'], artifacts['model_reg'], artifacts['model_clf']
+    stats = {'rows': len(df_new)}
+    start = time.perf_counter()
+
+    # 1. Онлайн-обновление препроцессора
+    old_stats = preprocessor.partial_fit(df_new)
+    new_stats = (preprocessor.scaler.mean_, preprocessor.scaler.scale_)
+
+    # 2. Старые деревья - в новую шкалу признаков
+    for model in (model_reg, model_clf):
+        rescale_thresholds(model, preprocessor.numeric_columns, old_stats, new_stats)
+
+    # 3. Новые деревья только на новых данных
+    thresholds = premium_thresholds(load_car_data()) if thresholds is None else thresholds
+    targets = {model_reg: df_new['price'],
+               model_clf: df_new['is_premium'] if 'is_premium' in df_new else premium_labels(df_new, thresholds)}
+    batch = max(tree_batches(model_reg) + tree_batches(model_clf)) + 1
+    for model, y in targets.items():
+        feature_names = list(model.feature_names_in_)
+        X = pd.DataFrame(preprocessor.transform_array(df_new, feature_names, dtype=np.float64),
+                         columns=feature_names)
+        add_trees(model, X, np.asarray(y), n_trees, batch)
+        # 4. Удаление старых деревьев
+        prune_trees(model, max_trees, max_age)
+    stats['fit_seconds'] = time.perf_counter() - start
+
+    # 5. Сохранение: модели, препроцессор, старые pkl, slim-бандл, если он использовался, и графики важности
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(model_reg, os.path.join(out_dir, REGRESSION_MODEL))
+    joblib.dump(model_clf, os.path.join(out_dir, CLASSIFIER_MODEL))
+    preprocessor.save_legacy_artifacts(out_dir)
+    preprocessor.save(os.path.join(out_dir, 'preprocessor.pkl'))
+    if os.path.exists(os.path.join(models_dir, SLIM_BUNDLE)) or out_dir != models_dir:
+        export_slim_bundle(out_dir)
+    prerender_importance_charts(out_dir)
+
+    # 6. Индекс похожих машин: новые объявления попадают в дельта-буфер
+    if os.path.exists(os.path.join(models_dir, COMPARABLES_INDEX)):
+        predictor = SlimPredictor.from_batch_predictor(BatchPredictor(preprocessor, model_reg, model_clf))
+        update_comparables_index(models_dir, df_new, predictor, out_dir)
+
+    stats.update({'batch': batch, 'trees_reg': len(model_reg.estimators_), 'trees_clf': len(model_clf.estimators_),
+                  'total_seconds': time.perf_counter() - start})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', help='CSV с новыми объявлениями в формате car_data.csv')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--out-dir', default=None)
+    parser.add_argument('--trees', type=int, default=20, help='Сколько деревьев добавить в каждый лес')
+    parser.add_argument('--max-trees', type=int, default=None)
+    parser.add_argument('--max-age', type=int, default=None, help='Сколько последних пакетов оставить')
+    args = parser.parse_args()
+
+    stats = update_models(pd.read_csv(args.input), args.models_dir, args.out_dir, args.trees,
+                          args.max_trees, args.max_age)
+    print(f"✅ Пакет {stats['batch']}: {stats['rows']} строк, деревьев: регрессия {stats['trees_reg']}, "
+          f"классификация {stats['trees_clf']}, {stats['total_seconds']:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Подбор гиперпараметров случайного леса вне ноутбуков.
+
+- Предобработка и разбиение на фолды выполняются один раз и кэшируются на диск (npz),
+  ключ - хэш данных, таргет и параметры кросс-валидации
+- Каждая оценка (параметры + число деревьев + фолды + метрика) сохраняется в trials.jsonl,
+  повторный запуск с изменённой сеткой считает только новые точки
+- Successive halving: все кандидаты сначала оцениваются на малом числе деревьев,
+  дальше проходит только лучшая 1/factor часть
+- Кандидаты считаются в пуле процессов, новые задачи не запускаются после time_budget секунд
+
+Запуск из корня проекта:
+    python -m src.models.tuning --target price --search halving --workers 4 --time-budget 600
+    python -m src.models.tuning --target is_premium --search grid --save models/random_forest_classifier_final.pkl
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, StratifiedKFold
+
+from src.data.loader import load_car_data_typed
+from src.features.preprocessing import PREPROCESSOR_VERSION, CarPricePreprocessor
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../data/cache/tuning')
+
+# Сетки из notebooks/05_hyperparameter_tuning.ipynb
+PARAM_GRIDS = {
+    'price': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [10, 20, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+    },
+    'is_premium': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [5, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+    },
+}
+SCORING = {'price': 'r2', 'is_premium': 'f1'}
+
+
+def _digest(*parts):
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=12).hexdigest()
+
+
+def estimator_for(target, params, random_state=42):
+    model_class = RandomForestRegressor if target == 'price' else RandomForestClassifier
+    return model_class(random_state=random_state, n_jobs=1, **params)
+
+
+class FoldCache:
+    """
+    Предобработанные X_train/X_test и индексы фолдов на диске. Разбиение и предобработка
+    те же, что в ноутбуках (CarPricePreprocessor.fit_transform), артефакты моделей не сохраняются
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def key(self, df, target, n_splits, seed):
+        data_hash = int(pd.util.hash_pandas_object(df, index=False).sum())
+        return _digest('folds', data_hash, target, n_splits, seed, PREPROCESSOR_VERSION)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"folds_{key}.npz")
+
+    def get(self, df, target, n_splits=5, seed=42):
+        """Путь к npz с фолдами, при первом обращении предобработка и запись"""
+        key = self.key(df, target, n_splits, seed)
+        path = self.path(key)
+        if os.path.exists(path):
+            return key, path
+
+        X_train, X_test, y_train, y_test = CarPricePreprocessor(models_dir=None).fit_transform(df, target)
+        # Как в ноутбуках: KFold без перемешивания для регрессии (cv=5 в GridSearchCV),
+        # StratifiedKFold с перемешиванием для классификации
+        if target == 'price':
+            splitter = KFold(n_splits)
+        else:
+            splitter = StratifiedKFold(n_splits, shuffle=True, random_state=seed)
+        fold_of = np.empty(len(X_train), dtype=np.int8)
+        for fold, (_, valid_idx) in enumerate(splitter.split(X_train, y_train)):
+            fold_of[valid_idx] = fold
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, X_train=X_train.to_numpy(), y_train=y_train.to_numpy(),
+                 X_test=X_test.to_numpy(), y_test=y_test.to_numpy(),
+                 feature_names=np.array(X_train.columns, dtype=str), fold_of=fold_of)
+        os.replace(tmp, path)
+        return key, path
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+
+class TrialStore:
+    """Журнал оценок в jsonl: одна строка на (параметры, число деревьев, фолды, метрика)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.trials = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        trial = json.loads(line)
+                        self.trials[trial['key']] = trial
+
+    @staticmethod
+    def key(folds_key, target, scoring, params):
+        return _digest('trial', folds_key, target, scoring, params)
+
+    def get(self, key):
+        return self.trials.get(key)
+
+    def add(self, trial):
+        self.trials[trial['key']] = trial
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(trial, default=str) + '\n')
+
+
+# Фолды загружаются в воркер один раз при старте пула
+_worker_data = None
+
+
+def _init_worker(folds_path):
+    global _worker_data
+    _worker_data = FoldCache.load(folds_path)
+
+
+def _evaluate(task):
+    """Средняя метрика кросс-валидации для одного набора параметров"""
+    target, scoring, params = task
+    X, y, fold_of = _worker_data['X_train'], _worker_data['y_train'], _worker_data['fold_of']
+    scorer = get_scorer(scoring)
+
+    start = time.perf_counter()
+    scores = []
+    for fold in range(int(fold_of.max()) + 1):
+        train, valid = fold_of != fold, fold_of == fold
+        model = estimator_for(target, params).fit(X[train], y[train])
+        scores.append(scorer(model, X[valid], y[valid]))
+    return {'score': float(np.mean(scores)), 'std': float(np.std(scores)),
+            'fit_seconds': time.perf_counter() - start}
+
+
+def _normalize(params):
+    # numpy-типы из ParameterSampler -> python, чтобы ключи и json совпадали между запусками
+    return {name: value.item() if hasattr(value, 'item') else value for name, value in sorted(params.items())}
+
+
+class Tuner:
+    """
+    Оценка списков кандидатов с мемоизацией и пулом процессов. Общий time_budget
+    отсчитывается от создания объекта: после него новые оценки не запускаются
+    """
+
+    def __init__(self, df, target, cache_dir=CACHE_DIR, n_splits=5, seed=42, n_workers=None,
+                 time_budget=None, scoring=None):
+        self.target = target
+        self.scoring = scoring or SCORING[target]
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.time_budget = time_budget
+        self.started_at = time.monotonic()
+
+        self.folds_key, self.folds_path = FoldCache(cache_dir).get(df, target, n_splits, seed)
+        self.store = TrialStore(os.path.join(cache_dir, 'trials.jsonl'))
+        self.evaluated = 0
+        self.reused = 0
+        self.timed_out = False
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.n_workers, initializer=_init_worker,
+                                             initargs=(self.folds_path,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _out_of_time(self):
+        return self.time_budget is not None and time.monotonic() - self.started_at >= self.time_budget
+
+    def evaluate(self, candidates):
+        """Список trial-словарей для candidates: из журнала или новые оценки, не больше n_workers одновременно"""
+        results = {}
+        todo, queued = [], set()
+        for params in map(_normalize, candidates):
+            key = TrialStore.key(self.folds_key, self.target, self.scoring, params)
+            trial = self.store.get(key)
+            if trial is not None:
+                results[key] = trial
+                self.reused += 1
+            elif key not in queued:
+                queued.add(key)
+                todo.append((key, params))
+
+        running = {}
+        while todo or running:
+            while todo and len(running) < self.n_workers and not self._out_of_time():
+                key, params = todo.pop(0)
+                future = self._get_pool().submit(_evaluate, (self.target, self.scoring, params))
+                running[future] = (key, params)
+            if not running:
+                self.timed_out = True
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, params = running.pop(future)
+                trial = {'key': key, 'params': params, 'target': self.target, 'scoring': self.scoring,
+                         **future.result()}
+                self.store.add(trial)
+                results[key] = trial
+                self.evaluated += 1
+
+        return list(results.values())
+
+
+def _rank(trials):
+    return sorted(trials, key=lambda trial: -trial['score'])
+
+
+def grid_search(tuner, param_grid):
+    return _rank(tuner.evaluate(ParameterGrid(param_grid)))
+
+
+def random_search(tuner, param_distributions, n_iter=20, random_state=42):
+    return _rank(tuner.evaluate(ParameterSampler(param_distributions, n_iter, random_state=random_state)))
+
+
+def halving_search(tuner, param_grid, min_resources=25, max_resources=None, factor=3):
+    """
+    Successive halving по числу деревьев: кандидаты без n_estimators оцениваются на min_resources
+    деревьях, в следующий раунд проходит лучшая 1/factor часть с factor-кратным числом деревьев,
+    последний раунд - на max_resources (по умолчанию максимум n_estimators из сетки)
+    """
+    param_grid = dict(param_grid)
+    n_estimators = param_grid.pop('n_estimators', [100])
+    max_resources = max_resources or max(n_estimators)
+    candidates = [_normalize(params) for params in ParameterGrid(param_grid)]
+
+    # Число раундов - сколько раз min_resources * factor ** k укладывается в max_resources, в целых числах:
+    # floor(log(...)) на точных степенях даёт на раунд меньше из-за округления: log(243, 3) = 4.999...
+    n_rounds, resources = 1, min_resources
+    while resources * factor <= max_resources:
+        n_rounds, resources = n_rounds + 1, resources * factor
+
+    history = []
+    for round_ in range(n_rounds):
+        resources = max_resources if round_ == n_rounds - 1 else min_resources * factor ** round_
+        # Копии: записи в TrialStore общие для всех поисков и не должны получать номер раунда
+        trials = [dict(trial, round=round_) for trial in
+                  _rank(tuner.evaluate([{**params, 'n_estimators': resources} for params in candidates]))]
+        history.extend(trials)
+        if tuner.timed_out or len(trials) <= 1:
+            break
+        keep = max(1, math.ceil(len(trials) / factor))
+        candidates = [{name: value for name, value in trial['params'].items() if name != 'n_estimators'}
+                      for trial in trials[:keep]]
+
+    # Time budget закончился до первой оценки
+    if not history:
+        return []
+
+    # Лучший - с наибольшим числом деревьев среди оценённых в последнем раунде
+    last_round = max(trial['round'] for trial in history)
+    return _rank([trial for trial in history if trial['round'] == last_round]) + \
+        [trial for trial in history if trial['round'] != last_round]
+
+
+def fit_best(tuner, trial):
+    """Лучшая модель, обученная на всём X_train, и метрика на X_test"""
+    data = FoldCache.load(tuner.folds_path)
+    model = estimator_for(tuner.target, trial['params'])
+    model.fit(pd.DataFrame(data['X_train'], columns=data['feature_names']), data['y_train'])
+    X_test = pd.DataFrame(data['X_test'], columns=data['feature_names'])
+    return model, float(get_scorer(tuner.scoring)(model, X_test, data['y_test']))
+
+
+def trials_frame(trials):
+    return pd.DataFrame([{**trial['params'], 'score': trial['score'], 'std': trial['std'],
+                          'fit_seconds': trial['fit_seconds'], 'round': trial.get('round')}
+                         for trial in trials])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--target', choices=list(PARAM_GRIDS), default='price')
+    parser.add_argument('--search', choices=['grid', 'random', 'halving'], default='halving')
+    parser.add_argument('--grid', help='JSON с сеткой параметров, по умолчанию сетка из ноутбука')
+    parser.add_argument('--n-iter', type=int, default=20, help='Число кандидатов для random')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--time-budget', type=float, default=None, help='Секунды, после которых новые оценки не запускаются')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--save', help='Путь для сохранения лучшей модели (joblib)')
+    args = parser.parse_args()
+
+    param_grid = json.loads(args.grid) if args.grid else PARAM_GRIDS[args.target]
+    start = time.perf_counter()
+    with Tuner(load_car_data_typed(), args.target, args.cache_dir, n_workers=args.workers,
+               time_budget=args.time_budget) as tuner:
+        if args.search == 'grid':
+            trials = grid_search(tuner, param_grid)
+        elif args.search == 'random':
+            trials = random_search(tuner, param_grid, args.n_iter)
+        else:
+            trials = halving_search(tuner, param_grid)
+
+        if not trials:
+            print("Time budget закончился до первой оценки")
+            return
+        print(trials_frame(trials).head(10).to_string(index=False))
+        print(f"Новых оценок: {tuner.evaluated}, из журнала: {tuner.reused}, "
+              f"{time.perf_counter() - start:.1f} с{' (остановлено по time_budget)' if tuner.timed_out else ''}")
+
+        best = trials[0]
+        model, test_score = fit_best(tuner, best)
+        print(f"🎯 Лучшие параметры: {best['params']}")
+        print(f"📈 {tuner.scoring} CV: {best['score']:.4f}, test: {test_score:.4f}")
+        if args.save:
+            import joblib
+            joblib.dump(model, args.save)
+            print(f"✅ Модель сохранена: {args.save}")
+
+
+if __name__ == '__main__':
+    main()
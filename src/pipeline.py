@@ -0,0 +1,268 @@
+"""
+Пайплайн обучения одной командой вместо ноутбуков 02-05:
+load -> preprocess (price, is_premium) -> train_reg -> train_clf -> evaluate -> export.
+
+Ключ каждого этапа - хэш его параметров, ключей входных этапов и исходного кода модулей, от которых
+он зависит. Результат этапа лежит в data/cache/pipeline/<этап>-<ключ>/, этап с уже посчитанным ключом
+не выполняется, а берётся из кэша. Изменение параметров классификатора пересчитывает только
+train_clf, evaluate и export. В models/pipeline_manifest.json записываются ключи и время этапов.
+
+Запуск из корня проекта:
+    python -m src.pipeline
+    python -m src.pipeline --clf-params '{"n_estimators": 300, "max_depth": 10}'
+    python -m src.pipeline --force train_reg
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.metrics import (f1_score, mean_absolute_error, mean_squared_error, precision_score, r2_score,
+                             recall_score, roc_auc_score)
+
+from src.data.loader import DATA_PATH, file_digest, load_car_data_typed
+from src.features.preprocessing import MODELS_DIR, PREPROCESSOR_VERSION, CarPricePreprocessor
+from src.inference.neighbors import COMPARABLES_INDEX, export_comparables_index
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL
+from src.models.tuning import estimator_for
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/cache/pipeline')
+MANIFEST = 'pipeline_manifest.json'
+STAGES = ['load', 'preprocess_price', 'preprocess_is_premium', 'train_reg', 'train_clf', 'evaluate', 'export']
+
+# Параметры лесов по умолчанию, random_state задаётся в estimator_for
+DEFAULT_PARAMS = {
+    'price': {'n_estimators': 200},
+    'is_premium': {'n_estimators': 200},
+}
+
+# Исходники, изменение которых должно инвалидировать этап
+_FEATURE_SOURCES = ['data/loader.py', 'features/preprocessing.py', 'features/encoding.py',
+                    'features/brands.py', 'features/derived.py', 'features/target_engineering.py']
+# Форматы экспортируемых бандлов, индекса и графиков: их изменение переэкспортирует models/ без переобучения
+_EXPORT_SOURCES = ['inference/forest.py', 'inference/slim.py', 'inference/packed.py', 'inference/neighbors.py',
+                   'analysis/importance.py']
+
+
+def _digest(*parts):
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=12).hexdigest()
+
+
+def source_digest(paths):
+    """Хэш исходников относительно src/"""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.blake2b(digest_size=12)
+    for path in paths:
+        with open(os.path.join(src_dir, path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Этапы обучения с кэшем по ключу. run() выполняет все этапы по порядку и возвращает
+    {этап: {'key', 'cached', 'seconds'}}; force - этапы, которые пересчитываются в любом случае
+    """
+
+    def __init__(self, data_path=DATA_PATH, models_dir=MODELS_DIR, cache_dir=CACHE_DIR,
+                 reg_params=None, clf_params=None, n_jobs=-1, force=()):
+        self.data_path = data_path
+        self.models_dir = models_dir
+        self.cache_dir = cache_dir
+        self.params = {'price': dict(reg_params or DEFAULT_PARAMS['price']),
+                       'is_premium': dict(clf_params or DEFAULT_PARAMS['is_premium'])}
+        self.n_jobs = n_jobs
+        self.force = set(force)
+        self.keys = {}
+        self.report = {}
+        self._df = None
+
+    def _stage_dir(self, stage):
+        return os.path.join(self.cache_dir, f"{stage}-{self.keys[stage]}")
+
+    def _run(self, stage, key_parts, build):
+        """Этап с ключом из key_parts: build(out_dir) выполняется, только если результата в кэше нет"""
+        self.keys[stage] = _digest(stage, *key_parts)
+        out_dir = self._stage_dir(stage)
+        done = os.path.join(out_dir, 'done')
+        start = time.perf_counter()
+
+        cached = os.path.exists(done) and stage not in self.force
+        if not cached:
+            # Сборка во временную папку и переименование: прерванный этап не оставит полкэша
+            tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            build(tmp_dir)
+            open(os.path.join(tmp_dir, 'done'), 'w').close()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            os.replace(tmp_dir, out_dir)
+
+        self.report[stage] = {'key': self.keys[stage], 'cached': cached, 'seconds': time.perf_counter() - start}
+        return out_dir
+
+    def _data(self):
+        if self._df is None:
+            # Типизированный разбор с кэшем рядом с этапами: признаки и цена те же, что из read_csv
+            self._df = load_car_data_typed(self.data_path, cache_dir=os.path.join(self.cache_dir, 'data'))
+        return self._df
+
+    # 1. Загрузка: ключ - хэш содержимого CSV, сам CSV читается только если его ждёт пересчитываемый этап
+    def load(self):
+        return self._run('load', [file_digest(self.data_path)], lambda out_dir: None)
+
+    # 2. Предобработка и разбиение для одного таргета, как preprocess_data() в ноутбуках
+    def preprocess(self, target):
+        stage = f"preprocess_{target}"
+
+        def build(out_dir):
+            preprocessor = CarPricePreprocessor(models_dir=None)
+            X_train, X_test, y_train, y_test = preprocessor.fit_transform(self._data(), target)
+            joblib.dump({'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test},
+                        os.path.join(out_dir, 'split.pkl'))
+            preprocessor.save(os.path.join(out_dir, 'preprocessor.pkl'))
+
+        return self._run(stage, [self.keys['load'], target, PREPROCESSOR_VERSION, sklearn.__version__,
+                                 source_digest(_FEATURE_SOURCES)], build)
+
+    # 3-4. Обучение леса на X_train
+    def train(self, stage, target):
+        preprocess_dir = self._stage_dir(f"preprocess_{target}")
+
+        def build(out_dir):
+            split = joblib.load(os.path.join(preprocess_dir, 'split.pkl'))
+            model = estimator_for(target, self.params[target]).set_params(n_jobs=self.n_jobs)
+            model.fit(split['X_train'], split['y_train'])
+            # n_jobs не влияет на результат, в сохранённой модели - значение по умолчанию
+            joblib.dump(model.set_params(n_jobs=None), os.path.join(out_dir, 'model.pkl'))
+
+        return self._run(stage, [self.keys[f"preprocess_{target}"], self.params[target], sklearn.__version__], build)
+
+    # 5. Метрики на X_test
+    def evaluate(self):
+        def build(out_dir):
+            metrics = {}
+            for stage, target in (('train_reg', 'price'), ('train_clf', 'is_premium')):
+                split = joblib.load(os.path.join(self._stage_dir(f"preprocess_{target}"), 'split.pkl'))
+                model = joblib.load(os.path.join(self._stage_dir(stage), 'model.pkl'))
+                y_test, y_pred = split['y_test'], model.predict(split['X_test'])
+                if target == 'price':
+                    metrics['regression'] = {
+                        'r2': r2_score(y_test, y_pred),
+                        'mae': mean_absolute_error(y_test, y_pred),
+                        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+                    }
+                else:
+                    metrics['classification'] = {
+                        'f1': f1_score(y_test, y_pred),
+                        'precision': precision_score(y_test, y_pred),
+                        'recall': recall_score(y_test, y_pred),
+                        'roc_auc': roc_auc_score(y_test, model.predict_proba(split['X_test'])[:, 1]),
+                    }
+            with open(os.path.join(out_dir, 'metrics.json'), 'w') as f:
+                json.dump(metrics, f, indent=2)
+
+        return self._run('evaluate', [self.keys['train_reg'], self.keys['train_clf']], build)
+
+    # 6. Экспорт в models/: те же файлы, что сохраняли ноутбуки, + preprocessor.pkl, slim-бандл, графики важности
+    # и индекс похожих машин
+    def export(self):
+        key = _digest('export', self.keys['evaluate'], source_digest(_EXPORT_SOURCES))
+        manifest = self.read_manifest(self.models_dir)
+        outputs = [REGRESSION_MODEL, CLASSIFIER_MODEL, 'preprocessor.pkl', 'scaler.pkl',
+                   'label_encoders.pkl', 'onehot_encoders.pkl', COMPARABLES_INDEX]
+        up_to_date = manifest.get('export', {}).get('key') == key and \
+            all(os.path.exists(os.path.join(self.models_dir, name)) for name in outputs)
+
+        start = time.perf_counter()
+        if not up_to_date or 'export' in self.force:
+            os.makedirs(self.models_dir, exist_ok=True)
+            shutil.copyfile(os.path.join(self._stage_dir('train_reg'), 'model.pkl'),
+                            os.path.join(self.models_dir, REGRESSION_MODEL))
+            shutil.copyfile(os.path.join(self._stage_dir('train_clf'), 'model.pkl'),
+                            os.path.join(self.models_dir, CLASSIFIER_MODEL))
+            preprocessor = CarPricePreprocessor.load(os.path.join(self._stage_dir('preprocess_price'),
+                                                                  'preprocessor.pkl'))
+            preprocessor.save_legacy_artifacts(self.models_dir)
+            preprocessor.save(os.path.join(self.models_dir, 'preprocessor.pkl'))
+
+            from src.analysis.importance import prerender_importance_charts
+            from src.inference.slim import export_slim_bundle
+            export_slim_bundle(self.models_dir)
+            prerender_importance_charts(self.models_dir)
+            export_comparables_index(self.models_dir, self._data())
+
+        self.keys['export'] = key
+        self.report['export'] = {'key': key, 'cached': up_to_date and 'export' not in self.force,
+                                 'seconds': time.perf_counter() - start}
+
+    def run(self):
+        self.load()
+        self.preprocess('price')
+        self.preprocess('is_premium')
+        self.train('train_reg', 'price')
+        self.train('train_clf', 'is_premium')
+        self.evaluate()
+        self.export()
+        self.write_manifest()
+        return self.report
+
+    def metrics(self):
+        with open(os.path.join(self._stage_dir('evaluate'), 'metrics.json')) as f:
+            return json.load(f)
+
+    @staticmethod
+    def read_manifest(models_dir):
+        path = os.path.join(models_dir, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f).get('stages', {})
+
+    def write_manifest(self):
+        manifest = {
+            'data': {'path': os.path.abspath(self.data_path), 'sha256': file_digest(self.data_path)},
+            'params': self.params,
+            'sklearn': sklearn.__version__,
+            'python': sys.version.split()[0],
+            'stages': self.report,
+            'metrics': self.metrics(),
+        }
+        with open(os.path.join(self.models_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--reg-params', help='JSON с параметрами RandomForestRegressor')
+    parser.add_argument('--clf-params', help='JSON с параметрами RandomForestClassifier')
+    parser.add_argument('--jobs', type=int, default=-1)
+    parser.add_argument('--force', nargs='*', default=[], choices=STAGES, help='Пересчитать этапы без учёта кэша')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pipeline = Pipeline(args.data, args.models_dir, args.cache_dir,
+                        json.loads(args.reg_params) if args.reg_params else None,
+                        json.loads(args.clf_params) if args.clf_params else None,
+                        args.jobs, args.force)
+    report = pipeline.run()
+
+    for stage, info in report.items():
+        status = '⏭  из кэша' if info['cached'] else '✅ выполнен'
+        print(f"{stage:>22} {status}  {info['seconds']:6.2f} с  [{info['key']}]")
+    metrics = pipeline.metrics()
+    print(f"📈 R²: {metrics['regression']['r2']:.4f}, F1: {metrics['classification']['f1']:.4f}")
+    print(f"Всего: {time.perf_counter() - start:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Курс USD -> RUB для пересчёта цены. Запрос предсказания никогда не ждёт сеть:
+курс отдаётся из памяти, а устаревший обновляется в фоновом потоке (stale-while-revalidate)
+"""
+import json
+import threading
+import time
+
+EXCHANGE_RATE_URL = "https://api.exchangerate-api.com/v4/latest/USD"
+DEFAULT_RATE = 100.0
+
+
+class HttpRateSource:
+    """Курс из JSON API вида {"rates": {"RUB": ...}}"""
+
+    def __init__(self, url=EXCHANGE_RATE_URL, currency='RUB', timeout=5):
+        self.url = url
+        self.currency = currency
+        self.timeout = timeout
+
+    def __call__(self):
+        import requests
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return float(response.json()['rates'][self.currency])
+
+
+class FileRateSource:
+    """Курс из локального JSON-файла в том же формате, что и API (для тестов и офлайн-режима)"""
+
+    def __init__(self, path, currency='RUB'):
+        self.path = path
+        self.currency = currency
+
+    def __call__(self):
+        with open(self.path) as f:
+            return float(json.load(f)['rates'][self.currency])
+
+
+class StaticRateSource:
+    def __init__(self, rate):
+        self.rate = float(rate)
+
+    def __call__(self):
+        return self.rate
+
+
+def rate_source_from_uri(uri):
+    """http(s)://... -> HttpRateSource, file://path -> FileRateSource, static:95.5 -> StaticRateSource"""
+    if uri.startswith('file://'):
+        return FileRateSource(uri[len('file://'):])
+    if uri.startswith('static:'):
+        return StaticRateSource(uri[len('static:'):])
+    return HttpRateSource(uri)
+
+
+class ExchangeRateProvider:
+    """
+    Кэш курса с TTL. get() сразу возвращает последний известный курс (или fallback до первой
+    успешной загрузки) и, если курс старше ttl, запускает одно фоновое обновление.
+    При ошибке источника остаётся предыдущий курс, ошибка сохраняется в last_error, а следующая
+    попытка откладывается на retry_interval секунд (по умолчанию min(ttl, 60)), удваивающиеся
+    после каждой новой ошибки подряд, но не больше ttl
+    """
+
+    def __init__(self, source, ttl=3600, fallback=DEFAULT_RATE, clock=time.monotonic, retry_interval=None):
+        self.source = source
+        self.ttl = ttl
+        self.fallback = fallback
+        self.clock = clock
+        self.retry_interval = min(ttl, 60) if retry_interval is None else retry_interval
+
+        self.rate = None
+        self.fetched_at = None
+        self.last_latency = None
+        self.last_error = None
+        self.refresh_count = 0
+        self.error_count = 0
+        self.failed_at = None
+        self.consecutive_errors = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Синхронная загрузка курса из источника"""
+        start = time.perf_counter()
+        try:
+            rate = self.source()
+        except Exception as e:
+            with self._lock:
+                self.last_latency = time.perf_counter() - start
+                self.last_error = repr(e)
+                self.error_count += 1
+                self.failed_at = self.clock()
+                self.consecutive_errors += 1
+            return None
+        with self._lock:
+            self.rate = rate
+            self.fetched_at = self.clock()
+            self.last_latency = time.perf_counter() - start
+            self.last_error = None
+            self.failed_at = None
+            self.consecutive_errors = 0
+            self.refresh_count += 1
+        return rate
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start(self):
+        """Фоновая загрузка, не дожидаясь первого запроса"""
+        self._schedule_refresh()
+        return self
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    @property
+    def is_stale(self):
+        return self.fetched_at is None or self.clock() - self.fetched_at >= self.ttl
+
+    @property
+    def retry_delay(self):
+        """Пауза после последней ошибки до следующей попытки, 0 если ошибок подряд не было"""
+        if not self.consecutive_errors:
+            return 0.0
+        return min(self.retry_interval * 2 ** (self.consecutive_errors - 1), max(self.ttl, self.retry_interval))
+
+    @property
+    def backing_off(self):
+        failed_at = self.failed_at
+        return failed_at is not None and self.clock() - failed_at < self.retry_delay
+
+    @property
+    def age(self):
+        """Возраст курса в секундах, None если курс ещё не загружен"""
+        return None if self.fetched_at is None else self.clock() - self.fetched_at
+
+    def get(self):
+        # Пока источник недоступен, каждый get() не запускает новый запрос: ждём retry_delay
+        if self.is_stale and not self.backing_off:
+            self._schedule_refresh()
+        rate = self.rate
+        return rate if rate is not None else self.fallback
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'age': self.age,
+            'last_latency': self.last_latency,
+            'last_error': self.last_error,
+            'refresh_count': self.refresh_count,
+            'error_count': self.error_count,
+            'retry_delay': self.retry_delay,
+        }
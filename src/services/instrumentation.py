@@ -0,0 +1,246 @@
+"""
+Инструментирование горячего пути инференса: время и чистое изменение числа блоков памяти по этапам
+(prepare - бренд и производные признаки, encode - масштабирование и кодирование, predict - кэш и леса,
+exchange_rate - курс) в гистограммах prometheus_client, экспорт в текстовом формате Prometheus.
+
+Изменение блоков - разница sys.getallocatedblocks() после и до этапа, то есть выделенные минус
+освобождённые за этап (временные массивы, освобождённые до конца этапа, не видны, значение бывает
+отрицательным). Это не число выделений: для него нужен tracemalloc, который замедляет каждое выделение.
+Счётчик общий для процесса, поэтому при параллельных запросах в других потоках значение приблизительное.
+
+Профилировщик включается явно (profile_slow_ms или переменная окружения PROFILE_SLOW_MS):
+во время каждого запроса фоновый поток снимает стек потока запроса раз в interval секунд, и если
+запрос длился дольше порога, стеки пишутся в PROFILE_DIR в свёрнутом формате
+(flamegraph.pl, speedscope, inferno): "модуль:функция;...;модуль:функция число_сэмплов".
+
+prometheus_client импортируется при создании Instrumentation: приложение без METRICS_PORT и
+PROFILE_SLOW_MS использует NullInstrumentation и не платит за импорт на холодном старте
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../data/profiles')
+
+# Одна строка проходит этапы за десятки микросекунд, пакеты и сеть - за миллисекунды и секунды
+SECONDS_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Отрицательные изменения попадают в корзину le=0: с отрицательными границами prometheus_client не отдаёт _sum
+NET_BLOCKS_BUCKETS = (0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def folded_stack(frame):
+    """Стек от корня к листу в свёрнутом формате"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик потоков: start(thread_id) начинает копить стеки потока, stop() возвращает
+    Counter {стек: число сэмплов}. Один фоновый поток обслуживает все профилируемые потоки
+    и спит, пока их нет
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            # Сэмпл снимается под блокировкой: после stop() поток больше не пишет в возвращённый Counter
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[folded_stack(frame)] += 1
+            time.sleep(self.interval)
+
+    def start(self, thread_id=None):
+        thread_id = threading.get_ident() if thread_id is None else thread_id
+        with self._lock:
+            self._active[thread_id] = Counter()
+            self._ensure_thread()
+        self._wakeup.set()
+        return thread_id
+
+    def stop(self, thread_id=None):
+        thread_id = threading.get_ident() if thread_id is None else thread_id
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+
+def write_folded(samples, path):
+    """Стеки в свёрнутом формате, по строке на стек"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+class Instrumentation:
+    """
+    Гистограммы этапов и запросов в собственном CollectorRegistry.
+    profile_slow_ms - порог медленного запроса для профилировщика, None - профилировщик выключен
+    """
+
+    def __init__(self, namespace='car_price', profile_slow_ms=None, profile_dir=PROFILE_DIR, profile_interval=0.001,
+                 registry=None):
+        from prometheus_client import CollectorRegistry, Counter as PrometheusCounter, Histogram
+
+        self.registry = CollectorRegistry() if registry is None else registry
+        self._seconds_name, self._blocks_name = f"{namespace}_stage_seconds", f"{namespace}_stage_net_blocks"
+        self.stage_seconds = Histogram('stage_seconds', 'Время этапа инференса', ['stage'], namespace=namespace,
+                                       buckets=SECONDS_BUCKETS, registry=self.registry)
+        self.stage_net_blocks = Histogram('stage_net_blocks', 'Выделенные минус освобождённые блоки памяти за этап',
+                                          ['stage'], namespace=namespace, buckets=NET_BLOCKS_BUCKETS,
+                                          registry=self.registry)
+        self.request_seconds = Histogram('request_seconds', 'Время запроса целиком', ['request'],
+                                         namespace=namespace, buckets=SECONDS_BUCKETS, registry=self.registry)
+        self.slow_requests = PrometheusCounter('slow_requests', 'Запросы дольше порога профилировщика',
+                                               ['request'], namespace=namespace, registry=self.registry)
+
+        self.profile_slow_ms = profile_slow_ms
+        self.profile_dir = profile_dir
+        self.profiler = SamplingProfiler(profile_interval) if profile_slow_ms is not None else None
+        self.profiles = deque(maxlen=100)
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Порог и папка профилировщика из PROFILE_SLOW_MS и PROFILE_DIR"""
+        slow_ms = os.environ.get('PROFILE_SLOW_MS')
+        return cls(profile_slow_ms=float(slow_ms) if slow_ms else None,
+                   profile_dir=os.environ.get('PROFILE_DIR', PROFILE_DIR), **kwargs)
+
+    @contextmanager
+    def stage(self, name):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.labels(name).observe(time.perf_counter() - start)
+            self.stage_net_blocks.labels(name).observe(sys.getallocatedblocks() - blocks)
+
+    @contextmanager
+    def request(self, name='predict', profile=True):
+        """
+        Запрос целиком; при включённом профилировщике медленные запросы сохраняются в profile_dir.
+        Профилируется текущий поток, поэтому для запросов, которые ждут другой поток (корутины),
+        нужен profile=False
+        """
+        profiling = profile and self.profiler is not None
+        if profiling:
+            thread_id = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.request_seconds.labels(name).observe(seconds)
+            if profiling:
+                samples = self.profiler.stop(thread_id)
+                if seconds * 1000 >= self.profile_slow_ms:
+                    self.slow_requests.labels(name).inc()
+                    if samples:
+                        path = os.path.join(self.profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                              f"{int(seconds * 1000)}ms-{thread_id}.folded")
+                        self.profiles.append(write_folded(samples, path))
+
+    def render(self):
+        """(тело, Content-Type) в текстовом формате Prometheus"""
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+    def summary(self):
+        """{этап: {'count', 'mean_ms', 'mean_net_blocks'}} для JSON-метрик и отладки"""
+        totals = {}
+        for metric in self.registry.collect():
+            if metric.name not in (self._seconds_name, self._blocks_name):
+                continue
+            for sample in metric.samples:
+                if sample.name.endswith(('_count', '_sum')):
+                    totals.setdefault(sample.labels['stage'], {})[sample.name] = sample.value
+
+        summary = {}
+        for stage, values in totals.items():
+            count = values.get(f"{self._seconds_name}_count", 0)
+            summary[stage] = {
+                'count': int(count),
+                'mean_ms': values.get(f"{self._seconds_name}_sum", 0.0) / count * 1000 if count else None,
+                'mean_net_blocks': values.get(f"{self._blocks_name}_sum", 0.0) / count if count else None,
+            }
+        return summary
+
+    def serve(self, port, addr='0.0.0.0'):
+        """HTTP-сервер prometheus_client с метриками этого реестра (для приложения Streamlit)"""
+        from prometheus_client import start_http_server
+        return start_http_server(port, addr, registry=self.registry)
+
+
+class NullInstrumentation:
+    """Тот же интерфейс без гистограмм и профилировщика: этапы ничего не записывают"""
+
+    profiles = ()
+
+    @staticmethod
+    def enabled_in_env():
+        """Метрики или профилировщик запрошены переменными окружения METRICS_PORT или PROFILE_SLOW_MS"""
+        return bool(os.environ.get('METRICS_PORT') or os.environ.get('PROFILE_SLOW_MS'))
+
+    def stage(self, name):
+        return nullcontext()
+
+    def request(self, name='predict', profile=True):
+        return nullcontext()
+
+    def summary(self):
+        return {}
+
+
+class InstrumentedPredictor:
+    """Обёртка над SlimPredictor или CachedPredictor: этапы prepare, encode и predict в гистограммах"""
+
+    def __init__(self, predictor, instrumentation):
+        self.predictor = predictor
+        self.instrumentation = instrumentation
+        self.slim = getattr(predictor, 'predictor', predictor)
+
+    def build_array(self, rows):
+        with self.instrumentation.stage('prepare'):
+            columns = self.slim.prepare_columns(rows)
+        with self.instrumentation.stage('encode'):
+            return self.slim.encoder.encode(columns)
+
+    def predict_array(self, X):
+        with self.instrumentation.stage('predict'):
+            return self.predictor.predict_array(X)
+
+    def predict_rows(self, rows):
+        return self.predict_array(self.build_array(rows))
@@ -0,0 +1,345 @@
+"""
+HTTP-сервис скоринга без Streamlit: те же обученные препроцессор и модели, что и в app.py.
+
+    POST /predict      JSON-объект (одна машина) или список объектов; ?explain=1 добавляет к каждому
+                       предсказанию вклады исходных колонок в price и premium_proba
+    POST /predict/csv  CSV в формате car_data.csv, ответ - CSV price,is_premium,premium_proba
+    GET  /metrics      задержки p50/p99, пропускная способность, размеры пакетов, средние по этапам
+    GET  /metrics/prometheus  гистограммы этапов и запросов в текстовом формате Prometheus
+    GET  /health
+
+Запуск из корня проекта:
+    python -m src.services.scoring --port 8000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import tornado.web
+
+from src.inference.explain import Explainer
+from src.inference.forest import Prediction
+from src.inference.registry import MODELS_DIR, get_registry
+from src.services.instrumentation import Instrumentation
+
+
+class MicroBatcher:
+    """
+    Объединяет запросы, пришедшие в пределах max_wait секунд, в один вызов predict_array.
+    Пакет отправляется раньше, если набралось max_batch строк. Модель считается в отдельном
+    потоке, поэтому цикл событий продолжает принимать запросы во время предсказания
+    """
+
+    def __init__(self, predict_array, max_wait=0.002, max_batch=256):
+        self.predict_array = predict_array
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(1)
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+    async def predict(self, X):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((X, future))
+        self._pending_rows += len(X)
+
+        if self.max_wait <= 0 or self._pending_rows >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if pending:
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending):
+        X = np.concatenate([x for x, _ in pending]) if len(pending) > 1 else pending[0][0]
+        self.batches += 1
+        self.requests += len(pending)
+        self.rows += len(X)
+        try:
+            loop = asyncio.get_running_loop()
+            prediction = await loop.run_in_executor(self._executor, self.predict_array, X)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for x, future in pending:
+            end = start + len(x)
+            if not future.done():
+                future.set_result(Prediction(*(column[start:end] for column in prediction)))
+            start = end
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+class LatencyRecorder:
+    """Задержки последних window запросов и счётчик с момента старта"""
+
+    def __init__(self, window=10000, clock=time.perf_counter):
+        self.clock = clock
+        self.started_at = clock()
+        self.count = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self.count += 1
+            self.errors += int(error)
+            self._latencies.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+            count, errors = self.count, self.errors
+        uptime = self.clock() - self.started_at
+        result = {'requests': count, 'errors': errors, 'uptime_s': uptime,
+                  'throughput_rps': count / uptime if uptime > 0 else 0.0}
+        for name, q in [('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99)]:
+            result[name] = float(np.percentile(latencies, q)) * 1000 if len(latencies) else None
+        return result
+
+
+def records_to_columns(records, raw_columns, numeric_columns):
+    """Список JSON-объектов или строк CSV -> dict numpy-колонок для SlimPredictor"""
+    if not records:
+        raise ValueError("Пустой запрос")
+    # Бренд берётся из brand, а если его нет - выводится предиктором из CarName
+    if 'brand' in raw_columns and not all('brand' in record for record in records):
+        if not all('CarName' in record for record in records):
+            raise ValueError("Нужна колонка brand или CarName")
+        raw_columns = [column for column in raw_columns if column != 'brand'] + ['CarName']
+
+    missing = [column for column in raw_columns if any(column not in record for record in records)]
+    if missing:
+        raise ValueError(f"Нет колонок: {missing}")
+
+    columns = {}
+    for column in raw_columns:
+        values = [record[column] for record in records]
+        # Вложенные списки и объекты numpy превратил бы в лишнюю размерность или TypeError
+        if any(isinstance(value, (list, dict)) for value in values):
+            raise ValueError(f"Колонка {column}: ожидаются числа или строки")
+        columns[column] = np.asarray(values, dtype=np.float64) if column in numeric_columns else np.asarray(values)
+    return columns
+
+
+class ScoringService:
+    """Состояние сервиса: реестр моделей, микробатчер и метрики"""
+
+    def __init__(self, models_dir=MODELS_DIR, max_wait=0.002, max_batch=256, cache_size=4096, instrumentation=None):
+        self.registry = get_registry(models_dir)
+        self.cache_size = cache_size
+        self.batcher = MicroBatcher(self._predict_array, max_wait, max_batch)
+        self.latency = LatencyRecorder()
+        self.instrumentation = Instrumentation.from_env() if instrumentation is None else instrumentation
+        self._explainer = None
+        # Разложение по путям - тот же обход лесов, что и предсказание, цикл событий его не ждёт
+        self._explain_executor = ThreadPoolExecutor(1)
+
+    def predictor(self):
+        # Реестр возвращает тот же объект, пока файлы моделей не изменились
+        return self.registry.slim_predictor(cache_size=self.cache_size)
+
+    def _predict_array(self, X):
+        # Пакет считается в потоке батчера, профилировщик снимает стеки этого потока
+        with self.instrumentation.request('batch'), self.instrumentation.stage('predict'):
+            return self.predictor().predict_array(X)
+
+    def build_array(self, records):
+        slim = self.predictor().predictor
+        with self.instrumentation.stage('prepare'):
+            numeric = set(slim.encoder.numeric_columns)
+            columns = slim.prepare_columns(records_to_columns(records, slim.raw_columns, numeric))
+        with self.instrumentation.stage('encode'):
+            return slim.encoder.encode(columns)
+
+    def explainer(self):
+        # Таблицы свёртки строятся заново только после замены моделей
+        slim = self.predictor().predictor
+        if self._explainer is None or self._explainer.predictor is not slim:
+            self._explainer = Explainer(slim)
+        return self._explainer
+
+    async def score(self, records, explain=False):
+        """Prediction, при explain=True - (Prediction, Explanation)"""
+        X = self.build_array(records)
+        prediction = await self.batcher.predict(X)
+        if not explain:
+            return prediction
+        loop = asyncio.get_running_loop()
+        explanation = await loop.run_in_executor(self._explain_executor, self._explain_array, self.explainer(), X)
+        return prediction, explanation
+
+    def _explain_array(self, explainer, X):
+        with self.instrumentation.stage('explain'):
+            return explainer.explain_array(X)
+
+    def metrics(self):
+        return {
+            'latency': self.latency.stats(),
+            'batching': self.batcher.stats(),
+            'cache': self.predictor().stats(),
+            'models': self.registry.stats()['load_times'],
+            'stages': self.instrumentation.summary(),
+        }
+
+
+def prediction_records(prediction):
+    return [
+        {'price': float(price), 'is_premium': int(is_premium), 'premium_proba': float(proba)}
+        for price, is_premium, proba in zip(*prediction)
+    ]
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_error(self, status_code, **kwargs):
+        reason = self._reason
+        if 'exc_info' in kwargs and isinstance(kwargs['exc_info'][1], tornado.web.HTTPError):
+            reason = kwargs['exc_info'][1].log_message or reason
+        self.finish({'error': reason})
+
+    @contextmanager
+    def recorded(self):
+        """Разбор и скоринг запроса в задержках и метриках; ошибки в данных - ответ 400"""
+        start = time.perf_counter()
+        error = True
+        try:
+            with self.service.instrumentation.request('http', profile=False):
+                yield
+            error = False
+        except (ValueError, csv.Error) as e:
+            raise tornado.web.HTTPError(400, str(e))
+        finally:
+            # Неудачные запросы, включая ответы 400 и 500, тоже попадают в задержки и счётчик ошибок
+            self.service.latency.record(time.perf_counter() - start, error=error)
+
+    async def timed(self, records, explain=False):
+        with self.recorded():
+            return await self.service.score(records, explain)
+
+
+class PredictHandler(BaseHandler):
+    async def post(self):
+        try:
+            payload = json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, "Некорректный JSON")
+
+        single = isinstance(payload, dict)
+        records = [payload] if single else payload
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise tornado.web.HTTPError(400, "Ожидается объект или список объектов")
+
+        explain = self.get_query_argument('explain', '0').lower() in ('1', 'true', 'yes')
+        if explain:
+            prediction, explanation = await self.timed(records, explain=True)
+            results = [dict(result, **extra) for result, extra in
+                       zip(prediction_records(prediction), explanation.records())]
+        else:
+            results = prediction_records(await self.timed(records))
+        self.write(results[0] if single else {'predictions': results})
+
+
+class CsvPredictHandler(BaseHandler):
+    async def post(self):
+        with self.recorded():
+            try:
+                text = self.request.body.decode('utf-8')
+            except UnicodeDecodeError:
+                raise ValueError("CSV должен быть в кодировке UTF-8")
+            prediction = await self.service.score(list(csv.DictReader(io.StringIO(text))))
+
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(Prediction._fields), lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(prediction_records(prediction))
+        self.set_header('Content-Type', 'text/csv; charset=utf-8')
+        self.write(out.getvalue())
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.write(self.service.metrics())
+
+
+class PrometheusHandler(BaseHandler):
+    def get(self):
+        body, content_type = self.service.instrumentation.render()
+        self.set_header('Content-Type', content_type)
+        self.write(body)
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write({'status': 'ok'})
+
+
+def make_app(service):
+    return tornado.web.Application([
+        (r'/predict', PredictHandler, {'service': service}),
+        (r'/predict/csv', CsvPredictHandler, {'service': service}),
+        (r'/metrics', MetricsHandler, {'service': service}),
+        (r'/metrics/prometheus', PrometheusHandler, {'service': service}),
+        (r'/health', HealthHandler, {'service': service}),
+    ])
+
+
+async def serve(port, **kwargs):
+    service = ScoringService(**kwargs)
+    # Модели загружаются до первого запроса
+    service.predictor()
+    make_app(service).listen(port)
+    print(f"Сервис скоринга слушает http://localhost:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='Окно накопления пакета, 0 - без батчинга')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.port, models_dir=args.models_dir, max_wait=args.max_wait_ms / 1000,
+                      max_batch=args.max_batch, cache_size=args.cache_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Общие фикстуры: препроцессор и небольшие леса, обученные на data/raw/car_data.csv один раз
+на весь запуск тестов. Артефакты на диск не сохраняются (models_dir=None)
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import contextlib
+import io
+import os
+import sys
+import warnings
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.data.loader import load_car_data
+from src.features.preprocessing import CarPricePreprocessor
+from src.models.tuning import estimator_for
+
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+
+def _fit_transform(df, target):
+    # Сообщения препроцессора (редкие бренды, создание таргета) не засоряют вывод тестов
+    with contextlib.redirect_stdout(io.StringIO()):
+        preprocessor = CarPricePreprocessor(models_dir=None)
+        split = preprocessor.fit_transform(df, target)
+    return preprocessor, split
+
+
+@pytest.fixture(scope='session')
+def car_data():
+    return load_car_data()
+
+
+@pytest.fixture(scope='session')
+def fitted(car_data):
+    """Препроцессор цены и (X_train, X_test, y_train, y_test)"""
+    return _fit_transform(car_data, 'price')
+
+
+@pytest.fixture(scope='session')
+def preprocessor(fitted):
+    return fitted[0]
+
+
+@pytest.fixture(scope='session')
+def model_reg(fitted):
+    X_train, _, y_train, _ = fitted[1]
+    return estimator_for('price', {'n_estimators': 10}).fit(X_train, y_train)
+
+
+@pytest.fixture(scope='session')
+def model_clf(car_data):
+    X_train, _, y_train, _ = _fit_transform(car_data, 'is_premium')[1]
+    return estimator_for('is_premium', {'n_estimators': 10}).fit(X_train, y_train)
+
+
+@pytest.fixture(scope='session')
+def batch_predictor(preprocessor, model_reg, model_clf):
+    from src.inference.batch import BatchPredictor
+
+    return BatchPredictor(preprocessor, model_reg, model_clf)
+
+
+@pytest.fixture(scope='session')
+def slim_predictor(batch_predictor):
+    from src.inference.slim import SlimPredictor
+
+    return SlimPredictor.from_batch_predictor(batch_predictor)
+
+
+@pytest.fixture(scope='session')
+def models_dir(tmp_path_factory, preprocessor, model_reg, model_clf):
+    """Папка с артефактами в том виде, в каком их сохраняет обучение (без бандлов и индекса)"""
+    import joblib
+
+    path = tmp_path_factory.mktemp('models')
+    preprocessor.save(str(path / 'preprocessor.pkl'))
+    joblib.dump(model_reg, path / 'random_forest_regression_final.pkl')
+    joblib.dump(model_clf, path / 'random_forest_classifier_final.pkl')
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def raw_rows(car_data):
+    """Строки в формате car_data.csv без таргета"""
+    return car_data.drop(columns=['price'])
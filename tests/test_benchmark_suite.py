@@ -0,0 +1,102 @@
+import copy
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUITE_PATH = os.path.join(project_root, 'benchmarks', 'suite.py')
+
+
+@pytest.fixture(scope='module')
+def suite():
+    spec = importlib.util.spec_from_file_location('benchmark_suite', SUITE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def report(tmp_path_factory):
+    output = str(tmp_path_factory.mktemp('bench') / 'base.json')
+    subprocess.run([sys.executable, SUITE_PATH, 'run', '--sizes', '300', '--repeats', '2', '--single-repeats', '3',
+                    '--trees', '3', '--jobs', '1', '--output', output], cwd=project_root, check=True,
+                   capture_output=True)
+    with open(output) as f:
+        return output, json.load(f)
+
+
+def run_compare(base, new, *args):
+    return subprocess.run([sys.executable, SUITE_PATH, 'compare', base, new, *args], cwd=project_root,
+                          capture_output=True, text=True)
+
+
+def test_run_writes_json_report(report):
+    _, data = report
+    assert data['config'] == {'sizes': [300], 'repeats': 2, 'trees': 3, 'jobs': 1, 'seed': 42, 'single_repeats': 3}
+    assert {'python', 'numpy', 'sklearn', 'cpu_count'} <= set(data['machine'])
+
+    stages = {result['stage'] for result in data['results']}
+    assert {'load/read_csv', 'preprocess[price]/fit_transform', 'train/regressor', 'train/classifier',
+            'inference/batch_slim'} <= stages
+    for result in data['results']:
+        assert result['min_s'] == min(result['times'])
+        assert result['median_s'] == pytest.approx(float(np.median(result['times'])))
+
+
+def test_compare_flags_regressions(tmp_path, report):
+    base, data = report
+    assert run_compare(base, base).returncode == 0
+
+    slower = copy.deepcopy(data)
+    slower['results'][0]['min_s'] *= 2
+    new = str(tmp_path / 'new.json')
+    with open(new, 'w') as f:
+        json.dump(slower, f)
+    result = run_compare(base, new, '--threshold', '0.5')
+    assert result.returncode == 1
+    assert data['results'][0]['stage'] in result.stdout
+
+
+def test_compare_reports(suite):
+    base = {'results': [{'stage': 'a', 'rows': 10, 'min_s': 1.0}, {'stage': 'b', 'rows': 10, 'min_s': 1.0},
+                        {'stage': 'gone', 'rows': 10, 'min_s': 1.0}]}
+    new = {'results': [{'stage': 'a', 'rows': 10, 'min_s': 1.2}, {'stage': 'b', 'rows': 10, 'min_s': 0.5},
+                       {'stage': 'a', 'rows': 99, 'min_s': 1.0}]}
+    rows = suite.compare_reports(base, new, threshold=0.1)
+
+    assert [(row['stage'], row['rows']) for row in rows] == [('a', 10), ('b', 10)]
+    assert [row['ratio'] for row in rows] == pytest.approx([1.2, 0.5])
+    assert [(row['regression'], row['improvement']) for row in rows] == [(True, False), (False, True)]
+
+
+def test_measured_steps_match_in_memory_reference(suite, preprocessor, model_reg, model_clf):
+    class RecordingTimer(suite.Timer):
+        def __init__(self):
+            super().__init__(repeats=1)
+            self.outputs = {}
+
+        def measure(self, stage, rows, fn, repeats=None):
+            self.outputs[stage] = super().measure(stage, rows, fn, repeats)
+            return self.outputs[stage]
+
+    df = generate_car_data(400, seed=8)
+    timer = RecordingTimer()
+    _, split = suite.bench_preprocess(timer, df, 'price')
+    suite.bench_inference(timer, df.drop(columns=['price']), preprocessor, model_reg, model_clf, 1)
+
+    # Пошаговое кодирование - то же, что fit_transform целиком
+    X_train, X_test = timer.outputs['preprocess[price]/encode']
+    assert np.array_equal(X_train.to_numpy(), split[0].to_numpy())
+    assert np.array_equal(X_test.to_numpy(), split[1].to_numpy())
+    # Slim-инференс пакета совпадает с BatchPredictor на sklearn
+    slim, sklearn_frame = timer.outputs['inference/batch_slim'], timer.outputs['inference/batch_sklearn']
+    assert np.allclose(slim.price, sklearn_frame['price'].to_numpy())
+    assert np.array_equal(slim.is_premium, sklearn_frame['is_premium'].to_numpy())
+    assert timer.outputs['inference/single_row_slim'].price[0] == pytest.approx(slim.price[0])
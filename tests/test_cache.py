@@ -0,0 +1,110 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+from src.inference.cache import CachedPredictor, PredictionCache, artifacts_fingerprint, feature_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def models_copy(tmp_path, models_dir):
+    path = str(tmp_path / 'models')
+    shutil.copytree(models_dir, path)
+    return path
+
+
+def touch(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_cached_predictions_equal_uncached(batch_predictor, models_dir):
+    rows = generate_car_data(300, seed=5).drop(columns=['price'])
+    X = batch_predictor.build_array(rows)
+    expected = batch_predictor.predict_array(X)
+    cached = CachedPredictor(batch_predictor, models_dir)
+
+    # Первый вызов считает все строки, второй - только из кэша, половина пакета повторяется
+    for X_batch in (X, X, X[::2]):
+        actual = cached.predict_array(X_batch)
+        reference = batch_predictor.predict_array(X_batch)
+        for expected_column, actual_column in zip(reference, actual):
+            assert np.array_equal(expected_column, actual_column)
+    assert cached.stats()['misses'] == len(np.unique(X, axis=0))
+    assert cached.stats()['hits'] == 2 * len(X) + len(X[::2]) - cached.stats()['misses']
+
+    frame = cached.predict(rows)
+    assert np.array_equal(frame['price'].to_numpy(), expected.price)
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1, 'evictions': 1,
+                             'expirations': 0, 'invalidations': 0}
+
+
+def test_ttl_and_version_reset():
+    clock = FakeClock()
+    cache = PredictionCache(ttl=5, clock=clock)
+    cache.put('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+    cache.set_version('v1')
+    cache.put('b', 2)
+    cache.set_version('v1')
+    assert cache.get('b') == 2
+    cache.set_version('v2')
+    assert cache.get('b') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_feature_key_ignores_sign_of_zero_and_dtype():
+    row = np.array([0.0, 1.5, 2.0])
+    assert feature_key(row) == feature_key(np.array([-0.0, 1.5, 2.0], dtype=np.float32))
+    assert feature_key(row) != feature_key(np.array([0.0, 1.5, 2.5]))
+
+
+def test_fingerprint_follows_artifacts(models_copy):
+    fingerprint = artifacts_fingerprint(models_copy)
+    assert artifacts_fingerprint(models_copy) == fingerprint
+
+    touch(os.path.join(models_copy, 'random_forest_regression_final.pkl'))
+    touched = artifacts_fingerprint(models_copy)
+    assert touched != fingerprint
+
+    with open(os.path.join(models_copy, 'slim_bundle.pkl'), 'wb') as f:
+        f.write(b'bundle')
+    assert artifacts_fingerprint(models_copy) not in (fingerprint, touched)
+
+
+def test_cached_predictor_resets_on_model_change(batch_predictor, models_copy, raw_rows):
+    cached = CachedPredictor(batch_predictor, models_copy, check_interval=0)
+    cached.predict_rows(raw_rows)
+    cached.predict_rows(raw_rows)
+    assert cached.stats()['hits'] > 0 and cached.stats()['invalidations'] == 0
+
+    touch(os.path.join(models_copy, 'preprocessor.pkl'))
+    cached.predict_rows(raw_rows)
+    assert cached.stats()['invalidations'] == 1
+    assert cached.stats()['size'] == len(np.unique(batch_predictor.build_array(raw_rows), axis=0))
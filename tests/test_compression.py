@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble._forest import _generate_unsampled_indices
+
+from src.inference.forest import CompiledForest
+from src.models.compression import Compressor, cap_depth, distill, greedy_subset, pareto_front, subset_forest
+from src.models.tuning import estimator_for
+
+# Леса обучены на DataFrame, а эталоны считаются на матрицах
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+
+@pytest.fixture(scope='module')
+def X_test(fitted):
+    return fitted[1][1].to_numpy(dtype=np.float32)
+
+
+def capped_tree_output(estimator, X, max_depth):
+    """Эталон: спуск по дереву не глубже max_depth, значение узла, на котором остановились"""
+    tree = estimator.tree_
+    outputs = []
+    for row in X:
+        node, depth = 0, 0
+        while tree.children_left[node] != -1 and depth < max_depth:
+            go_left = row[tree.feature[node]] <= tree.threshold[node]
+            node = tree.children_left[node] if go_left else tree.children_right[node]
+            depth += 1
+        value = tree.value[node, 0]
+        outputs.append(value[1] / value.sum() if tree.n_outputs == 1 and len(value) > 1 else value[0])
+    return np.array(outputs)
+
+
+def test_first_trees_match_smaller_forest(fitted, model_reg, X_test):
+    X_train, _, y_train, _ = fitted[1]
+    smaller = estimator_for('price', {'n_estimators': 4}).fit(X_train, y_train)
+    subset = subset_forest(model_reg, range(4))
+
+    assert np.array_equal(subset.predict(X_test), smaller.predict(X_test))
+    assert len(model_reg.estimators_) == 10
+
+
+@pytest.mark.parametrize('max_depth', [1, 3, 6])
+def test_cap_depth_matches_truncated_walk(model_reg, X_test, max_depth):
+    capped = cap_depth(model_reg, max_depth)
+    expected = np.mean([capped_tree_output(estimator, X_test, max_depth) for estimator in model_reg.estimators_],
+                       axis=0)
+
+    assert np.allclose(capped.predict(X_test), expected)
+    assert max(estimator.tree_.max_depth for estimator in capped.estimators_) <= max_depth
+    # Обрезанный лес компилируется и считается так же, как в slim-инференсе
+    assert np.allclose(CompiledForest(capped).predict(X_test), capped.predict(X_test))
+
+
+def test_cap_depth_on_classifier_and_beyond_max_depth(model_clf, X_test):
+    capped = cap_depth(model_clf, 2)
+    expected = np.mean([capped_tree_output(estimator, X_test, 2) for estimator in model_clf.estimators_], axis=0)
+    assert np.allclose(capped.predict_proba(X_test)[:, 1], expected)
+
+    deep = cap_depth(model_clf, 1000)
+    assert all(new is old for new, old in zip(deep.estimators_, model_clf.estimators_))
+
+
+def test_greedy_subset_starts_with_best_oob_tree(fitted, model_reg):
+    X_train, _, y_train, _ = fitted[1]
+    X, y = X_train.to_numpy(dtype=np.float32), y_train.to_numpy()
+    oob_mse = []
+    for estimator in model_reg.estimators_:
+        oob = _generate_unsampled_indices(estimator.random_state, len(X), len(X))
+        oob_mse.append(np.mean((estimator.predict(X[oob]) - y[oob]) ** 2))
+
+    subset = greedy_subset(model_reg, X_train, y_train, 3)
+    indices = [model_reg.estimators_.index(estimator) for estimator in subset.estimators_]
+    assert len(set(indices)) == 3 and indices == sorted(indices)
+    assert int(np.argmin(oob_mse)) in indices
+
+    with pytest.raises(ValueError):
+        greedy_subset(model_reg, X_train.iloc[:10], y_train.iloc[:10], 3)
+
+
+def test_deep_distilled_tree_reproduces_forest_on_its_rows(model_reg, X_test):
+    student = distill(model_reg, X_test, max_depth=50)
+    assert len(student.estimators_) == 1
+    assert np.allclose(student.predict(X_test), model_reg.predict(X_test))
+
+
+def test_run_reports_original_score_and_pareto(fitted, model_reg):
+    compressor = Compressor(model_reg, 'price', fitted[1], augment=0)
+    frame, models = compressor.run(trees=[5], depths=[3], distill_depths=[4], greedy=False)
+
+    assert list(zip(frame['method'], frame['param'])) == [('original', 10), ('first', 5), ('depth', 3),
+                                                          ('distill', 4)]
+    X_test, y_test = fitted[1][1], fitted[1][3]
+    assert frame.loc[0, 'score'] == pytest.approx(models[('original', 10)].score(X_test, y_test))
+    assert frame['pareto'].any()
+
+
+def test_pareto_front():
+    frame = pd.DataFrame({'score': [0.9, 0.8, 0.9, 0.7], 'p50_ms': [1.0, 0.5, 2.0, 0.5], 'size_kb': [10, 5, 10, 5]})
+    assert pareto_front(frame).tolist() == [True, True, False, False]
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from src.services.exchange_rate import DEFAULT_RATE, ExchangeRateProvider, rate_source_from_uri
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakySource:
+    """Источник, который падает, пока failing=True, и считает вызовы"""
+
+    def __init__(self, rate=90.0):
+        self.rate = rate
+        self.failing = True
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("нет сети")
+        return self.rate
+
+
+def get_and_wait(provider):
+    rate = provider.get()
+    deadline = time.monotonic() + 5
+    while provider._refreshing and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return rate
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_failed_refresh_backs_off(clock):
+    source = FlakySource()
+    provider = ExchangeRateProvider(source, ttl=3600, clock=clock)
+
+    assert get_and_wait(provider) == DEFAULT_RATE
+    assert source.calls == 1
+    # Повторные get() во время паузы не ходят в источник
+    for _ in range(10):
+        assert get_and_wait(provider) == DEFAULT_RATE
+    assert source.calls == 1
+
+    clock.now += 60
+    get_and_wait(provider)
+    assert source.calls == 2
+    assert provider.retry_delay == 120
+
+    clock.now += 60
+    get_and_wait(provider)
+    assert source.calls == 2
+
+
+def test_retry_delay_is_capped_by_ttl(clock):
+    provider = ExchangeRateProvider(FlakySource(), ttl=300, clock=clock, retry_interval=100)
+    for _ in range(5):
+        provider.refresh()
+    assert provider.retry_delay == 300
+
+
+def test_success_resets_backoff(clock):
+    source = FlakySource(rate=92.5)
+    provider = ExchangeRateProvider(source, ttl=3600, clock=clock)
+    provider.refresh()
+    provider.refresh()
+    assert provider.retry_delay == 120
+
+    source.failing = False
+    clock.now += 120
+    get_and_wait(provider)
+    assert provider.get() == 92.5
+    assert provider.retry_delay == 0
+    assert provider.stats()['error_count'] == 2
+
+    # Свежий курс не обновляется до истечения ttl
+    get_and_wait(provider)
+    assert source.calls == 3
+
+
+def test_rate_source_from_uri(tmp_path):
+    path = tmp_path / 'rates.json'
+    path.write_text('{"rates": {"RUB": 81.5}}')
+    assert rate_source_from_uri(f"file://{path}")() == 81.5
+    assert rate_source_from_uri('static:95.5')() == 95.5
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+from src.inference.explain import Explainer, source_columns
+
+
+@pytest.fixture(scope='module')
+def explainer(slim_predictor):
+    return Explainer(slim_predictor, max_rows=64)
+
+
+@pytest.fixture(scope='module')
+def X(slim_predictor):
+    return slim_predictor.build_array(generate_car_data(300, seed=5))
+
+
+def decision_path_contributions(model, X):
+    """Построчное разложение через decision_path каждого дерева sklearn"""
+    contributions = np.zeros(X.shape)
+    for i in range(len(X)):
+        for estimator in model.estimators_:
+            path = estimator.decision_path(X[i:i + 1]).indices
+            values = estimator.tree_.value[path, 0, -1]
+            np.add.at(contributions[i], estimator.tree_.feature[path[:-1]], np.diff(values))
+    return contributions / len(model.estimators_)
+
+
+def test_contributions_add_up_to_prediction(explainer, slim_predictor, X):
+    explanation = explainer.explain_array(X)
+    prediction = slim_predictor.predict_array(X)
+    assert np.allclose(explanation.prediction('price'), prediction.price, rtol=0, atol=1e-6)
+    assert np.allclose(explanation.prediction('premium_proba'), prediction.premium_proba, rtol=0, atol=1e-12)
+
+
+def test_matches_decision_path(explainer, model_reg, model_clf, X):
+    contributions = explainer.feature_contributions(X[:20])
+    assert np.allclose(contributions[0], decision_path_contributions(model_reg, X[:20]))
+    # В классификаторе раскладывается вероятность класса 1 (последний столбец value)
+    assert np.allclose(contributions[1], decision_path_contributions(model_clf, X[:20]))
+
+
+def test_chunks_do_not_change_result(slim_predictor, X):
+    whole = Explainer(slim_predictor, max_rows=len(X)).feature_contributions(X)
+    chunked = Explainer(slim_predictor, max_rows=7).feature_contributions(X)
+    assert np.array_equal(whole, chunked)
+
+
+def test_onehot_columns_are_folded(explainer, slim_predictor, X):
+    features = explainer.feature_contributions(X[:10])[0]
+    explanation = explainer.explain_array(X[:10])
+    sources = source_columns(slim_predictor.encoder)
+
+    assert 'brand' in explanation.columns and not any(column.startswith('brand_') for column in explanation.columns)
+    brand = [i for i, source in enumerate(sources) if source == 'brand']
+    assert len(brand) > 1
+    column = explanation.columns.index('brand')
+    assert np.allclose(explanation.price[:, column], features[:, brand].sum(axis=1))
+
+
+def test_records_and_frame(explainer, X):
+    explanation = explainer.explain_array(X[:2])
+    records = explanation.records()
+    assert len(records) == 2
+    assert set(records[0]['contributions']) == {'price', 'premium_proba'}
+
+    frame = explanation.to_frame(1)
+    assert list(frame.columns) == ['column', 'contribution']
+    assert np.all(np.diff(np.abs(frame['contribution'].to_numpy())) <= 0)
+
+
+def test_rejects_wrong_shape(explainer):
+    with pytest.raises(ValueError):
+        explainer.explain_array(np.zeros((2, 3)))
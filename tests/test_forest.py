@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.inference.forest import CompiledForest, FusedForestPredictor
+
+
+def test_compiled_regressor_matches_sklearn(model_reg, fitted):
+    X_test = fitted[1][1]
+    compiled = CompiledForest(model_reg)
+    assert np.array_equal(compiled.predict(X_test.to_numpy()), model_reg.predict(X_test))
+
+
+def test_compiled_classifier_matches_sklearn(model_clf, fitted):
+    X_test = fitted[1][1]
+    compiled = CompiledForest(model_clf)
+    assert np.array_equal(compiled.predict(X_test.to_numpy()), model_clf.predict(X_test))
+    assert np.array_equal(compiled.predict_proba(X_test.to_numpy()), model_clf.predict_proba(X_test))
+
+
+def test_compiled_leaves_match_apply(model_reg, fitted):
+    X_test = fitted[1][1]
+    compiled = CompiledForest(model_reg)
+    leaves = compiled.apply(X_test.to_numpy()) - compiled.roots[:, np.newaxis]
+    assert np.array_equal(leaves, model_reg.apply(X_test).T)
+
+
+def test_fused_matches_sklearn(model_reg, model_clf, fitted):
+    X_test = fitted[1][1]
+    prediction = FusedForestPredictor(model_reg, model_clf).predict(X_test.to_numpy())
+    assert np.array_equal(prediction.price, model_reg.predict(X_test))
+    assert np.array_equal(prediction.is_premium, model_clf.predict(X_test))
+    assert np.array_equal(prediction.premium_proba, model_clf.predict_proba(X_test)[:, 1])
+
+
+def test_fused_threads_match_single_thread(model_reg, model_clf, fitted):
+    X = np.tile(fitted[1][1].to_numpy(), (10, 1))
+    single = FusedForestPredictor(model_reg, model_clf).predict(X)
+    threaded = FusedForestPredictor(model_reg, model_clf, n_threads=2, min_rows_per_thread=16).predict(X)
+    for expected, actual in zip(single, threaded):
+        assert np.array_equal(expected, actual)
+
+
+def test_compiled_rejects_wrong_shape(model_reg):
+    compiled = CompiledForest(model_reg)
+    with pytest.raises(ValueError):
+        compiled.predict(np.zeros((2, model_reg.n_features_in_ + 1)))
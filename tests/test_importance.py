@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import pytest
+
+from src.analysis.importance import IMPORTANCE_CHARTS, importance_png_path, is_png_fresh, prerender_importance_charts
+from src.data.synthetic import generate_car_data
+from src.models.incremental import update_models
+
+
+@pytest.fixture
+def models_copy(tmp_path, models_dir):
+    path = str(tmp_path / 'models')
+    shutil.copytree(models_dir, path)
+    return path
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+def test_prerender_writes_fresh_png(models_copy):
+    assert not any(is_png_fresh(models_copy, kind) for kind in IMPORTANCE_CHARTS)
+    paths = prerender_importance_charts(models_copy)
+    assert paths == [importance_png_path(models_copy, kind) for kind in IMPORTANCE_CHARTS]
+    assert all(is_png_fresh(models_copy, kind) for kind in IMPORTANCE_CHARTS)
+
+
+def test_update_models_rerenders_png(tmp_path, models_copy):
+    out_dir = str(tmp_path / 'updated')
+    update_models(generate_car_data(40, seed=9), models_copy, out_dir, n_trees=2)
+    for kind in IMPORTANCE_CHARTS:
+        assert os.path.exists(importance_png_path(out_dir, kind))
+        assert is_png_fresh(out_dir, kind)
@@ -0,0 +1,71 @@
+import copy
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+from src.inference.batch import load_artifacts
+from src.models.incremental import add_trees, prune_trees, rescale_thresholds, tree_batches, update_models
+
+# Леса обучены на DataFrame, а сравниваются на матрицах transform_array
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+
+def leaves(artifacts, rows):
+    """Листья каждого дерева обоих лесов для сырых строк"""
+    preprocessor = artifacts['preprocessor']
+    return [model.apply(preprocessor.transform_array(rows, list(model.feature_names_in_)))
+            for model in (artifacts['model_reg'], artifacts['model_clf'])]
+
+
+def test_update_models_keeps_old_leaves(tmp_path, models_dir, raw_rows):
+    before = leaves(load_artifacts(models_dir), raw_rows)
+    out_dir = str(tmp_path / 'updated')
+    update_models(generate_car_data(500, seed=11), models_dir, out_dir, n_trees=3)
+    after = leaves(load_artifacts(out_dir), raw_rows)
+
+    for old, new in zip(before, after):
+        assert new.shape[1] == old.shape[1] + 3
+        assert np.array_equal(new[:, :old.shape[1]], old)
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_rescaled_thresholds_keep_predictions_on_noisy_rows(preprocessor, model_reg, seed):
+    # Шум в числовых колонках даёт значения, которых не было при обучении
+    rows = generate_car_data(2000, seed=seed).drop(columns=['price'])
+    preprocessor, model = copy.deepcopy(preprocessor), copy.deepcopy(model_reg)
+    feature_names = list(model.feature_names_in_)
+    X_old = preprocessor.transform_array(rows, feature_names)
+    expected = model.apply(X_old), model.predict(X_old)
+
+    old_stats = preprocessor.partial_fit(generate_car_data(700, seed=seed + 50))
+    rescale_thresholds(model, preprocessor.numeric_columns, old_stats,
+                       (preprocessor.scaler.mean_, preprocessor.scaler.scale_))
+    X_new = preprocessor.transform_array(rows, feature_names)
+
+    assert not np.array_equal(X_new, X_old)
+    assert np.array_equal(model.apply(X_new), expected[0])
+    assert np.array_equal(model.predict(X_new), expected[1])
+
+
+def test_add_and_prune_trees_by_batch(preprocessor, model_reg):
+    model = copy.deepcopy(model_reg)
+    new_rows = generate_car_data(100, seed=4)
+    X = preprocessor.transform_array(new_rows, list(model.feature_names_in_), dtype=np.float64)
+    add_trees(model, X, new_rows['price'].to_numpy(), 4, batch=1)
+    add_trees(model, X, new_rows['price'].to_numpy(), 2, batch=2)
+    assert tree_batches(model) == [0] * 10 + [1] * 4 + [2] * 2
+    newest = model.estimators_[-5:]
+
+    prune_trees(model, max_age=1)
+    assert tree_batches(model) == [1] * 4 + [2] * 2
+    prune_trees(model, max_trees=5)
+    assert tree_batches(model) == [1] * 3 + [2] * 2
+    assert model.estimators_ == newest and model.n_estimators == 5
+
+
+def test_add_trees_requires_all_classes(preprocessor, model_clf):
+    model = copy.deepcopy(model_clf)
+    X = np.zeros((3, model.n_features_in_))
+    with pytest.raises(ValueError, match='все классы'):
+        add_trees(model, X, np.zeros(3, dtype=int), 2, batch=1)
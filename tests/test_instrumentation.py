@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from src.services.instrumentation import Instrumentation, InstrumentedPredictor, NullInstrumentation, SamplingProfiler
+
+
+def test_stages_are_recorded(slim_predictor, raw_rows):
+    instrumentation = Instrumentation()
+    predictor = InstrumentedPredictor(slim_predictor, instrumentation)
+    with instrumentation.request('test'):
+        prediction = predictor.predict_rows(raw_rows.head(10))
+
+    assert np.array_equal(prediction.price, slim_predictor.predict_rows(raw_rows.head(10)).price)
+    summary = instrumentation.summary()
+    assert {name: stats['count'] for name, stats in summary.items()} == {'prepare': 1, 'encode': 1, 'predict': 1}
+    body, content_type = instrumentation.render()
+    assert b'car_price_stage_seconds_bucket{le="0.001",stage="predict"}' in body
+    assert content_type.startswith('text/plain')
+
+
+def test_stage_records_net_blocks():
+    instrumentation = Instrumentation()
+    kept = []
+    with instrumentation.stage('allocate'):
+        kept.extend(object() for _ in range(20000))
+    with instrumentation.stage('free'):
+        kept.clear()
+
+    summary = instrumentation.summary()
+    assert summary['allocate']['mean_net_blocks'] >= 20000
+    assert summary['free']['mean_net_blocks'] < -10000
+
+
+def busy_loop(iterations=3_000_000):
+    total = 0
+    while total < iterations:
+        total += 1
+
+
+def test_profiler_counts_are_final_after_stop():
+    profiler = SamplingProfiler(interval=0.0002)
+    thread_id = profiler.start()
+    busy_loop(1_000_000)
+    samples = profiler.stop(thread_id)
+    counts = dict(samples)
+
+    # Фоновый поток продолжает работать, но в возвращённый Counter больше не пишет
+    other = profiler.start(threading.main_thread().ident)
+    time.sleep(0.02)
+    profiler.stop(other)
+    assert counts and dict(samples) == counts
+
+
+def test_slow_requests_are_profiled(tmp_path):
+    instrumentation = Instrumentation(profile_slow_ms=0, profile_dir=str(tmp_path), profile_interval=0.0005)
+    with instrumentation.request('slow'):
+        # Около 0.1 с работы в этом потоке, чтобы профилировщик успел снять стеки
+        busy_loop()
+    assert len(instrumentation.profiles) == 1
+    assert 'test_instrumentation:test_slow_requests_are_profiled' in open(instrumentation.profiles[0]).read()
+
+
+def test_null_instrumentation_has_same_interface(slim_predictor, raw_rows):
+    null = NullInstrumentation()
+    predictor = InstrumentedPredictor(slim_predictor, null)
+    with null.request('page'), null.stage('exchange_rate'):
+        prediction = predictor.predict_rows(raw_rows.head(3))
+    assert len(prediction.price) == 3
+    assert null.summary() == {}
+
+
+def test_module_import_does_not_load_prometheus():
+    code = "import sys, src.services.instrumentation; print('prometheus_client' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.loader import (CAR_DATA_DTYPES, DATA_PATH, cache_path, load_car_data_typed,
+                             read_car_data_typed)
+from src.features.derived import restore_float64
+from src.features.preprocessing import CarPricePreprocessor
+
+
+@pytest.fixture(scope='module')
+def typed():
+    return read_car_data_typed()
+
+
+def test_schema_dtypes(typed):
+    for column, dtype in CAR_DATA_DTYPES.items():
+        assert typed[column].dtype == dtype, column
+    assert typed['brand'].dtype == 'category'
+    assert typed['price'].dtype == np.float64
+
+
+@pytest.mark.parametrize('format', ['feather', 'parquet'])
+@pytest.mark.parametrize('memory_map', [False, True])
+def test_cache_round_trip(tmp_path, typed, format, memory_map):
+    cache_dir = str(tmp_path / 'cache')
+    first = load_car_data_typed(cache_dir=cache_dir, format=format)
+    assert os.path.exists(cache_path(DATA_PATH, cache_dir, format))
+    cached = load_car_data_typed(cache_dir=cache_dir, format=format, memory_map=memory_map)
+
+    pd.testing.assert_frame_equal(first, typed)
+    pd.testing.assert_frame_equal(cached, typed)
+
+
+def test_changed_csv_is_parsed_again(tmp_path):
+    path = str(tmp_path / 'car_data.csv')
+    shutil.copy(DATA_PATH, path)
+    cache_dir = str(tmp_path / 'cache')
+    before = load_car_data_typed(path, cache_dir)
+
+    df = pd.read_csv(path)
+    df.loc[0, 'price'] += 1
+    df.to_csv(path, index=False)
+    after = load_car_data_typed(path, cache_dir)
+
+    assert after.loc[0, 'price'] == before.loc[0, 'price'] + 1
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_restore_float64_returns_csv_values(car_data):
+    for column in car_data.select_dtypes(include='number'):
+        values = car_data[column].to_numpy(dtype=np.float64)
+        if column != 'price':
+            assert np.array_equal(restore_float64(values.astype(np.float32)), values), column
+    assert restore_float64(np.array([np.nan, 1.5], dtype=np.float32)).dtype == np.float64
+
+
+@pytest.mark.parametrize('target', ['price', 'is_premium'])
+def test_typed_frame_trains_on_same_features(car_data, typed, target):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = CarPricePreprocessor(models_dir=None).fit_transform(car_data, target)
+        preprocessor = CarPricePreprocessor(models_dir=None)
+        actual = preprocessor.fit_transform(typed, target)
+
+    for expected_part, actual_part in zip(expected, actual):
+        assert np.array_equal(np.asarray(expected_part, dtype=np.float64), np.asarray(actual_part, dtype=np.float64))
+    assert np.array_equal(preprocessor.transform_array(typed), preprocessor.transform_array(car_data))
+
+
+def test_slim_predictor_on_typed_frame(slim_predictor, car_data, typed):
+    assert np.array_equal(slim_predictor.build_array(typed), slim_predictor.build_array(car_data))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+from src.inference.neighbors import COMPARABLES_INDEX, ComparablesIndex, update_comparables_index
+
+K = 7
+
+
+@pytest.fixture(scope='module')
+def new_rows(car_data):
+    return generate_car_data(150, seed=3, source=car_data)
+
+
+@pytest.fixture(scope='module')
+def queries(slim_predictor, car_data):
+    columns = slim_predictor.prepare_columns(generate_car_data(40, seed=11, source=car_data))
+    return slim_predictor.encoder.encode(columns, dtype=np.float32)
+
+
+def brute_force(X, queries, k):
+    """Эталон: расстояния до всех строк в float64 и k наименьших"""
+    diff = queries[:, np.newaxis, :].astype(np.float64) - X[np.newaxis].astype(np.float64)
+    distances = np.sqrt((diff ** 2).sum(axis=2))
+    return np.sort(distances, axis=1)[:, :k], distances
+
+
+def assert_matches_brute_force(index, X, queries):
+    distances, positions = index.query(queries, K)
+    expected, all_distances = brute_force(X, queries, K)
+
+    assert np.allclose(distances, expected)
+    # Позиции при равных расстояниях могут отличаться, но каждая указывает на строку с тем же расстоянием
+    assert np.allclose(np.take_along_axis(all_distances, positions, axis=1), distances)
+    assert all(len(set(row)) == K for row in positions)
+
+
+def test_delta_buffer_matches_brute_force(slim_predictor, car_data, new_rows, queries):
+    index = ComparablesIndex.from_predictor(slim_predictor, car_data, min_rebuild_rows=10_000)
+    index.add(ComparablesIndex.prepare(slim_predictor, new_rows))
+    assert (len(index.X), index.delta_rows) == (len(car_data), len(new_rows))
+
+    X = np.concatenate([index.X, index._delta])
+    assert_matches_brute_force(index, X, queries)
+
+
+def test_rebuild_threshold_keeps_results(slim_predictor, car_data, new_rows, queries):
+    buffered = ComparablesIndex.from_predictor(slim_predictor, car_data, min_rebuild_rows=10_000)
+    rebuilt = ComparablesIndex.from_predictor(slim_predictor, car_data, min_rebuild_rows=100)
+    columns = ComparablesIndex.prepare(slim_predictor, new_rows)
+    buffered.add(columns)
+    rebuilt.add(columns)
+
+    assert rebuilt.delta_rows == 0 and len(rebuilt.X) == len(rebuilt) == len(buffered)
+    assert np.allclose(rebuilt.query(queries, K)[0], buffered.query(queries, K)[0])
+    assert_matches_brute_force(rebuilt, rebuilt.X, queries)
+
+
+def test_small_index_and_delta_only_neighbors(slim_predictor, car_data, new_rows, queries):
+    # Дерево меньше k: недостающие соседи берутся из дельта-буфера
+    index = ComparablesIndex.from_predictor(slim_predictor, car_data.iloc[:3])
+    index.add(ComparablesIndex.prepare(slim_predictor, new_rows.iloc[:20]))
+    assert_matches_brute_force(index, np.concatenate([index.X, index._delta]), queries)
+
+
+def test_update_saved_index(tmp_path, slim_predictor, car_data, new_rows, queries):
+    ComparablesIndex.from_predictor(slim_predictor, car_data, min_rebuild_rows=10_000).save(
+        str(tmp_path / COMPARABLES_INDEX))
+    update_comparables_index(str(tmp_path), new_rows, slim_predictor)
+    index = ComparablesIndex.load(str(tmp_path / COMPARABLES_INDEX))
+
+    # При загрузке дерево строится заново, дельта-буфер входит в него
+    assert (index.delta_rows, len(index.X)) == (0, len(car_data) + len(new_rows))
+    assert_matches_brute_force(index, index.X, queries)
+
+    frame = index.neighbors({column: values[:1] for column, values in
+                             ComparablesIndex.prepare(slim_predictor, new_rows).items()}, k=3)
+    assert frame['distance'].iloc[0] == 0
+    assert frame['distance'].is_monotonic_increasing
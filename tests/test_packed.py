@@ -0,0 +1,60 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import generate_car_data
+from src.inference.packed import PACKED_BUNDLE, export_packed_bundle, load_packed, read_header, save_packed
+from src.inference.registry import get_registry
+from src.inference.slim import SLIM_BUNDLE, SlimPredictor
+
+
+@pytest.fixture(scope='module')
+def rows():
+    # Шум в числовых колонках даёт значения между порогами, а не только точки обучения
+    return generate_car_data(2000, seed=3).drop(columns=['price'])
+
+
+def assert_same_predictions(expected, actual):
+    for expected_column, actual_column in zip(expected, actual):
+        assert np.array_equal(expected_column, actual_column)
+
+
+@pytest.mark.parametrize('memory_map', [True, False])
+def test_round_trip_matches_slim_predictor(tmp_path, slim_predictor, rows, memory_map):
+    path = save_packed(slim_predictor, str(tmp_path / PACKED_BUNDLE))
+    packed = load_packed(path, memory_map=memory_map)
+
+    assert packed.feature_names == slim_predictor.feature_names
+    assert np.array_equal(packed.build_array(rows), slim_predictor.build_array(rows))
+    assert_same_predictions(slim_predictor.predict_rows(rows), packed.predict_rows(rows))
+
+
+def test_car_names_go_through_packed_brand_table(tmp_path, slim_predictor, raw_rows):
+    packed = load_packed(save_packed(slim_predictor, str(tmp_path / PACKED_BUNDLE)))
+    rows = raw_rows.copy()
+    rows.loc[0, 'CarName'] = 'nonexistent model x'
+    assert np.array_equal(packed._brands(rows['CarName']), slim_predictor._brands(rows['CarName']))
+
+
+def test_pickle_bundle_round_trip(tmp_path, slim_predictor, rows):
+    path = str(tmp_path / SLIM_BUNDLE)
+    slim_predictor.save(path)
+    assert_same_predictions(slim_predictor.predict_rows(rows), SlimPredictor.load(path).predict_rows(rows))
+
+
+def test_registry_prefers_packed_bundle(tmp_path, models_dir, slim_predictor, rows):
+    packed_dir = str(tmp_path / 'models')
+    shutil.copytree(models_dir, packed_dir)
+    export_packed_bundle(packed_dir, slim_predictor)
+
+    predictor = get_registry(packed_dir).slim_predictor().predictor
+    assert isinstance(predictor.forest.threshold, np.memmap)
+    assert_same_predictions(slim_predictor.predict_rows(rows), predictor.predict_rows(rows))
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(b'not a bundle at all')
+    with pytest.raises(ValueError):
+        read_header(str(path))
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.features.parallel import ParallelTransformer
+
+
+@pytest.fixture(scope='module')
+def transformer(preprocessor):
+    with ParallelTransformer(preprocessor, n_workers=2, min_rows=0) as transformer:
+        yield transformer
+
+
+def test_matches_serial(transformer, preprocessor, raw_rows, model_reg):
+    feature_names = list(model_reg.feature_names_in_)
+    expected = preprocessor.transform_array(raw_rows, feature_names)
+    assert np.array_equal(transformer.transform_array(raw_rows, feature_names), expected)
+
+
+def test_missing_values_match_serial(transformer, preprocessor, raw_rows):
+    rows = raw_rows.copy()
+    for column in ('carbody', 'CarName'):
+        rows[column] = rows[column].astype(object)
+    rows.loc[3, 'carbody'] = np.nan
+    rows.loc[7, 'CarName'] = None
+    rows.loc[8, 'CarName'] = np.nan
+    rows.loc[11, 'horsepower'] = np.nan
+
+    expected = preprocessor.transform_array(rows, dtype=np.float64)
+    actual = transformer.transform_array(rows, dtype=np.float64)
+    assert np.array_equal(actual, expected, equal_nan=True)
+
+
+def test_missing_label_raises_like_serial(transformer, preprocessor, raw_rows):
+    rows = raw_rows.copy()
+    rows['fueltype'] = rows['fueltype'].astype(object)
+    rows.loc[5, 'fueltype'] = np.nan
+    with pytest.raises(ValueError, match='fueltype'):
+        preprocessor.transform_array(rows)
+    with pytest.raises(ValueError, match='fueltype'):
+        transformer.transform_array(rows)
+
+
+def test_brand_column_instead_of_car_name(transformer, preprocessor, raw_rows):
+    rows = raw_rows.drop(columns=['CarName'])
+    rows['brand'] = preprocessor.brand_normalizer.transform(raw_rows['CarName'])
+    assert np.array_equal(transformer.transform_array(rows), preprocessor.transform_array(raw_rows))
@@ -0,0 +1,36 @@
+import contextlib
+import io
+
+import pytest
+
+from src import pipeline
+from src.pipeline import STAGES, Pipeline
+
+PARAMS = {'n_estimators': 5}
+
+
+def run(tmp_path, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Pipeline(models_dir=str(tmp_path / 'models'), cache_dir=str(tmp_path / 'cache'), reg_params=PARAMS,
+                        clf_params=PARAMS, n_jobs=1, **kwargs).run()
+
+
+@pytest.fixture
+def first_run(tmp_path):
+    return run(tmp_path)
+
+
+def cached(report):
+    return {stage: report[stage]['cached'] for stage in STAGES}
+
+
+def test_second_run_is_cached(tmp_path, first_run):
+    assert not any(cached(first_run).values())
+    assert all(cached(run(tmp_path)).values())
+
+
+def test_export_format_change_reexports_only(tmp_path, first_run, monkeypatch):
+    monkeypatch.setattr(pipeline, '_EXPORT_SOURCES', pipeline._EXPORT_SOURCES + ['inference/registry.py'])
+    report = run(tmp_path)
+    assert cached(report) == {stage: stage != 'export' for stage in STAGES}
+    assert report['export']['key'] != first_run['export']['key']
@@ -0,0 +1,74 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def sklearn_reference(preprocessor, X):
+    """Кодирование подготовленных строк обученными объектами sklearn, как в ноутбуках"""
+    parts = [pd.DataFrame(preprocessor.scaler.transform(X[preprocessor.numeric_columns]),
+                          columns=preprocessor.numeric_columns, index=X.index)]
+    parts += [pd.Series(le.transform(X[column]), name=column, index=X.index)
+              for column, le in preprocessor.label_encoders.items()]
+    parts += [pd.DataFrame(ohe.transform(X[[column]]), columns=ohe.get_feature_names_out([column]), index=X.index)
+              for column, ohe in preprocessor.onehot_encoders.items()]
+    return pd.concat(parts, axis=1)[preprocessor.feature_names]
+
+
+@pytest.fixture(scope='module')
+def prepared(preprocessor, car_data):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return preprocessor._prepare(car_data, 'price').drop('price', axis=1)
+
+
+# handle_unknown='ignore' в OneHotEncoder: значения, не попавшие в train, кодируются нулями с предупреждением
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_compiled_encoder_matches_sklearn(preprocessor, prepared):
+    expected = sklearn_reference(preprocessor, prepared)
+    assert np.array_equal(preprocessor._transform_prepared(prepared).to_numpy(), expected.to_numpy())
+
+
+def test_small_batches_match_large(preprocessor, prepared):
+    # До 16 строк словари применяются построчно, больше - через pd.factorize
+    expected = preprocessor._transform_prepared(prepared).to_numpy()
+    for start in range(0, 40, 8):
+        chunk = prepared.iloc[start:start + 8]
+        assert np.array_equal(preprocessor._transform_prepared(chunk).to_numpy(), expected[start:start + 8])
+
+
+def test_transform_matches_fit_transform(fitted, car_data):
+    preprocessor, (X_train, X_test, _, _) = fitted
+    for X in (X_train, X_test):
+        actual = preprocessor.transform(car_data.loc[X.index].drop(columns=['price']))
+        assert np.array_equal(actual.to_numpy(), X.to_numpy())
+        assert list(actual.columns) == list(X.columns)
+
+
+def test_transform_array_matches_transform(preprocessor, raw_rows):
+    expected = preprocessor.transform(raw_rows).to_numpy()
+    assert np.array_equal(preprocessor.transform_array(raw_rows, dtype=np.float64), expected)
+    assert np.array_equal(preprocessor.transform_array(raw_rows), expected.astype(np.float32))
+
+    order = list(reversed(preprocessor.feature_names))
+    assert np.array_equal(preprocessor.transform_array(raw_rows, order, dtype=np.float64), expected[:, ::-1])
+
+
+def test_dict_of_columns_matches_dataframe(preprocessor, raw_rows):
+    columns = {column: raw_rows[column].to_numpy() for column in raw_rows.columns}
+    assert np.array_equal(preprocessor.transform_array(columns), preprocessor.transform_array(raw_rows))
+
+
+def test_unknown_brand_becomes_other(preprocessor, raw_rows):
+    rows = raw_rows.head(3).copy()
+    rows['CarName'] = 'nonexistent model x'
+    X = preprocessor.transform(rows)
+    assert (X['brand_other'] == 1).all()
+
+
+def test_unseen_label_raises(preprocessor, raw_rows):
+    rows = raw_rows.head(3).copy()
+    rows['fueltype'] = 'hydrogen'
+    with pytest.raises(ValueError, match='fueltype'):
+        preprocessor.transform(rows)
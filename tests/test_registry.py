@@ -0,0 +1,102 @@
+import copy
+import os
+import shutil
+
+import joblib
+import pytest
+
+from src.inference.registry import CLASSIFIER_MODEL, REGRESSION_MODEL, ModelRegistry, get_registry
+from src.inference.slim import export_slim_bundle
+
+
+@pytest.fixture
+def models_copy(tmp_path, models_dir):
+    path = str(tmp_path / 'models')
+    shutil.copytree(models_dir, path)
+    return path
+
+
+def touch(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_unchanged_files_reuse_predictor(models_copy):
+    registry = ModelRegistry(models_copy, check_interval=0)
+    predictor = registry.predictor()
+
+    assert registry.predictor() is predictor
+    assert registry.model_reg() is predictor.predictor.model_reg
+    assert set(registry.stats()['load_counts'].values()) == {1}
+
+
+def test_touched_model_rebuilds_predictor(models_copy):
+    registry = ModelRegistry(models_copy, check_interval=0)
+    predictor = registry.predictor()
+    model_clf = registry.model_clf()
+
+    touch(os.path.join(models_copy, REGRESSION_MODEL))
+    rebuilt = registry.predictor()
+
+    assert rebuilt is not predictor
+    assert rebuilt.predictor.model_clf is model_clf
+    assert registry.stats()['load_counts'] == {'preprocessor.pkl': 1, REGRESSION_MODEL: 2, CLASSIFIER_MODEL: 1}
+
+
+def test_replaced_model_is_loaded(models_copy, model_reg):
+    registry = ModelRegistry(models_copy, check_interval=0)
+    registry.predictor()
+
+    # Подмена файла целиком: в реестр попадает новая модель, а не закэшированная
+    smaller = copy.deepcopy(model_reg)
+    smaller.estimators_ = smaller.estimators_[:3]
+    joblib.dump(smaller, os.path.join(models_copy, REGRESSION_MODEL))
+    assert len(registry.predictor().predictor.model_reg.estimators_) == 3
+
+
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_same_stat_is_reloaded_only_with_verify_hash(models_copy):
+    path = os.path.join(models_copy, 'notes.txt')
+    with open(path, 'w') as f:
+        f.write('one')
+    plain = ModelRegistry(models_copy, check_interval=0)
+    verified = ModelRegistry(models_copy, verify_hash=True, check_interval=0)
+    assert plain.get('notes.txt', read_text) == verified.get('notes.txt', read_text) == 'one'
+
+    # Те же размер и mtime, другое содержимое: замечает только проверка sha256
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        f.write('two')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert plain.get('notes.txt', read_text) == 'one'
+    assert verified.get('notes.txt', read_text) == 'two'
+
+
+def test_check_interval_delays_stat(models_copy):
+    registry = ModelRegistry(models_copy, check_interval=3600)
+    predictor = registry.predictor()
+    touch(os.path.join(models_copy, CLASSIFIER_MODEL))
+    assert registry.predictor() is predictor
+
+    registry.check_interval = 0
+    assert registry.predictor() is not predictor
+
+
+def test_slim_predictor_switches_to_exported_bundle(models_copy):
+    registry = ModelRegistry(models_copy, check_interval=0)
+    in_memory = registry.slim_predictor()
+    assert registry.slim_predictor() is in_memory
+
+    export_slim_bundle(models_copy)
+    exported = registry.slim_predictor()
+    assert exported is not in_memory
+    assert registry.slim_predictor() is exported
+
+
+def test_one_registry_per_directory(models_copy):
+    assert get_registry(models_copy) is get_registry(os.path.join(models_copy, '.'))
@@ -0,0 +1,123 @@
+import asyncio
+import csv
+import json
+import threading
+
+import numpy as np
+import pytest
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+from src.services.scoring import ScoringService, make_app, records_to_columns
+
+
+def fetch_all(service, requests):
+    """Запросы (method, path, body) к сервису на свободном порту, ответы по порядку"""
+    async def run():
+        server = HTTPServer(make_app(service))
+        sock, port = bind_unused_port()
+        server.add_sockets([sock])
+        client = AsyncHTTPClient()
+        try:
+            return [await client.fetch(f"http://127.0.0.1:{port}{path}", method=method, body=body, raise_error=False)
+                    for method, path, body in requests]
+        finally:
+            server.stop()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope='module')
+def records(raw_rows):
+    return json.loads(raw_rows.head(5).to_json(orient='records'))
+
+
+@pytest.fixture
+def service(models_dir):
+    return ScoringService(models_dir, max_wait=0.001)
+
+
+def test_predictions_match_slim_predictor(service, records, raw_rows, slim_predictor):
+    response, = fetch_all(service, [('POST', '/predict', json.dumps(records))])
+    assert response.code == 200
+    predictions = json.loads(response.body)['predictions']
+    expected = slim_predictor.predict_rows(raw_rows.head(5))
+    assert np.allclose([p['price'] for p in predictions], expected.price)
+    assert [p['is_premium'] for p in predictions] == expected.is_premium.tolist()
+
+
+def test_explain_adds_contributions(service, records):
+    response, = fetch_all(service, [('POST', '/predict?explain=1', json.dumps(records[0]))])
+    result = json.loads(response.body)
+    total = result['bias']['price'] + sum(result['contributions']['price'].values())
+    assert total == pytest.approx(result['price'])
+
+
+@pytest.mark.parametrize('value', [[1, 2], {'a': 1}])
+def test_nested_values_are_bad_requests(service, records, value):
+    bad = dict(records[0], horsepower=value)
+    response, = fetch_all(service, [('POST', '/predict', json.dumps(bad))])
+    assert response.code == 400
+    assert 'horsepower' in json.loads(response.body)['error']
+
+
+def test_failed_requests_are_counted(service, records):
+    bad = dict(records[0], carbody={'a': 1})
+    missing = {key: value for key, value in records[0].items() if key != 'horsepower'}
+    responses = fetch_all(service, [('POST', '/predict', json.dumps(records[0])),
+                                    ('POST', '/predict', json.dumps(bad)),
+                                    ('POST', '/predict', json.dumps(missing))])
+    assert [response.code for response in responses] == [200, 400, 400]
+    latency = service.metrics()['latency']
+    assert latency['requests'] == 3
+    assert latency['errors'] == 2
+
+
+def test_server_errors_are_counted(service, records, monkeypatch):
+    def broken(records):
+        raise RuntimeError("сломанный предиктор")
+
+    monkeypatch.setattr(service, 'build_array', broken)
+    response, = fetch_all(service, [('POST', '/predict', json.dumps(records[0]))])
+    assert response.code == 500
+    assert service.metrics()['latency']['errors'] == 1
+
+
+def test_csv_predictions_match_slim_predictor(service, raw_rows, slim_predictor):
+    response, = fetch_all(service, [('POST', '/predict/csv', raw_rows.head(5).to_csv(index=False))])
+    assert response.code == 200
+    rows = list(csv.DictReader(response.body.decode().splitlines()))
+    expected = slim_predictor.predict_rows(raw_rows.head(5))
+    assert np.allclose([float(row['price']) for row in rows], expected.price)
+
+
+@pytest.mark.parametrize('body', [b'CarName,horsepower\n\xff\xfe,111\n',
+                                  'CarName,horsepower\n"' + 'x' * (csv.field_size_limit() + 1) + '",111\n'],
+                         ids=['not-utf8', 'field-too-large'])
+def test_unreadable_csv_is_bad_request_and_counted(service, body):
+    response, = fetch_all(service, [('POST', '/predict/csv', body)])
+    assert response.code == 400
+    latency = service.metrics()['latency']
+    assert (latency['requests'], latency['errors']) == (1, 1)
+
+
+def test_explain_runs_off_the_event_loop(service, records, monkeypatch):
+    threads = []
+    explain_array = service._explain_array
+
+    def recording(explainer, X):
+        threads.append(threading.current_thread())
+        return explain_array(explainer, X)
+
+    monkeypatch.setattr(service, '_explain_array', recording)
+    response, = fetch_all(service, [('POST', '/predict?explain=1', json.dumps(records))])
+    assert response.code == 200
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert service.metrics()['stages']['explain']['count'] == 1
+
+
+def test_records_to_columns_brand_fallback(records):
+    columns = records_to_columns(records, ['horsepower', 'brand'], {'horsepower'})
+    assert set(columns) == {'horsepower', 'CarName'}
+    assert columns['horsepower'].dtype == np.float64
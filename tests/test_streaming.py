@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.inference.streaming import score_file
+
+
+@pytest.fixture
+def input_csv(tmp_path, car_data):
+    path = tmp_path / 'cars.csv'
+    car_data.drop(columns=['price']).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [1, 50, 1000])
+def test_parquet_matches_batch(tmp_path, input_csv, batch_predictor, chunksize):
+    output = tmp_path / 'predictions.parquet'
+    stats = score_file(str(input_csv), str(output), predictor=batch_predictor, chunksize=chunksize)
+
+    expected = batch_predictor.predict(pd.read_csv(input_csv))
+    actual = pd.read_parquet(output)
+    assert stats['rows'] == len(expected)
+    assert list(actual.columns) == ['car_ID', 'price', 'is_premium', 'premium_proba']
+    for column in expected.columns:
+        assert np.array_equal(actual[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_csv_matches_batch(tmp_path, input_csv, batch_predictor):
+    output = tmp_path / 'predictions.csv'
+    score_file(str(input_csv), str(output), predictor=batch_predictor, chunksize=64)
+
+    expected = batch_predictor.predict(pd.read_csv(input_csv))
+    actual = pd.read_csv(output, float_precision='round_trip')
+    assert np.array_equal(actual['car_ID'], pd.read_csv(input_csv)['car_ID'])
+    for column in expected.columns:
+        assert np.array_equal(actual[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_brand_column_instead_of_car_name(tmp_path, input_csv, batch_predictor):
+    df = pd.read_csv(input_csv)
+    df['brand'] = batch_predictor.preprocessor.brand_normalizer.transform(df['CarName'])
+    brand_csv = tmp_path / 'brands.csv'
+    df.drop(columns=['CarName']).to_csv(brand_csv, index=False)
+
+    score_file(str(input_csv), str(tmp_path / 'by_name.parquet'), predictor=batch_predictor)
+    score_file(str(brand_csv), str(tmp_path / 'by_brand.parquet'), predictor=batch_predictor)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / 'by_brand.parquet'),
+                                  pd.read_parquet(tmp_path / 'by_name.parquet'))
+
+
+def test_empty_input_writes_header(tmp_path, input_csv, batch_predictor):
+    empty = tmp_path / 'empty.csv'
+    pd.read_csv(input_csv, nrows=0).to_csv(empty, index=False)
+    output = tmp_path / 'predictions.csv'
+    assert score_file(str(empty), str(output), predictor=batch_predictor)['rows'] == 0
+    assert list(pd.read_csv(output).columns) == ['price', 'is_premium', 'premium_proba']
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.inference.packed import PACKED_BUNDLE, load_packed, save_packed
+from src.inference.sweep import MAX_GRID_ROWS, grid_rows, sweep
+
+
+@pytest.fixture(scope='module')
+def base(raw_rows):
+    # Конфигурация машины, как её собирает форма приложения: по одному значению на колонку
+    return {column: [value] for column, value in raw_rows.iloc[3].items()}
+
+
+PARAMS = {'horsepower': [70, 95.5, 120, 160, 250], 'curbweight': [1800, 2400, 3100, 4000]}
+
+
+def test_sweep_matches_per_row_predictions(slim_predictor, base):
+    result = sweep(slim_predictor, base, PARAMS)
+    assert result.price.shape == (5, 4)
+
+    for i, horsepower in enumerate(PARAMS['horsepower']):
+        for j, curbweight in enumerate(PARAMS['curbweight']):
+            row = dict(base, horsepower=[horsepower], curbweight=[curbweight])
+            expected = slim_predictor.predict_rows(row)
+            assert result.price[i, j] == expected.price[0]
+            assert result.is_premium[i, j] == expected.is_premium[0]
+            assert result.premium_proba[i, j] == expected.premium_proba[0]
+
+
+def test_one_parameter_and_frame(slim_predictor, base):
+    result = sweep(slim_predictor, base, {'enginesize': np.arange(90, 200, 10)})
+    frame = result.to_frame()
+
+    assert result.price.shape == (11,)
+    assert frame['enginesize'].tolist() == list(range(90, 200, 10))
+    assert np.array_equal(frame['price'].to_numpy(), result.price)
+
+    frame = sweep(slim_predictor, base, PARAMS).to_frame()
+    assert frame[['horsepower', 'curbweight']].iloc[1].tolist() == [70, 2400]
+
+
+def test_packed_bundle_sweeps_like_slim(tmp_path, slim_predictor, base):
+    packed = load_packed(save_packed(slim_predictor, str(tmp_path / PACKED_BUNDLE)))
+    expected, actual = sweep(slim_predictor, base, PARAMS), sweep(packed, base, PARAMS)
+    for name in ('price', 'is_premium', 'premium_proba'):
+        assert np.array_equal(getattr(expected, name), getattr(actual, name))
+
+
+def test_grid_limits(base):
+    with pytest.raises(ValueError):
+        grid_rows(base, {})
+    side = int(np.sqrt(MAX_GRID_ROWS)) + 1
+    with pytest.raises(ValueError, match='больше'):
+        grid_rows(base, {'horsepower': np.arange(side), 'curbweight': np.arange(side)})
@@ -0,0 +1,64 @@
+import pytest
+
+from src.models.tuning import Tuner, halving_search
+
+PARAM_GRID = {'n_estimators': [5, 15], 'max_depth': [3, None]}
+
+
+def test_halving_without_time_returns_nothing(tmp_path, car_data):
+    with Tuner(car_data, 'price', str(tmp_path), n_splits=3, n_workers=1, time_budget=0) as tuner:
+        assert halving_search(tuner, PARAM_GRID, min_resources=5) == []
+        assert tuner.timed_out
+        assert tuner.evaluated == 0
+
+
+def test_halving_ranks_last_round_first_and_reuses_trials(tmp_path, car_data):
+    with Tuner(car_data, 'price', str(tmp_path), n_splits=3, n_workers=1) as tuner:
+        trials = halving_search(tuner, PARAM_GRID, min_resources=5)
+        evaluated = tuner.evaluated
+    assert trials[0]['params']['n_estimators'] == 15
+    assert trials[0]['round'] == max(trial['round'] for trial in trials)
+    assert evaluated == len(trials)
+
+    # Повторный запуск берёт все оценки из журнала
+    with Tuner(car_data, 'price', str(tmp_path), n_splits=3, n_workers=1) as tuner:
+        again = halving_search(tuner, PARAM_GRID, min_resources=5)
+        assert tuner.evaluated == 0
+        # Номер раунда есть только в результатах, записи журнала общие для всех поисков
+        assert not any('round' in trial for trial in tuner.store.trials.values())
+    assert [trial['key'] for trial in again] == [trial['key'] for trial in trials]
+
+
+class FakeTuner:
+    """Оценка без обучения: score растёт с числом деревьев и номером кандидата, записи переиспользуются"""
+
+    timed_out = False
+
+    def __init__(self):
+        self.store = {}
+
+    def evaluate(self, candidates):
+        trials = []
+        for params in candidates:
+            key = tuple(sorted(params.items()))
+            if key not in self.store:
+                self.store[key] = {'key': key, 'params': params,
+                                   'score': params['n_estimators'] * 1000 + params['candidate']}
+            trials.append(self.store[key])
+        return trials
+
+
+@pytest.mark.parametrize('min_resources, max_resources, factor, resources', [
+    (1, 243, 3, [1, 3, 9, 27, 81, 243]),
+    (1, 1000, 10, [1, 10, 100, 1000]),
+    (25, 200, 3, [25, 200]),
+    (300, 200, 3, [200]),
+])
+def test_halving_rounds_at_exact_powers(min_resources, max_resources, factor, resources):
+    tuner = FakeTuner()
+    trials = halving_search(tuner, {'n_estimators': [max_resources], 'candidate': list(range(1000))},
+                            min_resources=min_resources, factor=factor)
+
+    assert sorted({trial['params']['n_estimators'] for trial in trials}) == resources
+    assert trials[0]['params'] == {'candidate': 999, 'n_estimators': max_resources}
+    assert not any('round' in trial for trial in tuner.store.values())